@@ -0,0 +1,130 @@
+import os
+import re
+import math
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Simulation defaults; requests can override samples, horizon and model through
+# additional_context ("adoption_samples", "adoption_horizon", "adoption_model")
+DEFAULT_SAMPLES = 10000
+DEFAULT_HORIZON = 5
+# Server-side limits on what a request can ask for (override through environment variables)
+MAX_SAMPLES = int(os.environ.get("ADOPTION_MAX_SAMPLES", "20000"))
+MAX_HORIZON = int(os.environ.get("ADOPTION_MAX_HORIZON", "10"))
+MODELS = ("logistic", "bass")
+PERCENTILES = (10, 50, 90)
+
+# Typical Bass diffusion imitation/innovation ratio (q / p) for consumer technology
+BASS_Q_OVER_P = 12.0
+# Years from launch to peak when the analog does not say
+DEFAULT_YEARS_TO_PEAK = 4.0
+
+# Spread of the parameter draws: ceiling and speed are log-normal, timing is normal (years)
+CEILING_SIGMA = 0.15
+SPEED_SIGMA = 0.25
+TIMING_SIGMA = 0.75
+
+
+def simulation_settings(additional_context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Read and clamp the simulation parameters of a request."""
+    context = additional_context or {}
+
+    def bounded(key: str, default: int, upper: int) -> int:
+        try:
+            value = int(context.get(key, default))
+        except (TypeError, ValueError):
+            value = default
+        return min(max(value, 1), upper)
+
+    model = str(context.get("adoption_model", "logistic")).lower()
+    return {
+        "model": model if model in MODELS else "logistic",
+        "samples": bounded("adoption_samples", DEFAULT_SAMPLES, MAX_SAMPLES),
+        "horizon": bounded("adoption_horizon", DEFAULT_HORIZON, MAX_HORIZON),
+    }
+
+
+def analog_years_to_peak(analog: Dict[str, Any]) -> float:
+    """Years the analog took from launch (the year in its name, e.g. "VR Headsets (2016)") to peak."""
+    launch = re.search(r"\((\d{4})\)", analog.get("name", ""))
+    if launch and analog.get("peak_year"):
+        years = analog["peak_year"] - int(launch.group(1))
+        if years > 0:
+            return float(years)
+    return DEFAULT_YEARS_TO_PEAK
+
+
+def logistic_curves(t: np.ndarray, ceiling: np.ndarray, speed: np.ndarray, midpoint: np.ndarray) -> np.ndarray:
+    """Cumulative adoption K / (1 + exp(-r (t - t0))) for each parameter draw (rows) and year (columns)."""
+    return ceiling / (1.0 + np.exp(-speed * (t - midpoint)))
+
+
+def bass_curves(t: np.ndarray, ceiling: np.ndarray, p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Cumulative Bass diffusion K (1 - e^{-(p+q)t}) / (1 + (q/p) e^{-(p+q)t}), zero before t = 0."""
+    decay = np.exp(-(p + q) * np.maximum(t, 0.0))
+    return ceiling * (1.0 - decay) / (1.0 + (q / p) * decay)
+
+
+def simulate_adoption(
+    analog: Dict[str, Any],
+    start_year: int,
+    samples: int = DEFAULT_SAMPLES,
+    horizon: int = DEFAULT_HORIZON,
+    model: str = "logistic",
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Monte Carlo adoption forecast fitted to a historical analog
+
+    The analog's peak adoption sets the ceiling and its launch-to-peak time sets the speed.
+    For the logistic model launch and peak are the 10% and 90% points of the curve; for the
+    Bass model the peak is the year of fastest adoption. Each of the samples draws its own
+    ceiling, speed and timing, and all curves are evaluated in one broadcast NumPy pass.
+
+    Args:
+        analog: historical_analog dict from find_analog
+        start_year: Calendar year of t = 0 (launch of the new idea)
+        samples: Number of parameter draws
+        horizon: Number of years to forecast
+        model: "logistic" or "bass"
+        seed: Seed for the draws; None for fresh randomness
+
+    Returns:
+        Per-year percentile bands (adoption in percent of the population) and the median curve
+    """
+    generator = np.random.default_rng(seed)
+    years_to_peak = analog_years_to_peak(analog)
+    peak_adoption = float(analog.get("peak_adoption", 50))
+
+    # Draws as column vectors, so that they broadcast against the row of years
+    ceiling = peak_adoption * generator.lognormal(0.0, CEILING_SIGMA, (samples, 1))
+    speed_factor = generator.lognormal(0.0, SPEED_SIGMA, (samples, 1))
+    shift = generator.normal(0.0, TIMING_SIGMA, (samples, 1))
+    # Year i of the forecast is evaluated at the end of that year
+    t = np.arange(1, horizon + 1, dtype=np.float64)[None, :]
+
+    if model == "bass":
+        p_plus_q = math.log(BASS_Q_OVER_P) / years_to_peak * speed_factor
+        p = p_plus_q / (1.0 + BASS_Q_OVER_P)
+        curves = bass_curves(t - shift, ceiling, p, p_plus_q - p)
+    else:
+        speed = 2.0 * math.log(9.0) / years_to_peak * speed_factor
+        curves = logistic_curves(t, ceiling, speed, years_to_peak / 2.0 + shift)
+
+    np.clip(curves, 0.0, 100.0, out=curves)
+    bands = np.percentile(curves, PERCENTILES, axis=0)
+    years = [start_year + i for i in range(horizon)]
+    return {
+        "model": model,
+        "samples": samples,
+        "horizon": horizon,
+        "bands": [
+            {"year": year, **{f"p{pct}": round(float(bands[j, i]), 1) for j, pct in enumerate(PERCENTILES)}}
+            for i, year in enumerate(years)
+        ],
+        "median_curve": [{"year": year, "adoption": round(float(bands[PERCENTILES.index(50), i]), 1)} for i, year in enumerate(years)],
+    }
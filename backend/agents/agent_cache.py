@@ -0,0 +1,108 @@
+import os
+import copy
+import json
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Template agent settings (override through environment variables)
+# Seed each agent's random numbers from the idea, so the same idea always gets the same result
+# (off by default; benchmark.py and score_ideas.py turn it on)
+TEMPLATE_DETERMINISTIC = os.environ.get("TEMPLATE_DETERMINISTIC", "0") == "1"
+# Template results kept in memory (deterministic mode only)
+TEMPLATE_MEMO_SIZE = int(os.environ.get("TEMPLATE_MEMO_SIZE", "2048"))
+
+
+def agent_seed(idea: str, agent: str, version: str) -> int:
+    """64-bit seed derived from the idea, the agent name and the agent version."""
+    digest = hashlib.sha256(f"{agent}\0{version}\0{idea}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def agent_rng(idea: str, agent: str, version: str):
+    """
+    Random number source for one agent run
+
+    Returns a random.Random seeded from the idea in deterministic mode, and the shared
+    random module otherwise. Both offer the same uniform/randint/shuffle methods.
+    """
+    if not TEMPLATE_DETERMINISTIC:
+        return random
+    return random.Random(agent_seed(idea, agent, version))
+
+
+class AgentMemo:
+    """Bounded LRU of template agent results keyed by (idea hash, agent, version, context, day)."""
+
+    def __init__(self, max_entries: int = TEMPLATE_MEMO_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def set(self, key: Tuple, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared memo used by the template agents
+agent_memo = AgentMemo()
+
+
+def memo_key(agent: str, version: str, idea: str, additional_context: Optional[Dict[str, Any]]) -> Tuple:
+    context = json.dumps(additional_context or {}, sort_keys=True, default=str)
+    # Results embed today's date (timelines, adoption years), so entries roll over daily
+    return (hashlib.sha256(idea.encode("utf-8")).hexdigest(), agent, version, context, date.today().isoformat())
+
+
+def memoized_agent(agent: str, version: str) -> Callable:
+    """
+    Memoize a template agent of the form fn(idea, additional_context=None) -> dict
+
+    Only active in deterministic mode, where a result depends on nothing but its key.
+    Callers get a deep copy, so changing the result or the lists and dicts inside it (e.g.
+    tagging it with its "source") does not touch the memoized entry. Error results are not
+    memoized.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(idea: str, additional_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+            if not TEMPLATE_DETERMINISTIC:
+                return fn(idea, additional_context)
+            key = memo_key(agent, version, idea, additional_context)
+            result = agent_memo.get(key)
+            if result is None:
+                result = fn(idea, additional_context)
+                if "error" not in result:
+                    agent_memo.set(key, result)
+            return copy.deepcopy(result)
+        return wrapper
+    return decorator
@@ -4,63 +4,24 @@ import json
 from datetime import datetime, timedelta
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from agents.agent_cache import memoized_agent
+from agents.catalog import CATALOG
+from agents.idea_profile import get_idea_profile
+
 logger = logging.getLogger(__name__)
 
-# Simulated RAG database functions
+BUILD = CATALOG["build"]
+# Bump when the agent's output changes, so memoized results are not reused
+BUILD_AGENT_VERSION = "1"
+
 def rag_search(query: str, dataset: str) -> List[Dict[str, Any]]:
     """
     Search the RAG database for similar projects
     In a production environment, this would connect to a vector database like Weaviate
     """
     logger.info(f"RAG search for query: {query[:100]}...")
-    # Simulated results for demonstration purposes
-    if "app" in query.lower() or "platform" in query.lower():
-        return [
-            {
-                "title": "Mobile Recipe App",
-                "stack": ["React Native", "Firebase", "Node.js"],
-                "timeline": {"mvp": 60, "beta": 90, "launch": 120},
-                "resources": {"developers": 2, "designers": 1, "cost": "$15,000"}
-            },
-            {
-                "title": "E-commerce Platform",
-                "stack": ["Next.js", "MongoDB", "Express"],
-                "timeline": {"mvp": 90, "beta": 120, "launch": 180},
-                "resources": {"developers": 3, "designers": 2, "cost": "$28,000"}
-            }
-        ]
-    elif "ai" in query.lower() or "ml" in query.lower():
-        return [
-            {
-                "title": "AI Meal Planner",
-                "stack": ["Python", "FastAPI", "React", "TensorFlow"],
-                "timeline": {"mvp": 75, "beta": 120, "launch": 150},
-                "resources": {"developers": 2, "data_scientists": 1, "designers": 1, "cost": "$22,000"}
-            },
-            {
-                "title": "Document Analysis Tool",
-                "stack": ["Python", "PyTorch", "Django", "React"],
-                "timeline": {"mvp": 90, "beta": 135, "launch": 180},
-                "resources": {"developers": 2, "data_scientists": 2, "designers": 1, "cost": "$35,000"}
-            }
-        ]
-    else:
-        return [
-            {
-                "title": "Subscription Service",
-                "stack": ["Node.js", "Express", "React", "PostgreSQL"],
-                "timeline": {"mvp": 45, "beta": 90, "launch": 120},
-                "resources": {"developers": 2, "designers": 1, "cost": "$18,000"}
-            },
-            {
-                "title": "Marketplace Platform",
-                "stack": ["Ruby on Rails", "React", "PostgreSQL"],
-                "timeline": {"mvp": 60, "beta": 105, "launch": 150},
-                "resources": {"developers": 3, "designers": 1, "cost": "$25,000"}
-            }
-        ]
+    # Simulated results for demonstration purposes, picked from the template catalog
+    return list(BUILD["playbooks"].select(get_idea_profile(query)))
 
 def llm_extract_template(similar_projects: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -130,14 +91,16 @@ def predict_resources(idea: str, mvp_template: Dict[str, Any]) -> Dict[str, Any]
     timeline_days = (datetime.strptime(mvp_template["timeline"]["launch"], "%Y-%m-%d") - 
                     datetime.now()).days
     
+    profile = get_idea_profile(idea)
+    
     # Base calculations
     complexity_factor = 1.0
-    if "ai" in idea.lower() or "ml" in idea.lower():
+    if profile.has("ai"):
         complexity_factor = 1.5
     
     developers = max(1, int(timeline_days / 45 * complexity_factor))
     designers = max(1, developers // 2)
-    data_scientists = 1 if "ai" in idea.lower() or "ml" in idea.lower() or "data" in idea.lower() else 0
+    data_scientists = 1 if profile.has("ai", "data") else 0
     
     # Cost estimation (very simplistic)
     dev_cost_per_day = 400  # $400 per day per developer
@@ -162,6 +125,7 @@ def predict_resources(idea: str, mvp_template: Dict[str, Any]) -> Dict[str, Any]
         "data_scientists": data_scientists
     }
 
+@memoized_agent("build", BUILD_AGENT_VERSION)
 def generate_build_plan(idea: str, additional_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Generate a build plan for a business idea
@@ -0,0 +1,74 @@
+import os
+import json
+import logging
+from typing import Any, Dict, Tuple
+
+from agents.idea_profile import IdeaProfile
+
+logger = logging.getLogger(__name__)
+
+# Static content behind the template fallbacks: segments, pain points, countries, playbooks, analogs
+CATALOG_PATH = os.environ.get("TEMPLATE_CATALOG_PATH", os.path.join(os.path.dirname(__file__), "catalog.json"))
+
+
+class FrozenDict(dict):
+    """Read-only dict; catalog entries are shared by every request, so nothing may change them."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Catalog entries are read-only; copy them before modifying")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # Pickle through the constructor rather than item assignment
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into FrozenDicts and lists into tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Section:
+    """
+    Catalog entries indexed by idea category
+
+    select returns the entry of the first category in the section's precedence order that
+    the idea mentions, or the default entry.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.order: Tuple[str, ...] = tuple(data.get("order", ()))
+        self.by_category = freeze(data["by_category"])
+        self.default = freeze(data["default"])
+        self.extras = freeze({key: item for key, item in data.items() if key not in ("order", "by_category", "default")})
+
+    def select(self, profile: IdeaProfile) -> Any:
+        for category in self.order:
+            if category in profile.categories:
+                return self.by_category[category]
+        return self.default
+
+    def get(self, category: str) -> Any:
+        return self.by_category.get(category, self.default)
+
+
+def load_catalog(path: str = CATALOG_PATH) -> Dict[str, Dict[str, Any]]:
+    """Load the catalog file into {agent: {section name: Section or frozen value}}."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    catalog = {}
+    for agent, sections in data.items():
+        catalog[agent] = {
+            name: Section(section) if isinstance(section, dict) and "by_category" in section else freeze(section)
+            for name, section in sections.items()
+        }
+    return catalog
+
+
+# Loaded once when the agents are imported
+CATALOG = load_catalog()
@@ -0,0 +1,158 @@
+import re
+import hashlib
+import logging
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keyword table shared by the market, build and longevity agents: category -> phrases.
+# Phrases match whole words only, so "ai" no longer matches "maintain" and "ml" no longer
+# matches "html". A trailing "s" on the last word is accepted as well ("apps", "tokens").
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "ai": ("ai", "ml", "machine learning", "artificial intelligence", "artificial", "algorithm"),
+    "health": ("health", "wellness", "fitness", "workout", "medical"),
+    "education": ("education", "learning", "student"),
+    "blockchain": ("blockchain", "crypto", "token", "nft", "web3"),
+    "xr": ("vr", "ar", "virtual reality", "augmented reality", "augmented"),
+    "software": ("app", "platform"),
+    "data": ("data",),
+    "social": ("social", "network", "community"),
+    "global": ("global", "international"),
+}
+
+# Number of idea profiles kept in memory
+IDEA_PROFILE_CACHE_SIZE = 1024
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lowercase a text and split it into alphanumeric words."""
+    return tuple(TOKEN_PATTERN.findall(text.lower()))
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over words
+
+    Phrases are word sequences, so one left-to-right pass over the tokens of an idea finds
+    every occurrence of every phrase in the table, however many phrases there are.
+    """
+
+    def __init__(self, phrases: Dict[Tuple[str, ...], str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, ...]]] = [[]]
+        self.categories = dict(phrases)
+
+        for phrase in phrases:
+            state = 0
+            for word in phrase:
+                if word not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][word] = len(self._goto) - 1
+                state = self._goto[state][word]
+            self._output[state].append(phrase)
+
+        # Breadth-first pass to set failure links and inherit the outputs of suffix states
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0) if self._goto[fallback].get(word) != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, tokens: Tuple[str, ...]) -> List[Tuple[int, int, Tuple[str, ...]]]:
+        """Return (start, end, phrase) for every phrase occurrence, with end exclusive."""
+        matches = []
+        state = 0
+        for i, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for phrase in self._output[state]:
+                matches.append((i + 1 - len(phrase), i + 1, phrase))
+        return matches
+
+
+def _compile_keywords() -> KeywordMatcher:
+    phrases: Dict[Tuple[str, ...], str] = {}
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            words = tuple(keyword.split())
+            phrases.setdefault(words, category)
+            if not words[-1].endswith("s"):
+                phrases.setdefault(words[:-1] + (words[-1] + "s",), category)
+    return KeywordMatcher(phrases)
+
+
+MATCHER = _compile_keywords()
+
+
+@dataclass(frozen=True)
+class IdeaProfile:
+    """Keyword categories found in an idea, computed once and shared by all agents."""
+    idea_hash: str
+    tokens: Tuple[str, ...]
+    # Longest non-overlapping phrase matches as (start, end, category), in idea order
+    matches: Tuple[Tuple[int, int, str], ...]
+    categories: FrozenSet[str]
+
+    def has(self, *categories: str) -> bool:
+        """Whether the idea mentions any of the given categories."""
+        return not self.categories.isdisjoint(categories)
+
+    def terms(self) -> List[Tuple[str, Optional[str]]]:
+        """The idea as (term, category) pairs: matched phrases as one term, other words with None."""
+        terms = []
+        position = 0
+        for start, end, category in self.matches:
+            terms.extend((token, None) for token in self.tokens[position:start])
+            terms.append((" ".join(self.tokens[start:end]), category))
+            position = end
+        terms.extend((token, None) for token in self.tokens[position:])
+        return terms
+
+
+def idea_hash(idea: str) -> str:
+    return hashlib.sha256(idea.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=IDEA_PROFILE_CACHE_SIZE)
+def _profile(digest: str, idea: str) -> IdeaProfile:
+    tokens = tokenize(idea)
+    found = MATCHER.find(tokens)
+
+    # Prefer the longest phrase where matches overlap ("machine learning" over "learning");
+    # only these matches count towards the categories
+    matches = []
+    covered_until = 0
+    for start, end, phrase in sorted(found, key=lambda m: (m[0], -(m[1] - m[0]))):
+        if start >= covered_until:
+            matches.append((start, end, MATCHER.categories[phrase]))
+            covered_until = end
+    return IdeaProfile(
+        idea_hash=digest,
+        tokens=tokens,
+        matches=tuple(matches),
+        categories=frozenset(category for _, _, category in matches),
+    )
+
+
+def get_idea_profile(idea: str) -> IdeaProfile:
+    """
+    Classify an idea against the shared keyword table
+
+    Profiles are cached by the sha256 of the idea, so the agents that handle the same
+    request (and repeat requests for the same idea) tokenize and scan it only once.
+    """
+    return _profile(idea_hash(idea), idea)
@@ -1,29 +1,69 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 import json
 import os
+import asyncio
 import traceback
 import logging
-import openai
+import importlib
+from contextlib import aclosing
+from functools import partial
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import agents
-from agents.build_agent import generate_build_plan
-from agents.longevity_agent import predict_longevity
-from agents.market_agent import analyze_market
+from llm_gateway import gateway
+from sse import format_sse, SSE_HEADERS
+from response_cache import response_cache, make_cache_key, RESPONSE_CACHE_ENABLED
+from single_flight import SingleFlight
+from prompt_builder import build_idea_prompt, fit_history
+from agents.agent_cache import agent_memo
+from metrics import Counter, CallbackMetric, MetricsMiddleware, metrics_response, register_cache
+from startup import lazy_import, warm_up
 
-# Configure OpenAI API
-openai.api_key = os.environ.get("OPENAI_API_KEY", "")
-if not openai.api_key:
+# Configure OpenAI API; the client itself is created by the gateway on first use
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+if not OPENAI_API_KEY:
     logger.warning("OPENAI_API_KEY environment variable not set. ChatGPT features will not work.")
 
+# Model used for the analysis endpoints
+CHAT_MODEL = "gpt-4-turbo"
+
+# Batch endpoint limits (override through environment variables)
+BATCH_MAX_IDEAS = int(os.environ.get("BATCH_MAX_IDEAS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))  # Analyses in flight per batch
+
 app = FastAPI()
 
+# Identical analysis requests that arrive while one is in flight share its upstream call
+chat_flights = SingleFlight()
+
+# Metrics served on /metrics
+analysis_results = Counter(
+    "analysis_results_total",
+    "Analysis results by analysis and source (chatgpt, chatgpt_cache, static_template, fallback_template, error)",
+    ("analysis", "source"),
+)
+register_cache("response", response_cache)
+register_cache("template_memo", agent_memo)
+CallbackMetric("llm_requests_in_flight", "Chat completion calls holding a gateway slot", "gauge", lambda: gateway.in_flight)
+CallbackMetric("coalesced_requests_total", "Analysis requests that shared another request's upstream call", "counter", lambda: chat_flights.coalesced)
+
+# Import the template agents and the OpenAI SDK in the background once the server is up,
+# so neither slows down startup nor the first request that needs them
+@app.on_event("startup")
+def warm_up_dependencies():
+    warm_up(*(analysis["template"].resolve for analysis in ANALYSES.values()), partial(importlib.import_module, "openai"))
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    await gateway.aclose()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +73,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record request metrics; added last so it also times the CORS middleware
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
 # Input models
 class ChatRequest(BaseModel):
     query: str
@@ -41,40 +84,77 @@ class IdeaRequest(BaseModel):
     idea: str
     additional_context: Optional[Dict[str, Any]] = None
     conversation_history: Optional[List[Dict[str, Any]]] = None  # Chat history for context
+    bypass_cache: bool = False  # Skip the response cache and force a fresh completion
+
+class AnalyzeRequest(IdeaRequest):
+    analyses: Optional[List[str]] = None  # Analyses to run; defaults to all of them
+
+class BatchAnalyzeRequest(BaseModel):
+    ideas: List[str]
+    analyses: Optional[List[str]] = None  # Analyses to run for every idea; defaults to all of them
+    additional_context: Optional[Dict[str, Any]] = None  # Shared by every idea
+    conversation_history: Optional[List[Dict[str, Any]]] = None
+    bypass_cache: bool = False
 
-def call_chatgpt_api(prompt, system_message=None, conversation_history=None):
-    """Call the ChatGPT API with the given prompt and return the response."""
+def build_messages(prompt, system_message=None, conversation_history=None):
+    """Assemble the chat messages for a prompt, system message and conversation history."""
+    messages = []
+    
+    # Add system message if provided
+    if system_message:
+        messages.append({"role": "system", "content": system_message})
+        
+    # Add conversation history if provided
+    if conversation_history:
+        for message in conversation_history:
+            if message.get("role") and message.get("content"):
+                messages.append({
+                    "role": message["role"],
+                    "content": message["content"]
+                })
+    
+    # Add the main prompt
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+async def call_chatgpt_api(prompt, system_message=None, conversation_history=None, bypass_cache=False):
+    """Call the ChatGPT API with the given prompt and return the response.
+
+    The call goes through the shared async gateway, so waiting on OpenAI does not
+    block the event loop and other requests keep being served. Responses are cached
+    by (model, system message, prompt, history); cache hits carry "cached": True.
+    Concurrent calls with the same key share one upstream request.
+    """
     try:
-        if not openai.api_key:
+        if not OPENAI_API_KEY:
             return {"error": "OpenAI API key not configured"}
         
-        messages = []
+        use_cache = RESPONSE_CACHE_ENABLED and not bypass_cache
+        cache_key = make_cache_key(CHAT_MODEL, system_message, prompt, conversation_history)
+        if use_cache:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                return {"response": cached, "cached": True}
         
-        # Add system message if provided
-        if system_message:
-            messages.append({"role": "system", "content": system_message})
-            
-        # Add conversation history if provided
-        if conversation_history:
-            for message in conversation_history:
-                if message.get("role") and message.get("content"):
-                    messages.append({
-                        "role": message["role"],
-                        "content": message["content"]
-                    })
+        messages = build_messages(prompt, system_message, conversation_history)
         
-        # Add the main prompt
-        messages.append({"role": "user", "content": prompt})
+        async def complete():
+            # Call the API
+            content = await gateway.chat(
+                messages,
+                model=CHAT_MODEL,
+                temperature=0.7,
+                max_tokens=2500
+            )
+            
+            if RESPONSE_CACHE_ENABLED and content:
+                await response_cache.aset(cache_key, content)
+            return content
         
-        # Call the API
-        response = openai.chat.completions.create(
-            model="gpt-4-turbo",  # Use an appropriate model
-            messages=messages,
-            temperature=0.7,
-            max_tokens=2500
-        )
+        # Concurrent identical requests (double clicks, several tabs) wait on one call
+        content = await chat_flights.do(cache_key, complete)
         
-        return {"response": response.choices[0].message.content}
+        return {"response": content}
     except Exception as e:
         logger.error(f"Error calling ChatGPT API: {str(e)}")
         return {"error": str(e)}
@@ -83,6 +163,32 @@ def call_chatgpt_api(prompt, system_message=None, conversation_history=None):
 def read_root():
     return {"message": "Welcome to LeapGPT API"}
 
+@app.get("/stats")
+def stats():
+    """
+    Report response cache and request coalescing counters
+    """
+    return {
+        "response_cache": {
+            "hits": response_cache.hits,
+            "misses": response_cache.misses,
+            "hit_ratio": response_cache.hit_ratio,
+        },
+        "coalescing": {
+            "upstream_calls": chat_flights.calls,
+            "coalesced_requests": chat_flights.coalesced,
+            "in_flight": chat_flights.in_flight,
+        },
+        "llm_in_flight": gateway.in_flight,
+    }
+
+@app.get("/metrics")
+def metrics():
+    """
+    Report request, upstream call and cache metrics in the Prometheus text format
+    """
+    return metrics_response()
+
 @app.post("/chat")
 async def chat(request: ChatRequest):
     """
@@ -109,17 +215,12 @@ async def chat(request: ChatRequest):
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/build-plan")
-async def build_plan(request: IdeaRequest):
-    """
-    Generate a build plan for a business idea using ChatGPT
-    """
-    try:
-        logger.info(f"Build plan request received for idea: {request.idea[:100]}...")
-        
-        # If ChatGPT is enabled, use it for dynamic analysis
-        if openai.api_key:
-            system_message = """You are a business and startup expert who provides detailed, actionable build plans.
+# Per-endpoint analysis configuration: system message, prompt instructions and
+# the static template used when ChatGPT is unavailable (imported on first use)
+ANALYSES = {
+    "build-plan": {
+        "label": "Build plan",
+        "system_message": """You are a business and startup expert who provides detailed, actionable build plans.
             Analyze the business idea and provide a comprehensive plan for building the business from scratch. 
             Include: 
             1. Timelines with specific durations for MVP, beta, and launch phases
@@ -131,63 +232,14 @@ async def build_plan(request: IdeaRequest):
             
             Format your response in a clean, structured markdown format with clear headings and bullet points.
             Make it specific to the exact type of business (tech startup, service business, retail, etc.).
-            For tech businesses, include specific technologies. For physical businesses, include regulatory and location considerations."""
-            
-            # Build context from conversation history if available
-            context = ""
-            if request.conversation_history:
-                for message in request.conversation_history:
-                    if message.get("role") == "user" and message.get("content"):
-                        context += f"User mentioned: {message['content']}\n"
-            
-            # Create the prompt
-            prompt = f"""Business Idea: {request.idea}
-
-            {context if context else ""}
-            
-            Please create a detailed build plan for this business idea, following the format specified in the system message.
-            Include specific steps, timelines, resources needed, and technologies required."""
-            
-            result = call_chatgpt_api(prompt, system_message, request.conversation_history)
-            
-            # Check if there's an error
-            if "error" in result:
-                logger.error(f"Error calling ChatGPT: {result['error']}")
-                # Fall back to the static template
-                result = generate_build_plan(request.idea, request.additional_context)
-                result["source"] = "fallback_template"
-            else:
-                # Process the ChatGPT response
-                content = result["response"]
-                result = {
-                    "source": "chatgpt",
-                    "content": content,
-                    "raw_content": content
-                }
-            
-        else:
-            # Use the static template as fallback
-            result = generate_build_plan(request.idea, request.additional_context)
-            result["source"] = "static_template"
-        
-        logger.info("Build plan generated successfully")
-        return result
-    except Exception as e:
-        logger.error(f"Error in build-plan endpoint: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/longevity-prediction")
-async def longevity_prediction(request: IdeaRequest):
-    """
-    Predict the market longevity of a business idea using ChatGPT
-    """
-    try:
-        logger.info(f"Longevity prediction request received for idea: {request.idea[:100]}...")
-        
-        # If ChatGPT is enabled, use it for dynamic analysis
-        if openai.api_key:
-            system_message = """You are a market research and trend analysis expert who provides detailed longevity predictions for business ideas.
+            For tech businesses, include specific technologies. For physical businesses, include regulatory and location considerations.""",
+        "instructions": """Please create a detailed build plan for this business idea, following the format specified in the system message.
+            Include specific steps, timelines, resources needed, and technologies required.""",
+        "template": lazy_import("agents.build_agent", "generate_build_plan"),
+    },
+    "longevity-prediction": {
+        "label": "Longevity prediction",
+        "system_message": """You are a market research and trend analysis expert who provides detailed longevity predictions for business ideas.
             Analyze the business idea and predict its market longevity, providing a comprehensive analysis.
             Include:
             1. Overall longevity score (out of 100)
@@ -198,63 +250,14 @@ async def longevity_prediction(request: IdeaRequest):
             6. Market factors that could affect longevity
             
             Format your response in a clean, structured markdown format with clear headings and bullet points.
-            Use a data-driven approach with specific metrics and predictions."""
-            
-            # Build context from conversation history if available
-            context = ""
-            if request.conversation_history:
-                for message in request.conversation_history:
-                    if message.get("role") == "user" and message.get("content"):
-                        context += f"User mentioned: {message['content']}\n"
-            
-            # Create the prompt
-            prompt = f"""Business Idea: {request.idea}
-
-            {context if context else ""}
-            
-            Please create a detailed market longevity prediction for this business idea, following the format specified in the system message.
-            Include specific metrics, trend analysis, and predictions."""
-            
-            result = call_chatgpt_api(prompt, system_message, request.conversation_history)
-            
-            # Check if there's an error
-            if "error" in result:
-                logger.error(f"Error calling ChatGPT: {result['error']}")
-                # Fall back to the static template
-                result = predict_longevity(request.idea, request.additional_context)
-                result["source"] = "fallback_template"
-            else:
-                # Process the ChatGPT response
-                content = result["response"]
-                result = {
-                    "source": "chatgpt",
-                    "content": content,
-                    "raw_content": content
-                }
-                
-        else:
-            # Use the static template as fallback
-            result = predict_longevity(request.idea, request.additional_context)
-            result["source"] = "static_template"
-        
-        logger.info("Longevity prediction generated successfully")
-        return result
-    except Exception as e:
-        logger.error(f"Error in longevity-prediction endpoint: {str(e)}")
-        logger.error(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/market-analysis")
-async def market_analysis(request: IdeaRequest):
-    """
-    Analyze the market for a business idea using ChatGPT
-    """
-    try:
-        logger.info(f"Market analysis request received for idea: {request.idea[:100]}...")
-        
-        # If ChatGPT is enabled, use it for dynamic analysis
-        if openai.api_key:
-            system_message = """You are a consumer market analysis expert who provides detailed market analysis for business ideas.
+            Use a data-driven approach with specific metrics and predictions.""",
+        "instructions": """Please create a detailed market longevity prediction for this business idea, following the format specified in the system message.
+            Include specific metrics, trend analysis, and predictions.""",
+        "template": lazy_import("agents.longevity_agent", "predict_longevity"),
+    },
+    "market-analysis": {
+        "label": "Market analysis",
+        "system_message": """You are a consumer market analysis expert who provides detailed market analysis for business ideas.
             Analyze the business idea and provide a comprehensive market analysis.
             Include:
             1. Target market segments with demographics
@@ -265,52 +268,274 @@ async def market_analysis(request: IdeaRequest):
             6. Consumer sentiment overview
             
             Format your response in a clean, structured markdown format with clear headings and bullet points.
-            Use a data-driven approach with specific metrics and insights."""
-            
-            # Build context from conversation history if available
-            context = ""
-            if request.conversation_history:
-                for message in request.conversation_history:
-                    if message.get("role") == "user" and message.get("content"):
-                        context += f"User mentioned: {message['content']}\n"
-            
-            # Create the prompt
-            prompt = f"""Business Idea: {request.idea}
+            Use a data-driven approach with specific metrics and insights.""",
+        "instructions": """Please create a detailed consumer market analysis for this business idea, following the format specified in the system message.
+            Include specific demographics, market sizes, pain points, and recommendations.""",
+        "template": lazy_import("agents.market_agent", "analyze_market"),
+    },
+}
 
-            {context if context else ""}
-            
-            Please create a detailed consumer market analysis for this business idea, following the format specified in the system message.
-            Include specific demographics, market sizes, pain points, and recommendations."""
-            
-            result = call_chatgpt_api(prompt, system_message, request.conversation_history)
-            
-            # Check if there's an error
-            if "error" in result:
-                logger.error(f"Error calling ChatGPT: {result['error']}")
-                # Fall back to the static template
-                result = analyze_market(request.idea, request.additional_context)
-                result["source"] = "fallback_template"
-            else:
-                # Process the ChatGPT response
-                content = result["response"]
-                result = {
-                    "source": "chatgpt",
-                    "content": content,
-                    "raw_content": content
-                }
-                
+def build_analysis_prompt(analysis, request: IdeaRequest):
+    """Build the user prompt for an analysis; the conversation history travels as messages."""
+    return build_idea_prompt(request.idea, analysis["instructions"])
+
+def analysis_history(request: IdeaRequest):
+    """The request's conversation history, fitted into the prompt token budget."""
+    return fit_history(request.conversation_history, model=CHAT_MODEL)
+
+def run_template(analysis, request: IdeaRequest, source: str):
+    """Run the static template agent for an analysis and tag the result with its source."""
+    result = analysis["template"](request.idea, request.additional_context)
+    result["source"] = source
+    return result
+
+async def run_analysis(name: str, request: IdeaRequest):
+    """Run an analysis with ChatGPT, falling back to the static template on failure."""
+    analysis = ANALYSES[name]
+    
+    # If ChatGPT is enabled, use it for dynamic analysis
+    if not OPENAI_API_KEY:
+        # Use the static template as fallback
+        analysis_results.labels(name, "static_template").inc()
+        return await run_in_threadpool(run_template, analysis, request, "static_template")
+    
+    prompt = build_analysis_prompt(analysis, request)
+    result = await call_chatgpt_api(
+        prompt, analysis["system_message"], analysis_history(request), bypass_cache=request.bypass_cache
+    )
+    
+    # Check if there's an error
+    if "error" in result:
+        logger.error(f"Error calling ChatGPT: {result['error']}")
+        # Fall back to the static template
+        analysis_results.labels(name, "fallback_template").inc()
+        return await run_in_threadpool(run_template, analysis, request, "fallback_template")
+    
+    # Process the ChatGPT response
+    content = result["response"]
+    source = "chatgpt_cache" if result.get("cached") else "chatgpt"
+    analysis_results.labels(name, source).inc()
+    return {
+        "source": source,
+        "content": content,
+        "raw_content": content
+    }
+
+async def stream_analysis(name: str, request: IdeaRequest):
+    """
+    Stream an analysis as Server-Sent Events.
+
+    ChatGPT output is sent as "token" events followed by a "done" event; a cached response
+    is sent as one token. If ChatGPT is disabled or fails before the first token, the static
+    template is sent as a single "result" event instead.
+    """
+    analysis = ANALYSES[name]
+    
+    if not OPENAI_API_KEY:
+        analysis_results.labels(name, "static_template").inc()
+        yield format_sse(await run_in_threadpool(run_template, analysis, request, "static_template"), event="result")
+        return
+    
+    prompt = build_analysis_prompt(analysis, request)
+    history = analysis_history(request)
+    cache_key = make_cache_key(CHAT_MODEL, analysis["system_message"], prompt, history)
+    if RESPONSE_CACHE_ENABLED and not request.bypass_cache:
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            analysis_results.labels(name, "chatgpt_cache").inc()
+            yield format_sse({"content": cached}, event="token")
+            yield format_sse({"source": "chatgpt_cache"}, event="done")
+            return
+    
+    messages = build_messages(prompt, analysis["system_message"], history)
+    sent_tokens = False
+    parts = []
+    try:
+        # Close the upstream stream (and free its gateway slot) as soon as this generator stops,
+        # including when the client disconnects
+        async with aclosing(gateway.stream_chat(messages, model=CHAT_MODEL, temperature=0.7, max_tokens=2500)) as tokens:
+            async for token in tokens:
+                sent_tokens = True
+                parts.append(token)
+                yield format_sse({"content": token}, event="token")
+    except Exception as e:
+        logger.error(f"Error streaming from ChatGPT: {str(e)}")
+        if sent_tokens:
+            # Part of the answer is already on the wire, so report the error instead
+            analysis_results.labels(name, "error").inc()
+            yield format_sse({"error": str(e)}, event="error")
         else:
-            # Use the static template as fallback
-            result = analyze_market(request.idea, request.additional_context)
-            result["source"] = "static_template"
-        
-        logger.info("Market analysis generated successfully")
+            analysis_results.labels(name, "fallback_template").inc()
+            yield format_sse(await run_in_threadpool(run_template, analysis, request, "fallback_template"), event="result")
+        return
+    
+    if RESPONSE_CACHE_ENABLED and parts:
+        await response_cache.aset(cache_key, "".join(parts))
+    analysis_results.labels(name, "chatgpt").inc()
+    yield format_sse({"source": "chatgpt"}, event="done")
+
+async def handle_analysis(name: str, request: IdeaRequest):
+    """Shared request handling for the analysis endpoints."""
+    label = ANALYSES[name]["label"]
+    try:
+        logger.info(f"{label} request received for idea: {request.idea[:100]}...")
+        result = await run_analysis(name, request)
+        logger.info(f"{label} generated successfully")
         return result
     except Exception as e:
-        logger.error(f"Error in market-analysis endpoint: {str(e)}")
+        logger.error(f"Error in {name} endpoint: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+def handle_analysis_stream(name: str, request: IdeaRequest):
+    """Shared request handling for the streaming analysis endpoints."""
+    logger.info(f"{ANALYSES[name]['label']} stream requested for idea: {request.idea[:100]}...")
+    return StreamingResponse(stream_analysis(name, request), media_type="text/event-stream", headers=SSE_HEADERS)
+
+def requested_analyses(request) -> List[str]:
+    """Validate the analyses named in a combined request, keeping their order and dropping repeats."""
+    names = list(dict.fromkeys(request.analyses or ANALYSES))
+    unknown = [name for name in names if name not in ANALYSES]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown analyses: {', '.join(unknown)}. Choose from: {', '.join(ANALYSES)}"
+        )
+    return names
+
+async def run_named_analysis(name: str, request: IdeaRequest):
+    """Run one analysis of a combined request, reporting a failure as that analysis' result."""
+    try:
+        return name, await run_analysis(name, request)
+    except Exception as e:
+        logger.error(f"Error in {name} analysis: {str(e)}")
+        logger.error(traceback.format_exc())
+        return name, {"error": str(e)}
+
+async def stream_analyses(names: List[str], request: AnalyzeRequest):
+    """
+    Stream the analyses of a combined request as Server-Sent Events.
+
+    Each analysis is sent as one "result" event, tagged with its name, as soon as it finishes;
+    a final "done" event follows the last one.
+    """
+    for task in asyncio.as_completed([run_named_analysis(name, request) for name in names]):
+        name, result = await task
+        yield format_sse({"analysis": name, **result}, event="result")
+    yield format_sse({"analyses": names}, event="done")
+
+@app.post("/analyze")
+async def analyze(request: AnalyzeRequest):
+    """
+    Run several analyses of a business idea concurrently and return them together
+    """
+    names = requested_analyses(request)
+    logger.info(f"Analyses {', '.join(names)} requested for idea: {request.idea[:100]}...")
+    results = await asyncio.gather(*(run_named_analysis(name, request) for name in names))
+    return {"results": dict(results)}
+
+@app.post("/analyze/stream")
+async def analyze_stream(request: AnalyzeRequest):
+    """
+    Run several analyses of a business idea concurrently and stream each one as it finishes
+    """
+    names = requested_analyses(request)
+    logger.info(f"Analyses {', '.join(names)} streamed for idea: {request.idea[:100]}...")
+    return StreamingResponse(stream_analyses(names, request), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def run_batch_item(index: int, idea: str, names: List[str], request: BatchAnalyzeRequest, semaphore: asyncio.Semaphore):
+    """Run the requested analyses for one idea of a batch; a failure becomes this idea's "error"."""
+    try:
+        idea_request = IdeaRequest(
+            idea=idea,
+            additional_context=request.additional_context,
+            conversation_history=request.conversation_history,
+            bypass_cache=request.bypass_cache,
+        )
+        
+        async def limited(name):
+            async with semaphore:
+                return await run_named_analysis(name, idea_request)
+        
+        results = await asyncio.gather(*(limited(name) for name in names))
+        return {"index": index, "idea": idea, "results": dict(results)}
+    except Exception as e:
+        logger.error(f"Error in batch item {index}: {str(e)}")
+        return {"index": index, "idea": idea, "error": str(e)}
+
+async def stream_batch(names: List[str], request: BatchAnalyzeRequest):
+    """
+    Stream a batch as NDJSON, one line per idea in completion order.
+
+    At most BATCH_MAX_CONCURRENCY analyses of the batch run at once. Each line carries the
+    idea's index in the request, so clients can restore the input order.
+    """
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(run_batch_item(index, idea, names, request, semaphore))
+        for index, idea in enumerate(request.ideas)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield json.dumps(await task) + "\n"
+    finally:
+        # The client went away or the stream was closed early: stop the remaining work
+        for task in tasks:
+            task.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """
+    Analyze many business ideas and stream one NDJSON line per idea as each completes
+    """
+    names = requested_analyses(request)
+    if len(request.ideas) > BATCH_MAX_IDEAS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {BATCH_MAX_IDEAS} ideas")
+    logger.info(f"Batch of {len(request.ideas)} ideas received for analyses {', '.join(names)}")
+    return StreamingResponse(stream_batch(names, request), media_type="application/x-ndjson")
+
+@app.post("/build-plan")
+async def build_plan(request: IdeaRequest):
+    """
+    Generate a build plan for a business idea using ChatGPT
+    """
+    return await handle_analysis("build-plan", request)
+
+@app.post("/build-plan/stream")
+async def build_plan_stream(request: IdeaRequest):
+    """
+    Stream a build plan for a business idea as Server-Sent Events
+    """
+    return handle_analysis_stream("build-plan", request)
+
+@app.post("/longevity-prediction")
+async def longevity_prediction(request: IdeaRequest):
+    """
+    Predict the market longevity of a business idea using ChatGPT
+    """
+    return await handle_analysis("longevity-prediction", request)
+
+@app.post("/longevity-prediction/stream")
+async def longevity_prediction_stream(request: IdeaRequest):
+    """
+    Stream a market longevity prediction for a business idea as Server-Sent Events
+    """
+    return handle_analysis_stream("longevity-prediction", request)
+
+@app.post("/market-analysis")
+async def market_analysis(request: IdeaRequest):
+    """
+    Analyze the market for a business idea using ChatGPT
+    """
+    return await handle_analysis("market-analysis", request)
+
+@app.post("/market-analysis/stream")
+async def market_analysis_stream(request: IdeaRequest):
+    """
+    Stream a market analysis for a business idea as Server-Sent Events
+    """
+    return handle_analysis_stream("market-analysis", request)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
@@ -1,15 +1,28 @@
 import os
-from openai import OpenAI
+import time
+import logging
 from dotenv import load_dotenv
-from pinecone import Pinecone
+from embedding_store import embed_text, embedding_store
+from vector_store import get_vector_store, QueryResult
+from lexical_index import lexical_index, reciprocal_rank_fusion
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any
+from sse import format_sse, SSE_HEADERS
+from metrics import MetricsMiddleware, metrics_response, observe_llm_call, register_cache
+from prompt_builder import message_tokens
+from tracing import LOG_FORMAT, TracingMiddleware, install_log_filter, span, start_span
+from startup import lazy, warm_up
 
 # Load environment variables
 load_dotenv()
 
+# Configure logging; lines written inside a traced request end with its trace and span IDs
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+install_log_filter()
+
 # Initialize FastAPI
 app = FastAPI(title="LeapGPT API", description="API for LeapGPT, a RAG/LLM Chatbot trained on consulting firm white papers")
 
@@ -22,37 +35,79 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-openai_client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+# Trace sampled requests stage by stage (TRACE_SAMPLE_RATE)
+app.add_middleware(TracingMiddleware)
 
-# Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = "leapgpt"
-index = pc.Index(index_name)
+# Record request metrics; added last so it also times the CORS middleware
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+register_cache("embedding_store", embedding_store)
 
-# Generate embeddings using OpenAI
-def generate_embedding(text):
-    response = openai_client.embeddings.create(
-        input=text,
-        model="text-embedding-3-large"
+# OpenAI client, created on first use so importing this module needs no credentials
+@lazy
+def openai_client():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY")
     )
-    return response.data[0].embedding
 
-# Query Pinecone for relevant documents
+# Vector store (Pinecone by default, or the local Chroma index), connected on first use
+@lazy
+def vector_store():
+    return get_vector_store()
+
+# Connect in the background once the server is up, so the first request does not wait
+@app.on_event("startup")
+def warm_up_clients():
+    warm_up(openai_client, vector_store)
+
+# Generate embeddings using OpenAI, reusing vectors from the local embedding store
+def generate_embedding(text):
+    with span("generate_embedding", text_chars=len(text)):
+        return embed_text(openai_client(), text)
+
+# Hybrid retrieval settings: BM25 over the lexical index fused with vector search
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") != "0"
+# The lexical-only fast path is opt-in until its answer quality has been benchmarked
+LEXICAL_FASTPATH = os.getenv("LEXICAL_FASTPATH", "0") == "1"
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+
+# Query the vector store for relevant documents
 def query_pinecone(query, top_k=5):
-    query_embedding = generate_embedding(query)
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        include_metadata=True,
-        namespace="default"
-    )
-    return results
+    use_lexical = HYBRID_SEARCH and lexical_index.count > 0
+    candidates = max(top_k, RETRIEVAL_CANDIDATES) if use_lexical else top_k
 
-# Generate response using OpenAI GPT-4
-def generate_response(query, relevant_documents):
+    with span("query_pinecone", top_k=top_k, candidates=candidates, hybrid=use_lexical) as stage:
+        lexical_matches = []
+        if use_lexical:
+            with span("lexical_search", top_k=candidates) as lexical:
+                hits = lexical_index.search(query, top_k=candidates)
+                lexical.set(matches=len(hits))
+            lexical_matches = [{"id": record["id"], "score": score, "metadata": record["metadata"]} for record, score in hits]
+            # Confident lexical matches (e.g. acronyms and firm names) skip the embeddings call entirely
+            if LEXICAL_FASTPATH and lexical_index.is_confident(query, hits, top_k):
+                stage.set(lexical_fastpath=True, matches=min(top_k, len(lexical_matches)))
+                return QueryResult(matches=lexical_matches[:top_k])
+
+        # Stores that embed text themselves take the query text and skip the embeddings call
+        store = vector_store()
+        query_embedding = generate_embedding(query) if store.needs_query_vector else None
+        with span("vector_query", top_k=candidates) as vector:
+            results = store.query(vector=query_embedding, top_k=candidates, text=query)
+            vector.set(matches=len(results.matches))
+        if not lexical_matches:
+            matches = results.matches[:top_k]
+        else:
+            matches = reciprocal_rank_fusion([results.matches, lexical_matches], top_k=top_k)
+        stage.set(lexical_fastpath=False, matches=len(matches))
+        return QueryResult(matches=matches)
+
+# Size of the retrieved context, recorded on the generation span of traced requests
+def context_attributes(relevant_documents):
+    texts = [match['metadata']["text"] for match in relevant_documents.matches]
+    return {"context_docs": len(texts), "context_chars": sum(len(text) for text in texts)}
+
+# Build the system prompt from the retrieved documents
+def build_system_prompt(relevant_documents):
     # Extract text from matches - handle new response format
     combined_text = "\n\n".join([match['metadata']["text"] for match in relevant_documents.matches])
 
@@ -66,15 +121,83 @@ def generate_response(query, relevant_documents):
     The data:
     {combined_text}
     """
+    return system_prompt
 
-    response = openai_client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": query}
-        ]
-    )
-    return response.choices[0].message.content
+CHAT_MODEL = "gpt-4"
+
+# Generate response using OpenAI GPT-4
+def generate_response(query, relevant_documents):
+    with span("generate_response", model=CHAT_MODEL) as stage:
+        if stage.recording:
+            stage.set(**context_attributes(relevant_documents))
+        start = time.perf_counter()
+        response = None
+        try:
+            response = openai_client().chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[
+                    {"role": "system", "content": build_system_prompt(relevant_documents)},
+                    {"role": "user", "content": query}
+                ]
+            )
+        finally:
+            usage = getattr(response, "usage", None)
+            prompt_tokens = usage.prompt_tokens if usage else 0
+            completion_tokens = usage.completion_tokens if usage else 0
+            observe_llm_call(
+                CHAT_MODEL,
+                "chat",
+                time.perf_counter() - start,
+                response is not None,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
+            stage.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return response.choices[0].message.content
+
+# Stream a response using OpenAI GPT-4, yielding content deltas as they arrive.
+# Streams carry no usage block, so tokens are estimated (one per content delta).
+# The span is not made current: a generator may resume in a different context on each step.
+def stream_response(query, relevant_documents):
+    messages = [
+        {"role": "system", "content": build_system_prompt(relevant_documents)},
+        {"role": "user", "content": query}
+    ]
+    stage = start_span("generate_response", model=CHAT_MODEL, stream=True)
+    if stage.recording:
+        stage.set(**context_attributes(relevant_documents))
+    start = time.perf_counter()
+    deltas = 0
+    ok = False
+    error = None
+    try:
+        stream = openai_client().chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not deltas:
+                    stage.set(ttft_ms=round((time.perf_counter() - start) * 1000.0, 1))
+                deltas += 1
+                yield chunk.choices[0].delta.content
+        ok = True
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        prompt_tokens = sum(message_tokens(message, CHAT_MODEL) for message in messages)
+        observe_llm_call(
+            CHAT_MODEL,
+            "stream",
+            time.perf_counter() - start,
+            ok,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=deltas,
+        )
+        stage.set(prompt_tokens=prompt_tokens, completion_tokens=deltas, completed=ok)
+        stage.end(error=error)
 
 # Pydantic models for API
 class ChatRequest(BaseModel):
@@ -88,6 +211,10 @@ class ChatResponse(BaseModel):
 def read_root():
     return {"message": "Welcome to LeapGPT API"}
 
+@app.get("/metrics")
+def metrics():
+    return metrics_response()
+
 @app.post("/chat", response_model=ChatResponse)
 def chat(request: ChatRequest):
     try:
@@ -101,6 +228,21 @@ def chat(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Server-Sent Events: "token" events with content deltas, then "done" (or "error")
+def chat_events(query):
+    try:
+        results = query_pinecone(query)
+        for token in stream_response(query, results):
+            yield format_sse({"content": token}, event="token")
+    except Exception as e:
+        yield format_sse({"error": str(e)}, event="error")
+        return
+    yield format_sse({"source": "rag"}, event="done")
+
+@app.post("/chat/stream")
+def chat_stream(request: ChatRequest):
+    return StreamingResponse(chat_events(request.query), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # Main chat loop for CLI usage
 def main():
     print("Type 'clear' to end the chat.")
@@ -111,11 +253,12 @@ def main():
             print("Ending the chat. Goodbye!")
             break
 
-        # Query Pinecone for relevant documents
-        results = query_pinecone(user_query)
+        with span("chat", query_chars=len(user_query)):
+            # Query Pinecone for relevant documents
+            results = query_pinecone(user_query)
 
-        # Generate response using OpenAI
-        ai_response = generate_response(user_query, results)
+            # Generate response using OpenAI
+            ai_response = generate_response(user_query, results)
         print("\n\n---------------------\n\n")
         print(ai_response)
 
@@ -0,0 +1,361 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from sample_ideas import SAMPLE_IDEAS
+
+logger = logging.getLogger(__name__)
+
+# The memoized agent cases need the deterministic template mode; read when the agents are imported
+os.environ.setdefault("TEMPLATE_DETERMINISTIC", "1")
+
+# Benchmark defaults (override on the command line)
+BENCH_ITERATIONS = 200
+BENCH_WARMUP = 10
+# Operations measured under tracemalloc per case; tracing slows calls down, so it runs as a separate pass
+BENCH_ALLOC_ITERATIONS = 20
+# Relative slowdown of p50 or p95 against the baseline that counts as a regression
+BENCH_REGRESSION_THRESHOLD = 0.10
+
+# Canned completion returned by the stubbed LLM
+STUB_RESPONSE = (
+    "## Summary\nThis idea targets a growing market with clear pain points. "
+    "Start with a narrow MVP, validate demand with early adopters and expand once retention is proven. " * 8
+)
+
+
+def idea_for(i: int) -> str:
+    """A distinct idea per iteration, so neither the memo, the response cache nor coalescing hides the work."""
+    return f"{SAMPLE_IDEAS[i % len(SAMPLE_IDEAS)]} (variant {i})"
+
+
+def summarize(latencies: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput (operations per second) of one case."""
+    values = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return {
+        "iterations": len(latencies),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "throughput_ops": round(len(latencies) / wall_seconds, 1) if wall_seconds > 0 else None,
+    }
+
+
+class AllocationTrace:
+    """
+    Memory allocated per operation, traced with tracemalloc
+
+    peak_kib is the largest peak above the starting point seen during one operation,
+    retained_kib the average memory still held after an operation (caches, leaks).
+    """
+
+    def __init__(self):
+        self.peaks: List[int] = []
+        self.retained: List[int] = []
+
+    def __enter__(self) -> "AllocationTrace":
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        tracemalloc.stop()
+
+    @contextmanager
+    def operation(self) -> Iterator[None]:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        yield
+        after, peak = tracemalloc.get_traced_memory()
+        self.peaks.append(peak - before)
+        self.retained.append(after - before)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "peak_kib": round(max(self.peaks) / 1024, 1),
+            "retained_kib": round(sum(self.retained) / len(self.retained) / 1024, 1),
+        }
+
+
+def bench_sync(fn: Callable[[int], Any], iterations: int, warmup: int, alloc_iterations: int) -> Dict[str, Any]:
+    """Time a synchronous operation one call at a time."""
+    for i in range(warmup):
+        fn(i)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(warmup + i)
+        latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - start)
+    if alloc_iterations:
+        with AllocationTrace() as trace:
+            for i in range(alloc_iterations):
+                with trace.operation():
+                    fn(warmup + iterations + i)
+        result.update(trace.summary())
+    return result
+
+
+async def bench_async(
+    fn: Callable[[int], Awaitable[Any]],
+    iterations: int,
+    warmup: int,
+    alloc_iterations: int,
+    concurrency: int = 1,
+) -> Dict[str, Any]:
+    """Time an async operation with up to `concurrency` operations in flight."""
+    for i in range(warmup):
+        await fn(i)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            await fn(i)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(warmup + i) for i in range(iterations)))
+    result = summarize(latencies, time.perf_counter() - start)
+
+    if alloc_iterations:
+        with AllocationTrace() as trace:
+            for i in range(alloc_iterations):
+                with trace.operation():
+                    await fn(warmup + iterations + i)
+        result.update(trace.summary())
+    return result
+
+
+def agent_cases() -> Dict[str, Callable[[int], Any]]:
+    """The template agents, called directly: cold (memo cleared) and memoized."""
+    from agents.agent_cache import agent_memo
+    from agents.build_agent import generate_build_plan
+    from agents.longevity_agent import predict_longevity
+    from agents.market_agent import analyze_market
+
+    agents = {
+        "build-plan": generate_build_plan,
+        "longevity-prediction": predict_longevity,
+        "market-analysis": analyze_market,
+    }
+    cases = {}
+    for name, agent in agents.items():
+        def cold(i: int, agent=agent) -> Any:
+            agent_memo.clear()
+            return agent(idea_for(i))
+
+        def memoized(i: int, agent=agent) -> Any:
+            return agent(SAMPLE_IDEAS[0])
+
+        cases[f"agent {name}"] = cold
+        cases[f"agent {name} memoized"] = memoized
+    return cases
+
+
+def stub_llm(gateway, latency: float) -> None:
+    """Replace the gateway's upstream calls with canned answers after `latency` seconds."""
+    async def chat(messages, model=None, temperature=0.7, max_tokens=2500) -> str:
+        await asyncio.sleep(latency)
+        return STUB_RESPONSE
+
+    async def stream_chat(messages, model=None, temperature=0.7, max_tokens=2500):
+        await asyncio.sleep(latency)
+        for word in STUB_RESPONSE.split(" "):
+            yield word + " "
+
+    gateway.chat = chat
+    gateway.stream_chat = stream_chat
+
+
+async def run_endpoint_cases(
+    iterations: int,
+    warmup: int,
+    alloc_iterations: int,
+    concurrency: int,
+    llm_latency: float,
+    only: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark every app.py endpoint in-process through httpx's ASGI transport
+
+    The LLM gateway is stubbed, so the numbers cover request parsing, prompt building,
+    caching, coalescing, template fallbacks and serialization, plus the configured
+    upstream latency. Template cases run with the API key unset.
+    """
+    import httpx
+    import app as app_module
+
+    stub_llm(app_module.gateway, llm_latency)
+    transport = httpx.ASGITransport(app=app_module.app)
+    api_key = app_module.OPENAI_API_KEY
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def post(path: str, body: Dict[str, Any]) -> None:
+            response = await client.post(path, json=body)
+            response.raise_for_status()
+
+        async def get(path: str) -> None:
+            response = await client.get(path)
+            response.raise_for_status()
+
+        def llm(path: str) -> Callable[[int], Awaitable[None]]:
+            return lambda i: post(path, {"idea": idea_for(i), "bypass_cache": True})
+
+        cases: Dict[str, Any] = {
+            "GET /": (lambda i: get("/"), True),
+            "GET /stats": (lambda i: get("/stats"), True),
+            "POST /chat": (lambda i: post("/chat", {"query": idea_for(i)}), True),
+        }
+        for path in ("/build-plan", "/longevity-prediction", "/market-analysis"):
+            cases[f"POST {path}"] = (llm(path), True)
+            cases[f"POST {path}/stream"] = (llm(f"{path}/stream"), True)
+            cases[f"POST {path} template"] = (lambda i, path=path: post(path, {"idea": idea_for(i)}), False)
+        cases["POST /market-analysis cached"] = (lambda i: post("/market-analysis", {"idea": SAMPLE_IDEAS[0]}), True)
+        cases["POST /analyze"] = (llm("/analyze"), True)
+        cases["POST /analyze/stream"] = (llm("/analyze/stream"), True)
+        cases["POST /analyze template"] = (lambda i: post("/analyze", {"idea": idea_for(i)}), False)
+        cases["POST /analyze/batch x10"] = (
+            lambda i: post("/analyze/batch", {"ideas": [idea_for(i * 10 + j) for j in range(10)], "bypass_cache": True}),
+            True,
+        )
+
+        results = {}
+        for name, (fn, with_llm) in cases.items():
+            if only and only not in name:
+                continue
+            app_module.OPENAI_API_KEY = api_key if with_llm else ""
+            try:
+                results[name] = await bench_async(fn, iterations, warmup, alloc_iterations, concurrency)
+            finally:
+                app_module.OPENAI_API_KEY = api_key
+            print_case(name, results[name])
+    return results
+
+
+def print_case(name: str, result: Dict[str, Any]) -> None:
+    memory = f"  peak {result['peak_kib']:>8.1f} KiB" if "peak_kib" in result else ""
+    print(
+        f"{name:<42} p50 {result['p50_ms']:>8.3f} ms  p95 {result['p95_ms']:>8.3f} ms  "
+        f"p99 {result['p99_ms']:>8.3f} ms  {result['throughput_ops']:>9.1f} ops/s{memory}"
+    )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float = BENCH_REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Compare the cases of two runs and return the names of the regressed cases
+
+    A case regresses when its p50 or p95 latency grew by more than `threshold` (relative).
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('timestamp')}):")
+    for setting in ("concurrency", "llm_latency_ms", "cpus"):
+        if results["meta"].get(setting) != baseline["meta"].get(setting):
+            print(f"Warning: {setting} differs ({baseline['meta'].get(setting)} -> {results['meta'].get(setting)}), latencies are not comparable")
+    for name, current in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if not previous:
+            continue
+        changes = {
+            metric: (current[metric] - previous[metric]) / previous[metric] if previous[metric] else 0.0
+            for metric in ("p50_ms", "p95_ms")
+        }
+        regressed = any(change > threshold for change in changes.values())
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<42} p50 {changes['p50_ms']:>+7.1%}  p95 {changes['p95_ms']:>+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark the template agents and the app.py endpoints")
+    parser.add_argument("--iterations", type=int, default=BENCH_ITERATIONS, help="Measured operations per case")
+    parser.add_argument("--warmup", type=int, default=BENCH_WARMUP, help="Unmeasured operations per case")
+    parser.add_argument("--alloc-iterations", type=int, default=BENCH_ALLOC_ITERATIONS, help="Operations traced with tracemalloc per case (0 to skip)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Endpoint requests in flight")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latency of the stubbed LLM calls")
+    parser.add_argument("--suite", choices=("all", "agents", "endpoints"), default="all", help="Cases to run")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--output", "-o", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against; exits with status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=BENCH_REGRESSION_THRESHOLD, help="Relative p50/p95 slowdown that counts as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logging (slower, noisier numbers)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    # The stubbed LLM path needs a key, and benchmark responses must not land in the real response cache
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ["RESPONSE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="leapgpt-bench-"), "responses.sqlite3")
+
+    cases: Dict[str, Dict[str, Any]] = {}
+    if args.suite in ("all", "agents"):
+        for name, fn in agent_cases().items():
+            if args.only and args.only not in name:
+                continue
+            cases[name] = bench_sync(fn, args.iterations, args.warmup, args.alloc_iterations)
+            print_case(name, cases[name])
+    if args.suite in ("all", "endpoints"):
+        cases.update(asyncio.run(run_endpoint_cases(
+            args.iterations, args.warmup, args.alloc_iterations, args.concurrency, args.llm_latency_ms / 1000.0, args.only
+        )))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "cases": cases,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
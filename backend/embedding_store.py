@@ -0,0 +1,355 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, only one writing process is safe
+    fcntl = None
+
+from metrics import observe_embedding_call
+from token_counter import count_tokens
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Embedding settings shared by fill_db.py and ask.py
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMENSIONS = int(os.environ["EMBEDDING_DIMENSIONS"]) if os.environ.get("EMBEDDING_DIMENSIONS") else None
+# Output dimensions of the embedding models when no dimensions are requested
+MODEL_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+EMBEDDING_STORE_ENABLED = os.environ.get("EMBEDDING_STORE_ENABLED", "1") != "0"
+EMBEDDING_STORE_DIR = os.environ.get(
+    "EMBEDDING_STORE_DIR", os.path.join(os.path.dirname(__file__), "cache", "embeddings")
+)
+
+# Batching limits for embedding requests. The API accepts up to 2048 inputs per request;
+# the token budget keeps each request well below its per-request token limit.
+EMBEDDING_BATCH_TOKENS = int(os.environ.get("EMBEDDING_BATCH_TOKENS", "100000"))
+EMBEDDING_BATCH_MAX_INPUTS = int(os.environ.get("EMBEDDING_BATCH_MAX_INPUTS", "2048"))
+EMBEDDING_MAX_CONCURRENCY = int(os.environ.get("EMBEDDING_MAX_CONCURRENCY", "4"))
+
+VECTOR_DTYPE = np.dtype("<f4")
+
+
+def text_hash(text: str) -> str:
+    """Return the sha256 hex digest of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Content-addressed, append-only store of embedding vectors.
+
+    Vectors are appended as raw little-endian float32 to vectors.f32 and read back through
+    a memory map. index.tsv holds one "key<TAB>offset<TAB>dim" line per vector, where the key
+    is model, dimensions and the sha256 of the text. Both files are only ever appended to,
+    so a crash can at worst lose the last few entries.
+
+    Several processes (fill_db.py, ask.py workers) may share a store. Writers hold an
+    exclusive flock on the vectors file while appending, take offsets from the file's
+    actual end, and first read the index lines other processes appended since the last
+    look; readers pick those lines up on a lookup miss.
+    """
+
+    def __init__(self, directory: str = EMBEDDING_STORE_DIR):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.tsv")
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._mmap: Optional[np.memmap] = None
+        self._size = 0  # Number of float32 values in the vectors file
+        self._index_pos = 0  # Bytes of index.tsv read so far
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, dimensions: Optional[int], text: str) -> str:
+        return f"{model}:{dimensions or 0}:{text_hash(text)}"
+
+    def _load(self) -> None:
+        """Read index lines appended since the last call, by this or another process (caller holds the lock)."""
+        try:
+            if os.path.getsize(self.index_path) == self._index_pos:
+                return
+            # Vectors are written before their index lines, so sizing the file first means
+            # every entry read below that fits is complete
+            self._size = os.path.getsize(self.vectors_path) // VECTOR_DTYPE.itemsize
+        except FileNotFoundError:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            tail = f.read()
+        # A line still being written by another process is picked up next time
+        complete = tail[:tail.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            parts = line.split("\t")
+            if len(parts) != 3:
+                continue
+            offset, dim = int(parts[1]), int(parts[2])
+            # Ignore entries whose vector never made it to disk
+            if offset + dim <= self._size:
+                self._index[parts[0]] = (offset, dim)
+        self._index_pos += len(complete)
+
+    def _vectors(self) -> np.memmap:
+        # Re-map after appends so new vectors become visible
+        if self._mmap is None or self._mmap.shape[0] < self._size:
+            self._mmap = np.memmap(self.vectors_path, dtype=VECTOR_DTYPE, mode="r", shape=(self._size,))
+        return self._mmap
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._index)
+
+    def get(self, model: str, dimensions: Optional[int], text: str) -> Optional[np.ndarray]:
+        """Return the stored vector for a text, or None if it has not been embedded yet."""
+        return self.get_many(model, dimensions, [text])[0]
+
+    def get_many(self, model: str, dimensions: Optional[int], texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up several texts at once; missing entries are returned as None."""
+        keys = [self.make_key(model, dimensions, text) for text in texts]
+        with self._lock:
+            locations = [self._index.get(key) for key in keys]
+            if None in locations:
+                # Another process may have stored them since
+                self._load()
+                locations = [self._index.get(key) for key in keys]
+            found = sum(1 for loc in locations if loc is not None)
+            self.hits += found
+            self.misses += len(texts) - found
+            if not found:
+                return [None] * len(texts)
+            vectors = self._vectors()
+            return [
+                np.array(vectors[loc[0]:loc[0] + loc[1]]) if loc is not None else None
+                for loc in locations
+            ]
+
+    def put(self, model: str, dimensions: Optional[int], text: str, vector) -> None:
+        """Store the vector for a text."""
+        self.put_many(model, dimensions, [text], [vector])
+
+    def put_many(self, model: str, dimensions: Optional[int], texts: List[str], vectors) -> None:
+        """Append vectors for several texts; texts that are already stored are skipped."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.vectors_path, "ab") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    self._append(f, model, dimensions, texts, vectors)
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _append(self, f, model: str, dimensions: Optional[int], texts: List[str], vectors) -> None:
+        # Caller holds the lock and the flock on f, the vectors file opened for appending
+        self._load()
+        end = f.seek(0, os.SEEK_END)
+        if end % VECTOR_DTYPE.itemsize:
+            # Torn write from a crashed writer; no index line points at it
+            end = f.truncate(end - end % VECTOR_DTYPE.itemsize)
+        offset = end // VECTOR_DTYPE.itemsize
+        payload = []
+        index_lines = []
+        for text, vector in zip(texts, vectors):
+            key = self.make_key(model, dimensions, text)
+            if key in self._index:
+                continue
+            array = np.asarray(vector, dtype=VECTOR_DTYPE).ravel()
+            payload.append(array)
+            index_lines.append(f"{key}\t{offset}\t{array.shape[0]}\n")
+            self._index[key] = (offset, array.shape[0])
+            offset += array.shape[0]
+        if not payload:
+            return
+        # Write vectors before the index so an index entry never points past the data
+        f.write(np.concatenate(payload).tobytes())
+        f.flush()
+        data = "".join(index_lines).encode("utf-8")
+        with open(self.index_path, "a+b") as index:
+            start = index.seek(0, os.SEEK_END)
+            if start:
+                # Keep a line left unfinished by a crashed writer from swallowing our first one
+                index.seek(start - 1)
+                if index.read(1) != b"\n":
+                    data = b"\n" + data
+            index.write(data)
+        # Only skip past our own lines if nothing was appended in between
+        if start == self._index_pos:
+            self._index_pos += len(data)
+        self._size = offset
+
+
+# Shared store used by fill_db.py and ask.py
+embedding_store = EmbeddingStore()
+
+
+def embedding_dimension(model: str = EMBEDDING_MODEL, dimensions: Optional[int] = EMBEDDING_DIMENSIONS) -> int:
+    """
+    Length of the vectors produced by embed_text and embed_texts
+
+    This is the dimension the vector stores are created with and checked against.
+    """
+    if dimensions:
+        return dimensions
+    if model not in MODEL_DIMENSIONS:
+        raise ValueError(f"Unknown output dimension for embedding model '{model}'; set EMBEDDING_DIMENSIONS")
+    return MODEL_DIMENSIONS[model]
+
+
+def _request_embeddings(client, texts: List[str], model: str, dimensions: Optional[int]) -> List[List[float]]:
+    kwargs = {"input": texts, "model": model}
+    if dimensions:
+        kwargs["dimensions"] = dimensions
+    with span("embeddings_api", model=model, inputs=len(texts)) as stage:
+        start = time.perf_counter()
+        response = None
+        try:
+            response = client.embeddings.create(**kwargs)
+        finally:
+            usage = getattr(response, "usage", None)
+            tokens = usage.prompt_tokens if usage else 0
+            observe_embedding_call(model, time.perf_counter() - start, response is not None, inputs=len(texts), tokens=tokens)
+            stage.set(tokens=tokens)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def embed_text(
+    client,
+    text: str,
+    model: str = EMBEDDING_MODEL,
+    dimensions: Optional[int] = EMBEDDING_DIMENSIONS,
+    store: Optional[EmbeddingStore] = None,
+) -> List[float]:
+    """
+    Embed a text, reusing the local embedding store when the text was embedded before
+
+    Args:
+        client: OpenAI client used on a store miss
+        text: The text to embed
+        model: Embedding model name
+        dimensions: Requested output dimensions, or None for the model default
+        store: Embedding store to use; defaults to the shared store
+
+    Returns:
+        The embedding vector as a list of floats
+    """
+    if not EMBEDDING_STORE_ENABLED:
+        return _request_embeddings(client, [text], model, dimensions)[0]
+
+    store = store if store is not None else embedding_store
+    cached = store.get(model, dimensions, text)
+    if cached is not None:
+        return cached.tolist()
+
+    embedding = _request_embeddings(client, [text], model, dimensions)[0]
+    try:
+        store.put(model, dimensions, text, embedding)
+    except OSError as e:
+        logger.error(f"Failed to persist embedding: {str(e)}")
+    return embedding
+
+
+def plan_batches(
+    texts: List[str],
+    model: str = EMBEDDING_MODEL,
+    max_tokens: int = EMBEDDING_BATCH_TOKENS,
+    max_inputs: int = EMBEDDING_BATCH_MAX_INPUTS,
+) -> List[List[int]]:
+    """Group text positions into request batches that respect the token budget and input limit."""
+    batches = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text, model)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def embed_texts(
+    client,
+    texts: List[str],
+    model: str = EMBEDDING_MODEL,
+    dimensions: Optional[int] = EMBEDDING_DIMENSIONS,
+    store: Optional[EmbeddingStore] = None,
+    max_batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+    max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+) -> List[List[float]]:
+    """
+    Embed many texts with as few API requests as possible
+
+    Texts already in the embedding store are served locally. The remaining unique texts
+    are grouped into batches by token budget, and up to max_concurrency batch requests
+    run at the same time.
+
+    Args:
+        client: OpenAI client used for store misses
+        texts: The texts to embed
+        model: Embedding model name
+        dimensions: Requested output dimensions, or None for the model default
+        store: Embedding store to use; defaults to the shared store
+        max_batch_tokens: Token budget per embeddings request
+        max_concurrency: Maximum number of batch requests in flight
+
+    Returns:
+        One embedding vector per input text, in input order
+    """
+    use_store = EMBEDDING_STORE_ENABLED
+    store = store if store is not None else embedding_store
+    results: List[Optional[List[float]]] = [None] * len(texts)
+
+    if use_store:
+        for i, cached in enumerate(store.get_many(model, dimensions, texts)):
+            if cached is not None:
+                results[i] = cached.tolist()
+
+    # Embed each distinct missing text once
+    missing: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        if results[i] is None:
+            missing.setdefault(text, []).append(i)
+    if not missing:
+        return results
+
+    unique_texts = list(missing)
+    batches = [[unique_texts[i] for i in batch] for batch in plan_batches(unique_texts, model, max_batch_tokens)]
+    logger.info(
+        f"Embedding {len(unique_texts)} texts in {len(batches)} batches "
+        f"({len(texts) - sum(len(v) for v in missing.values())} served from the store)"
+    )
+
+    def run_batch(batch: List[str]) -> List[List[float]]:
+        embeddings = _request_embeddings(client, batch, model, dimensions)
+        if use_store:
+            try:
+                store.put_many(model, dimensions, batch, embeddings)
+            except OSError as e:
+                logger.error(f"Failed to persist embeddings: {str(e)}")
+        return embeddings
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+        for batch, embeddings in zip(batches, executor.map(run_batch, batches)):
+            for text, embedding in zip(batch, embeddings):
+                for i in missing[text]:
+                    results[i] = embedding
+    return results
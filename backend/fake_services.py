@@ -0,0 +1,535 @@
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Stand-in for the OpenAI and Pinecone APIs used by app.py, ask.py and fill_db.py. Point the
+# backend at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1 and
+# PINECONE_CONTROLLER_HOST=http://127.0.0.1:8900 (any API keys are accepted)
+FAKE_SERVICES_PORT = int(os.environ.get("FAKE_SERVICES_PORT", "8900"))
+SERVICES = ("chat", "embeddings", "pinecone")
+DEFAULT_LATENCY = {
+    "chat": "lognormal:800:0.4",
+    "embeddings": "lognormal:80:0.3",
+    "pinecone": "lognormal:30:0.3",
+}
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+OPENAI_UPSTREAM = "https://api.openai.com"
+PINECONE_UPSTREAM = "https://api.pinecone.io"
+# Request headers passed on to the real APIs when recording
+FORWARDED_HEADERS = ("authorization", "api-key", "content-type", "openai-organization", "x-pinecone-api-version")
+
+FILLER = (
+    "The market for this idea is growing steadily, driven by changing consumer habits and falling technology costs. "
+    "Early adopters value convenience and personalization, while larger customers ask for integrations and reliability. "
+    "A focused MVP, a clear pricing model and a measurable retention goal are the most important first steps."
+).split(" ")
+
+
+class LatencyModel:
+    """
+    Response time distribution parsed from a spec string (times in milliseconds)
+
+    fixed:MS, uniform:LOW:HIGH, normal:MEAN:SD or lognormal:MEDIAN:SIGMA
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(value) for value in params]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec {spec!r}; use fixed:MS, uniform:LOW:HIGH, normal:MEAN:SD or lognormal:MEDIAN:SIGMA")
+
+    def sample(self) -> float:
+        """One response time in seconds."""
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(*self.params)
+        elif self.kind == "normal":
+            ms = random.gauss(*self.params)
+        else:
+            ms = self.params[0] * random.lognormvariate(0.0, self.params[1])
+        return max(ms, 0.0) / 1000.0
+
+
+class FakeSettings:
+    """Latency, fault and record/replay settings of a fake services instance."""
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, str]] = None,
+        token_ms: float = 15.0,
+        completion_words: int = 150,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        max_in_flight: int = 0,
+        fault_services: Tuple[str, ...] = SERVICES,
+        retry_after: float = 1.0,
+        record_dir: Optional[str] = None,
+        replay_dir: Optional[str] = None,
+        openai_upstream: str = OPENAI_UPSTREAM,
+        pinecone_upstream: str = PINECONE_UPSTREAM,
+        public_url: str = f"http://127.0.0.1:{FAKE_SERVICES_PORT}",
+    ):
+        self.latency = {service: LatencyModel((latency or {}).get(service, DEFAULT_LATENCY[service])) for service in SERVICES}
+        self.token_ms = token_ms
+        self.completion_words = completion_words
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_in_flight = max_in_flight
+        self.fault_services = fault_services
+        self.retry_after = retry_after
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.openai_upstream = openai_upstream
+        self.pinecone_upstream = pinecone_upstream
+        self.public_url = public_url
+
+
+class RecordingStore:
+    """
+    Upstream responses saved as one JSON file per request
+
+    Files are keyed by the sha256 of method, path and the canonical JSON body, so a replayed
+    run answers exactly the requests that were recorded.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(method: str, path: str, body: bytes) -> str:
+        try:
+            canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+        except ValueError:
+            canonical = body.decode("utf-8", "replace")
+        return hashlib.sha256(f"{method} {path}\n{canonical}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+
+class FakeIndex:
+    """In-memory Pinecone index: vectors and metadata per namespace, queried by exact cosine similarity."""
+
+    def __init__(self, name: str, dimension: int, metric: str = "cosine"):
+        self.name = name
+        self.dimension = dimension
+        self.metric = metric
+        self.namespaces: Dict[str, Dict[str, Tuple[np.ndarray, Dict[str, Any]]]] = {}
+        # Normalized matrix per namespace, rebuilt on the first query after a write
+        self._matrices: Dict[str, Tuple[List[str], np.ndarray]] = {}
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        records = self.namespaces.setdefault(namespace, {})
+        for vector in vectors:
+            records[vector["id"]] = (np.asarray(vector["values"], dtype=np.float32), vector.get("metadata") or {})
+        self._matrices.pop(namespace, None)
+        return len(vectors)
+
+    def delete(self, ids: Optional[List[str]], delete_all: bool, namespace: str) -> None:
+        if delete_all:
+            self.namespaces.pop(namespace, None)
+        else:
+            records = self.namespaces.get(namespace, {})
+            for vector_id in ids or []:
+                records.pop(vector_id, None)
+        self._matrices.pop(namespace, None)
+
+    def query(self, vector: List[float], top_k: int, namespace: str, include_metadata: bool) -> List[Dict[str, Any]]:
+        records = self.namespaces.get(namespace)
+        if not records:
+            return []
+        if namespace not in self._matrices:
+            ids = list(records)
+            matrix = np.stack([records[vector_id][0] for vector_id in ids])
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            self._matrices[namespace] = (ids, matrix)
+        ids, matrix = self._matrices[namespace]
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        top_k = min(top_k, len(ids))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": ids[i], "score": float(scores[i]), "values": [], **({"metadata": records[ids[i]][1]} if include_metadata else {})}
+            for i in top
+        ]
+
+    def count(self) -> int:
+        return sum(len(records) for records in self.namespaces.values())
+
+    def describe(self, public_url: str) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "host": public_url,
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+            "status": {"ready": True, "state": "Ready"},
+            "deletion_protection": "disabled",
+        }
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    """Deterministic unit vector for a text, so repeated texts embed identically."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def fake_completion(messages: List[Dict[str, Any]], words: int) -> str:
+    """Canned completion that echoes the start of the last user message."""
+    prompt = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    filler = [FILLER[i % len(FILLER)] for i in range(words)]
+    return f"Fake completion for: {' '.join(prompt.split()[:12])}\n\n" + " ".join(filler)
+
+
+def error_response(service: str, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Error body in the shape of the faked API (OpenAI or Pinecone)."""
+    if service == "pinecone":
+        body = {"error": {"code": "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL", "message": message}, "status": status}
+    else:
+        error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+        body = {"error": {"message": message, "type": error_type, "param": None, "code": error_type}}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def create_app(settings: Optional[FakeSettings] = None) -> FastAPI:
+    """
+    Build the fake OpenAI and Pinecone service
+
+    Every request goes through the same steps: a recorded response (replay mode) is served
+    if there is one; otherwise fault injection may answer 429 or 500; then the service's
+    latency is slept and the request is either proxied to the real API and saved (record
+    mode) or answered synthetically.
+    """
+    settings = settings or FakeSettings()
+    app = FastAPI(title="Fake OpenAI and Pinecone services")
+    indexes: Dict[str, FakeIndex] = {}
+    in_flight = {service: 0 for service in SERVICES}
+    counters = {service: {"requests": 0, "rate_limited": 0, "errors": 0, "replayed": 0, "recorded": 0} for service in SERVICES}
+    recorder = RecordingStore(settings.record_dir) if settings.record_dir else None
+    replayer = RecordingStore(settings.replay_dir) if settings.replay_dir else None
+    # Real data-plane hosts seen in recorded describe_index responses
+    upstream_index_hosts: Dict[str, str] = {}
+    upstream = httpx.AsyncClient(timeout=httpx.Timeout(120.0, connect=10.0))
+
+    def fault(service: str) -> Optional[Response]:
+        """A 429 or 500 response if fault injection hits this request."""
+        if service not in settings.fault_services:
+            return None
+        over_limit = settings.max_in_flight and in_flight[service] > settings.max_in_flight
+        if over_limit or random.random() < settings.rate_limit_rate:
+            counters[service]["rate_limited"] += 1
+            headers = {"retry-after": str(settings.retry_after), "retry-after-ms": str(int(settings.retry_after * 1000))}
+            return error_response(service, 429, "Rate limit reached (fake)", headers)
+        if random.random() < settings.error_rate:
+            counters[service]["errors"] += 1
+            return error_response(service, 500, "Internal error (fake)")
+        return None
+
+    def rehost(text: str, seen_hosts: Optional[Dict[str, str]] = None) -> str:
+        """Point the index hosts of a Pinecone control-plane response at this server."""
+        data = json.loads(text)
+        for model in data.get("indexes", [data]):
+            if model.get("host"):
+                if seen_hosts is not None:
+                    seen_hosts[model["name"]] = model["host"]
+                model["host"] = settings.public_url
+        return json.dumps(data)
+
+    def replay(entry: Dict[str, Any]) -> Response:
+        media_type = entry.get("content_type", "application/json")
+        if media_type.startswith("text/event-stream"):
+            async def events():
+                for event in entry["body"].split("\n\n"):
+                    if event:
+                        yield event + "\n\n"
+                        await asyncio.sleep(settings.token_ms / 1000.0)
+            return StreamingResponse(events(), status_code=entry["status"], media_type="text/event-stream")
+        return Response(entry["body"], status_code=entry["status"], media_type=media_type)
+
+    async def proxy(request: Request, base_url: str, body: bytes, key: str, service: str) -> Response:
+        """Forward a request to the real API, save the answer and return it."""
+        headers = {name: value for name, value in request.headers.items() if name.lower() in FORWARDED_HEADERS}
+        start = time.perf_counter()
+        response = await upstream.request(request.method, base_url + request.url.path, content=body, headers=headers, params=request.query_params)
+        text = response.text
+        if service == "pinecone" and request.url.path.startswith("/indexes") and response.status_code < 300:
+            # Send data-plane calls back through this server; remember the real host to forward them to
+            text = rehost(text, upstream_index_hosts)
+        entry = {
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "body": text,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        if response.status_code < 500:
+            recorder.put(key, entry)
+            counters[service]["recorded"] += 1
+        return replay(entry) if entry["content_type"].startswith("text/event-stream") else Response(text, status_code=entry["status"], media_type=entry["content_type"])
+
+    async def handle(request: Request, service: str, synthetic) -> Response:
+        counters[service]["requests"] += 1
+        in_flight[service] += 1
+        try:
+            body = await request.body()
+            key = RecordingStore.make_key(request.method, request.url.path, body)
+            if replayer:
+                entry = replayer.get(key)
+                if entry is not None:
+                    counters[service]["replayed"] += 1
+                    if service == "pinecone" and request.url.path.startswith("/indexes") and entry["status"] < 300:
+                        entry["body"] = rehost(entry["body"])
+                    await asyncio.sleep(settings.latency[service].sample())
+                    return replay(entry)
+
+            response = fault(service)
+            if response is not None:
+                if response.status_code != 429:
+                    await asyncio.sleep(settings.latency[service].sample())
+                return response
+
+            if recorder:
+                if service != "pinecone":
+                    base_url = settings.openai_upstream
+                elif request.url.path.startswith("/indexes"):
+                    base_url = settings.pinecone_upstream
+                else:
+                    if not upstream_index_hosts:
+                        return error_response(service, 500, "Describe the index before recording data-plane calls")
+                    host = next(iter(upstream_index_hosts.values()))
+                    base_url = host if host.startswith("http") else f"https://{host}"
+                return await proxy(request, base_url, body, key, service)
+
+            await asyncio.sleep(settings.latency[service].sample())
+            payload = json.loads(body) if body else {}
+            return await synthetic(payload)
+        finally:
+            in_flight[service] -= 1
+
+    # OpenAI
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            model = payload.get("model", "gpt-4")
+            content = fake_completion(payload.get("messages", []), settings.completion_words)
+            completion_id = f"chatcmpl-fake-{random.getrandbits(48):012x}"
+            created = int(time.time())
+            if not payload.get("stream"):
+                words = len(content.split())
+                return JSONResponse({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": words, "total_tokens": words},
+                })
+
+            def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+                data = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                return f"data: {json.dumps(data)}\n\n"
+
+            async def events():
+                yield chunk({"role": "assistant", "content": ""})
+                for i, word in enumerate(content.split(" ")):
+                    yield chunk({"content": word if i == 0 else " " + word})
+                    await asyncio.sleep(settings.token_ms / 1000.0)
+                yield chunk({}, "stop")
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return await handle(request, "chat", synthetic)
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            texts = payload.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            dimensions = int(payload.get("dimensions") or DEFAULT_EMBEDDING_DIMENSIONS)
+            data = []
+            for i, text in enumerate(texts):
+                vector = fake_embedding(str(text), dimensions)
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii") if payload.get("encoding_format") == "base64" else vector.tolist()
+                data.append({"object": "embedding", "index": i, "embedding": embedding})
+            tokens = sum(len(str(text)) // 4 for text in texts)
+            return JSONResponse({
+                "object": "list",
+                "data": data,
+                "model": payload.get("model", "text-embedding-ada-002"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+        return await handle(request, "embeddings", synthetic)
+
+    # Pinecone control plane
+
+    @app.get("/indexes")
+    async def list_indexes(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            return JSONResponse({"indexes": [index.describe(settings.public_url) for index in indexes.values()]})
+
+        return await handle(request, "pinecone", synthetic)
+
+    @app.post("/indexes")
+    async def create_index(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            index = indexes.setdefault(payload["name"], FakeIndex(payload["name"], int(payload["dimension"]), payload.get("metric", "cosine")))
+            return JSONResponse(index.describe(settings.public_url), status_code=201)
+
+        return await handle(request, "pinecone", synthetic)
+
+    @app.get("/indexes/{index_name}")
+    async def describe_index(index_name: str, request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            # Unknown indexes spring into existence, so the backend works against an empty fake
+            index = indexes.setdefault(index_name, FakeIndex(index_name, DEFAULT_EMBEDDING_DIMENSIONS))
+            return JSONResponse(index.describe(settings.public_url))
+
+        return await handle(request, "pinecone", synthetic)
+
+    # Pinecone data plane (all indexes share this host; the last described index serves data calls)
+
+    def current_index() -> FakeIndex:
+        if not indexes:
+            indexes["default"] = FakeIndex("default", DEFAULT_EMBEDDING_DIMENSIONS)
+        return next(reversed(indexes.values()))
+
+    @app.post("/vectors/upsert")
+    async def upsert(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            count = current_index().upsert(payload.get("vectors", []), payload.get("namespace", ""))
+            return JSONResponse({"upsertedCount": count})
+
+        return await handle(request, "pinecone", synthetic)
+
+    @app.post("/query")
+    async def query(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            namespace = payload.get("namespace", "")
+            matches = current_index().query(payload.get("vector", []), int(payload.get("topK", 10)), namespace, bool(payload.get("includeMetadata")))
+            return JSONResponse({"matches": matches, "namespace": namespace, "usage": {"readUnits": 5}})
+
+        return await handle(request, "pinecone", synthetic)
+
+    @app.post("/vectors/delete")
+    async def delete(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            current_index().delete(payload.get("ids"), bool(payload.get("deleteAll")), payload.get("namespace", ""))
+            return JSONResponse({})
+
+        return await handle(request, "pinecone", synthetic)
+
+    @app.post("/describe_index_stats")
+    async def describe_index_stats(request: Request):
+        async def synthetic(payload: Dict[str, Any]) -> Response:
+            index = current_index()
+            return JSONResponse({
+                "namespaces": {name: {"vectorCount": len(records)} for name, records in index.namespaces.items()},
+                "dimension": index.dimension,
+                "indexFullness": 0.0,
+                "totalVectorCount": index.count(),
+            })
+
+        return await handle(request, "pinecone", synthetic)
+
+    # Fake service introspection
+
+    @app.get("/_fake/stats")
+    def stats():
+        return {
+            "counters": counters,
+            "in_flight": in_flight,
+            "indexes": {name: index.count() for name, index in indexes.items()},
+            "latency": {service: model.spec for service, model in settings.latency.items()},
+        }
+
+    @app.on_event("shutdown")
+    async def close_upstream():
+        await upstream.aclose()
+
+    return app
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Serve fake OpenAI and Pinecone APIs for local load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=FAKE_SERVICES_PORT)
+    for service in SERVICES:
+        parser.add_argument(f"--{service}-latency", default=DEFAULT_LATENCY[service], help=f"Latency of {service} calls in ms: fixed:MS, uniform:LOW:HIGH, normal:MEAN:SD or lognormal:MEDIAN:SIGMA (default: {DEFAULT_LATENCY[service]})")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Delay between streamed chunks")
+    parser.add_argument("--completion-words", type=int, default=150, help="Length of synthetic completions")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="Answer 429 when more requests than this are in flight per service (0: no limit)")
+    parser.add_argument("--fault-services", default=",".join(SERVICES), help="Services that get injected faults")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--record", help="Proxy to the real APIs and save every response into this directory")
+    parser.add_argument("--replay", help="Serve saved responses from this directory; other requests are answered synthetically")
+    parser.add_argument("--openai-upstream", default=OPENAI_UPSTREAM, help="OpenAI API used when recording")
+    parser.add_argument("--pinecone-upstream", default=PINECONE_UPSTREAM, help="Pinecone control plane used when recording")
+    args = parser.parse_args()
+
+    settings = FakeSettings(
+        latency={service: getattr(args, f"{service}_latency") for service in SERVICES},
+        token_ms=args.token_ms,
+        completion_words=args.completion_words,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_in_flight=args.max_in_flight,
+        fault_services=tuple(name.strip() for name in args.fault_services.split(",") if name.strip()),
+        retry_after=args.retry_after,
+        record_dir=args.record,
+        replay_dir=args.replay,
+        openai_upstream=args.openai_upstream,
+        pinecone_upstream=args.pinecone_upstream,
+        public_url=f"http://{args.host}:{args.port}",
+    )
+    print(f"Fake services on {settings.public_url}: OPENAI_BASE_URL={settings.public_url}/v1 PINECONE_CONTROLLER_HOST={settings.public_url}")
+
+    import uvicorn
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
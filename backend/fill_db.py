@@ -1,9 +1,14 @@
 import os
-from openai import OpenAI
+import logging
+import argparse
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFDirectoryLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from pinecone import Pinecone, ServerlessSpec
+from embedding_store import embed_text, embed_texts, EMBEDDING_BATCH_TOKENS, EMBEDDING_MAX_CONCURRENCY
+from ingest_manifest import IngestManifest, chunk_id
+from ingest_pipeline import Pipeline, Batcher
+from lexical_index import lexical_index
+from token_counter import count_tokens
+from vector_store import get_vector_store
+from startup import lazy
 
 # Load environment variables
 load_dotenv()
@@ -11,80 +16,169 @@ load_dotenv()
 # Set paths
 DATA_PATH = os.path.join(os.path.dirname(__file__), "data")
 
+# Ingestion pipeline settings: chunks per embeddings request (small enough that embedding
+# starts while parsing is still running) and concurrent upsert calls
+INGEST_EMBED_BATCH_INPUTS = int(os.environ.get("INGEST_EMBED_BATCH_INPUTS", "128"))
+INGEST_UPSERT_WORKERS = int(os.environ.get("INGEST_UPSERT_WORKERS", "2"))
+
 # Ensure data directory exists
 os.makedirs(DATA_PATH, exist_ok=True)
 
-# Initialize OpenAI client
-openai_client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
-
-# Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = "leapgpt"
-
-# Create or connect to Pinecone index
-if index_name not in pc.list_indexes().names():
-    pc.create_index(
-        name=index_name,
-        dimension=1536,  # 1536 is the dimension of OpenAI embeddings
-        metric='cosine',
-        spec=ServerlessSpec(
-            cloud='aws',
-            region='us-east-1'
-        )
-    )
-index = pc.Index(index_name)
-
-# Load and split PDFs
-def load_and_split_pdfs():
-    loader = PyPDFDirectoryLoader(DATA_PATH)
-    raw_documents = loader.load()
-
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=100,
-        length_function=len,
-        is_separator_regex=False,
+# OpenAI client, created on first use (a dry run never needs it)
+@lazy
+def openai_client():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY")
     )
-    return text_splitter.split_documents(raw_documents)
 
-# Generate embeddings using OpenAI
+# Vector store (Pinecone by default, or the local Chroma index), created on first use
+@lazy
+def vector_store():
+    return get_vector_store(create_if_missing=True)
+
+# List the PDFs in the data directory, keyed by file name
+def list_pdfs():
+    return {
+        name: os.path.join(DATA_PATH, name)
+        for name in sorted(os.listdir(DATA_PATH))
+        if name.lower().endswith(".pdf") and not name.startswith(".")
+    }
+
+# Load and split PDFs (all PDFs in the data directory, or only the given ones). Pages are
+# parsed in parallel worker processes and chunks are yielded as they become available.
+def load_and_split_pdfs(paths=None):
+    # PDF parsing pulls in pypdf and langchain; only import them when there is work to do
+    from pdf_parsing import iter_pdf_chunks
+    if paths is None:
+        paths = list(list_pdfs().values())
+    yield from iter_pdf_chunks(paths)
+
+# Generate embeddings using OpenAI, reusing vectors from the local embedding store
 def generate_embedding(text):
-    response = openai_client.embeddings.create(
-        input=text,
-        model="text-embedding-3-large"
+    return embed_text(openai_client(), text)
+
+# Upsert vectors in batches of 100 to avoid potential request size limits
+def upsert_vectors(vectors, batch_size=100):
+    for i in range(0, len(vectors), batch_size):
+        batch = vectors[i:i+batch_size]
+        vector_store().upsert(batch)
+        print(f"Upserted batch of {len(batch)} vectors")
+    return []
+
+# Delete vectors in batches of 1000 (the Pinecone limit per delete request)
+def delete_vectors(ids, batch_size=1000):
+    for i in range(0, len(ids), batch_size):
+        vector_store().delete(ids[i:i+batch_size])
+    if ids:
+        print(f"Deleted {len(ids)} stale vectors")
+
+# Insert documents into the vector store, only touching documents that changed since the last run
+def fill_pinecone(dry_run=False, full=False):
+    manifest = IngestManifest()
+    if full:
+        manifest.documents = {}
+    pdfs = list_pdfs()
+    plan = manifest.plan(pdfs)
+    print(f"Ingestion plan: {plan.summary()}")
+    for label, names in (("new", plan.new), ("changed", plan.changed), ("removed", plan.removed)):
+        for name in names:
+            print(f"  {label}: {name}")
+
+    # Unchanged documents that the lexical index has not seen yet are parsed for it, but not re-embedded
+    lexical_documents = lexical_index.documents()
+    lexical_missing = [name for name in plan.unchanged if name not in lexical_documents]
+
+    if dry_run:
+        removed_vectors = sum(len(manifest.chunk_ids(name)) for name in plan.removed)
+        print(f"Dry run: {len(plan.to_process)} documents would be parsed and embedded, "
+              f"{removed_vectors} vectors of removed documents would be deleted, "
+              f"{len(lexical_missing)} documents would be added to the lexical index")
+        return plan
+
+    # Connect (creating the index if needed) before any parsing, so a bad configuration fails fast
+    vector_store()
+
+    if full:
+        # Positional IDs from older runs are unknown to the manifest, so clear the namespace
+        vector_store().delete_all()
+        print("Cleared the vector store for a full rebuild")
+
+    # Chunks of removed documents are no longer valid
+    stale_ids = []
+    for name in plan.removed:
+        stale_ids.extend(manifest.chunk_ids(name))
+        manifest.forget(name)
+
+    # Parse only new and changed documents
+    to_parse = plan.to_process + lexical_missing
+    path_to_name = {path: name for name, path in pdfs.items()}
+    previous_ids = {name: set(manifest.chunk_ids(name)) for name in plan.to_process}
+    chunk_ids_by_doc = {name: [] for name in to_parse}
+    metadata = {}
+    to_upsert = []
+
+    # Assign IDs and pass on only chunks the vector store does not hold yet
+    def index_chunk(chunk):
+        source = chunk.metadata.get("source", "unknown")
+        name = path_to_name.get(source, os.path.basename(source))
+        vector_id = chunk_id(name, chunk.page_content)
+        if vector_id in metadata:
+            return []
+        chunk_ids_by_doc.setdefault(name, []).append(vector_id)
+        metadata[vector_id] = {"text": chunk.page_content, "source": source, "document": name}
+        if name not in previous_ids or vector_id in previous_ids[name]:
+            return []
+        to_upsert.append(vector_id)
+        return [vector_id]
+
+    def embed_batch(ids):
+        embeddings = embed_texts(openai_client(), [metadata[vector_id]["text"] for vector_id in ids], max_concurrency=1)
+        return [[
+            {"id": vector_id, "values": embedding, "metadata": metadata[vector_id]}
+            for vector_id, embedding in zip(ids, embeddings)
+        ]]
+
+    # Parsing, splitting, embedding and upserting overlap; bounded queues between the stages
+    # keep a slow stage from letting work pile up in memory
+    batcher = Batcher(INGEST_EMBED_BATCH_INPUTS, EMBEDDING_BATCH_TOKENS, lambda vector_id: count_tokens(metadata[vector_id]["text"]))
+    pipeline = (
+        Pipeline(load_and_split_pdfs([pdfs[name] for name in to_parse]), source_name="parse+split")
+        .stage("index", index_chunk)
+        .stage("batch", batcher.add, flush=batcher.flush)
+        .stage("embed", embed_batch, workers=EMBEDDING_MAX_CONCURRENCY, weight=len)
+        .stage("upsert", upsert_vectors, workers=INGEST_UPSERT_WORKERS, weight=len)
     )
-    return response.data[0].embedding
-
-# Insert documents into Pinecone
-def fill_pinecone():
-    chunks = load_and_split_pdfs()
-    
-    # Prepare vectors in batches of 100 to avoid potential request size limits
-    batch_size = 100
-    for i in range(0, len(chunks), batch_size):
-        batch_chunks = chunks[i:i+batch_size]
-        vectors_to_upsert = []
-        
-        for j, chunk in enumerate(batch_chunks):
-            embedding = generate_embedding(chunk.page_content)
-            vector_id = f"id_{i+j}"
-            vectors_to_upsert.append({
-                "id": vector_id,
-                "values": embedding,
-                "metadata": {
-                    "text": chunk.page_content,
-                    "source": chunk.metadata.get("source", "unknown")
-                }
-            })
-        
-        # Upsert the batch
-        if vectors_to_upsert:
-            index.upsert(vectors=vectors_to_upsert, namespace="default")
-            print(f"Upserted batch of {len(vectors_to_upsert)} vectors")
-    
-    print(f"Inserted {len(chunks)} chunks into Pinecone.")
+    stats = pipeline.run()
+    print(f"Pipeline finished in {pipeline.elapsed:.1f}s:\n{pipeline.report(stats)}")
+
+    # Drop chunks that disappeared from changed documents
+    for name in plan.to_process:
+        stale_ids.extend(previous_ids[name].difference(chunk_ids_by_doc[name]))
+    delete_vectors(stale_ids)
+
+    # Keep the BM25 index in step with the vector store
+    lexical_records = [{"id": vector_id, "metadata": metadata[vector_id]} for vector_id in metadata]
+    if full:
+        lexical_index.rebuild(lexical_records)
+    else:
+        lexical_index.update(lexical_records, stale_ids)
+    print(f"Lexical index holds {lexical_index.count} chunks")
+
+    for name in plan.to_process:
+        manifest.record(name, plan.file_hashes[name], chunk_ids_by_doc[name])
+    manifest.save()
+
+    print(f"Inserted {len(to_upsert)} chunks into the vector store, deleted {len(stale_ids)} stale vectors.")
+    return plan
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Ingest the PDFs in backend/data into the vector index")
+    parser.add_argument("--dry-run", action="store_true", help="Report new, changed and removed documents without indexing")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest, clear the namespace and re-ingest everything")
+    args = parser.parse_args()
+    fill_pinecone(dry_run=args.dry_run, full=args.full)
 
 if __name__ == "__main__":
-    fill_pinecone()
\ No newline at end of file
+    main()
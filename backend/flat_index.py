@@ -0,0 +1,307 @@
+import os
+import json
+import logging
+import weakref
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from vector_store import VectorStore, QueryResult
+
+logger = logging.getLogger(__name__)
+
+# Flat index settings (override through environment variables)
+FLAT_INDEX_PATH = os.environ.get("FLAT_INDEX_PATH", os.path.join(os.path.dirname(__file__), "flat_index"))
+FLAT_INDEX_DTYPE = os.environ.get("FLAT_INDEX_DTYPE", "int8")  # "int8" or "float16"
+# Rows scored per matmul; bounds the temporary float32 block to BLOCK_ROWS x dim
+BLOCK_ROWS = 1024
+
+DTYPES = {"int8": np.dtype("i1"), "float16": np.dtype("<f2")}
+
+
+class _Snapshot:
+    """
+    One mapping of the index files
+
+    A search reads every array and meta.jsonl through the same snapshot, so a concurrent
+    upsert, delete_all or reload cannot mix rows of two versions of the index.
+    """
+
+    def __init__(self, path: str, dtype_name: str, dtype: np.dtype, dim: Optional[int], signature: Optional[Tuple]):
+        self.signature = signature
+        self.dtype_name = dtype_name
+        self.dim = dim
+        # Rows appended after the signature was taken are left for the next snapshot
+        self.count = signature[1] // 8 if signature is not None and dim is not None else 0
+        self._meta = None
+        self._meta_lock = threading.Lock()
+        if self.count == 0:
+            self.vectors = np.zeros((0, dim or 0), dtype=dtype)
+            self.scales = np.zeros(0, dtype=np.float32)
+            self.alive = np.zeros(0, dtype=np.uint8)
+            self.offsets = np.zeros(0, dtype=np.uint64)
+            return
+        self.vectors = np.memmap(os.path.join(path, "vectors.bin"), dtype=dtype, mode="r", shape=(self.count, dim))
+        if dtype_name == "int8":
+            self.scales = np.memmap(os.path.join(path, "scales.f32"), dtype=np.float32, mode="r", shape=(self.count,))
+        else:
+            self.scales = np.ones(self.count, dtype=np.float32)
+        self.alive = np.memmap(os.path.join(path, "alive.u8"), dtype=np.uint8, mode="r", shape=(self.count,))
+        self.offsets = np.memmap(os.path.join(path, "meta.idx"), dtype=np.uint64, mode="r", shape=(self.count,))
+        # Opened now rather than per lookup, so records keep matching these offsets even
+        # if another process replaces the index files
+        self._meta = open(os.path.join(path, "meta.jsonl"), "rb")
+        weakref.finalize(self, self._meta.close)
+
+    def records(self, rows) -> List[Dict[str, Any]]:
+        records = []
+        if self._meta is None:
+            return records
+        with self._meta_lock:
+            for row in rows:
+                self._meta.seek(int(self.offsets[row]))
+                records.append(json.loads(self._meta.readline()))
+        return records
+
+
+class FlatIndex:
+    """
+    Brute-force cosine index over a memory-mapped, quantized embedding matrix
+
+    Files in the index directory:
+      header.json  dtype and dimension
+      vectors.bin  row-major matrix of unit-normalized embeddings, int8 or float16
+      scales.f32   per-row dequantization scale (int8 only)
+      alive.u8     1 for live rows, 0 for deleted or replaced rows
+      meta.jsonl   one {"id", "metadata"} record per row
+      meta.idx     uint64 byte offset of each row's record in meta.jsonl
+
+    Rows are only appended; deletes clear the row's alive flag. meta.idx is written last
+    and defines the row count, so a partially written append is ignored on open. Opening
+    the index maps the files without reading them.
+
+    Searches run on a snapshot of the mapped arrays taken under the lock. Before each
+    search the index checks meta.idx and re-maps the files when another process (such as
+    fill_db.py) has appended to or rebuilt the index since.
+    """
+
+    def __init__(self, path: str = FLAT_INDEX_PATH, dtype: str = FLAT_INDEX_DTYPE):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._ids: Optional[Dict[str, int]] = None
+        if dtype not in DTYPES and not os.path.exists(self._file("header.json")):
+            raise ValueError(f"Unsupported flat index dtype '{dtype}'. Choose one of: {', '.join(DTYPES)}")
+        self._default_dtype = dtype
+        self._map()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _signature(self) -> Optional[Tuple]:
+        # meta.idx is appended to last by every upsert and removed by delete_all
+        try:
+            stat = os.stat(self._file("meta.idx"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _map(self) -> None:
+        """(Re)map the index files; called on open, after every write and when the files change."""
+        header_path = self._file("header.json")
+        if os.path.exists(header_path):
+            with open(header_path, "r", encoding="utf-8") as f:
+                header = json.load(f)
+            self.dtype_name, self.dim = header["dtype"], header["dim"]
+        else:
+            self.dtype_name, self.dim = self._default_dtype, None
+        self.dtype = DTYPES[self.dtype_name]
+        self._snapshot = _Snapshot(self.path, self.dtype_name, self.dtype, self.dim, self._signature())
+
+    def _refresh(self) -> None:
+        # Caller holds the lock
+        if self._signature() != self._snapshot.signature:
+            try:
+                self._map()
+            except FileNotFoundError:
+                # Caught in the middle of another process's delete_all; keep the old mapping
+                return
+            self._ids = None
+
+    def snapshot(self) -> _Snapshot:
+        """The current mapping of the index files, re-mapped first if they changed on disk."""
+        with self._lock:
+            self._refresh()
+            return self._snapshot
+
+    @property
+    def count(self) -> int:
+        return self._snapshot.count
+
+    def _id_map(self) -> Dict[str, int]:
+        # Only needed for writes, so it is built on first upsert/delete rather than on open
+        if self._ids is None:
+            snapshot = self._snapshot
+            self._ids = {}
+            for row, record in enumerate(snapshot.records(range(snapshot.count))):
+                if snapshot.alive[row]:
+                    self._ids[record["id"]] = row
+        return self._ids
+
+    def _quantize(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.dtype_name == "float16":
+            return matrix.astype(np.float16), np.ones(len(matrix), dtype=np.float32)
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _set_dead(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        alive = np.memmap(self._file("alive.u8"), dtype=np.uint8, mode="r+", shape=(self.count,))
+        alive[rows] = 0
+        alive.flush()
+        del alive
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        """Append vectors; rows previously stored under the same IDs are marked dead."""
+        if not vectors:
+            return
+        with self._lock:
+            self._refresh()
+            matrix = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                with open(self._file("header.json"), "w", encoding="utf-8") as f:
+                    json.dump({"dtype": self.dtype_name, "dim": self.dim}, f)
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {matrix.shape[1]} does not match index dimension {self.dim}")
+
+            ids = self._id_map()
+            self._set_dead([ids[v["id"]] for v in vectors if v["id"] in ids])
+
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            quantized, scales = self._quantize(matrix / norms)
+
+            meta_path = self._file("meta.jsonl")
+            start = os.path.getsize(meta_path) if os.path.exists(meta_path) else 0
+            lines = [(json.dumps({"id": v["id"], "metadata": v.get("metadata", {})}) + "\n").encode("utf-8") for v in vectors]
+            offsets = start + np.concatenate([[0], np.cumsum([len(line) for line in lines])[:-1]]).astype(np.uint64)
+
+            with open(self._file("vectors.bin"), "ab") as f:
+                f.write(quantized.tobytes())
+            if self.dtype_name == "int8":
+                with open(self._file("scales.f32"), "ab") as f:
+                    f.write(scales.tobytes())
+            with open(self._file("alive.u8"), "ab") as f:
+                f.write(np.ones(len(vectors), dtype=np.uint8).tobytes())
+            with open(meta_path, "ab") as f:
+                f.writelines(lines)
+            # The offsets file defines the row count, so it is written last
+            with open(self._file("meta.idx"), "ab") as f:
+                f.write(offsets.tobytes())
+
+            for i, v in enumerate(vectors):
+                ids[v["id"]] = self.count + i
+            self._map()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            self._refresh()
+            id_map = self._id_map()
+            self._set_dead([id_map.pop(vector_id) for vector_id in ids if vector_id in id_map])
+            self._map()
+
+    def delete_all(self) -> None:
+        with self._lock:
+            for name in ("header.json", "vectors.bin", "scales.f32", "alive.u8", "meta.jsonl", "meta.idx"):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+            self._ids = {}
+            self._map()
+
+    def search(self, queries, top_k: int = 5, snapshot: Optional[_Snapshot] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Score a batch of queries against every live row
+
+        Args:
+            queries: Array-like of shape (n_queries, dim), or a single vector
+            top_k: Number of results per query
+            snapshot: Mapping to search; defaults to the current one. Pass the same
+                snapshot to its records() to look up the rows returned.
+
+        Returns:
+            For each query, (row, cosine similarity) pairs sorted by descending score
+        """
+        index = snapshot if snapshot is not None else self.snapshot()
+        count = index.count
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if count == 0:
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != index.dim:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {index.dim}")
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries_t = np.ascontiguousarray((queries / norms).T)
+
+        scores = np.empty((count, len(queries)), dtype=np.float32)
+        block = np.empty((min(BLOCK_ROWS, count), index.dim), dtype=np.float32)
+        for start in range(0, count, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, count)
+            # Dequantize into a reused cache-sized buffer, then score the whole batch at once
+            np.copyto(block[:stop - start], index.vectors[start:stop], casting="unsafe")
+            np.matmul(block[:stop - start], queries_t, out=scores[start:stop])
+        if index.dtype_name == "int8":
+            scores *= index.scales[:, None]
+        scores[index.alive == 0] = -np.inf
+
+        k = min(top_k, count)
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for q in range(len(queries)):
+            rows = top[:, q]
+            rows = rows[np.argsort(-scores[rows, q])]
+            results.append([(int(row), float(scores[row, q])) for row in rows if np.isfinite(scores[row, q])])
+        return results
+
+
+class FlatVectorStore(VectorStore):
+    """VectorStore adapter for FlatIndex, selected with VECTOR_STORE=flat."""
+
+    def __init__(self, path: str = FLAT_INDEX_PATH, dtype: str = FLAT_INDEX_DTYPE, dimension: Optional[int] = None, **kwargs):
+        self.index = FlatIndex(path, dtype)
+        # Only a warning, so that fill_db.py --full can still open the index to rebuild it;
+        # queries and writes with the wrong dimension raise ValueError
+        if dimension is not None and self.index.dim not in (None, dimension):
+            logger.warning(
+                f"Flat index at {path} holds {self.index.dim}-dimension vectors, but the embedding model "
+                f"produces {dimension}. Rebuild it with fill_db.py --full."
+            )
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        self.index.upsert(vectors)
+
+    def _to_result(self, snapshot: _Snapshot, hits: List[Tuple[int, float]]) -> QueryResult:
+        records = snapshot.records([row for row, _ in hits])
+        return QueryResult(matches=[
+            {"id": record["id"], "score": score, "metadata": record["metadata"]}
+            for record, (_, score) in zip(records, hits)
+        ])
+
+    def query(self, vector: Optional[List[float]] = None, top_k: int = 5, text: Optional[str] = None) -> QueryResult:
+        snapshot = self.index.snapshot()
+        return self._to_result(snapshot, self.index.search([vector], top_k, snapshot)[0])
+
+    def query_batch(self, vectors: List[List[float]], top_k: int = 5) -> List[QueryResult]:
+        """Search several query vectors with a single matmul."""
+        snapshot = self.index.snapshot()
+        return [self._to_result(snapshot, hits) for hits in self.index.search(vectors, top_k, snapshot)]
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids)
+
+    def delete_all(self) -> None:
+        self.index.delete_all()
@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+MANIFEST_PATH = os.environ.get(
+    "INGEST_MANIFEST_PATH", os.path.join(os.path.dirname(__file__), "ingest_manifest.json")
+)
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """
+    Derive a stable vector ID from a chunk's document and content
+
+    The same chunk text in the same document always maps to the same ID, so re-ingesting
+    a document overwrites its vectors instead of duplicating them.
+    """
+    digest = hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+    return f"chunk_{digest[:32]}"
+
+
+@dataclass
+class IngestPlan:
+    """Difference between the documents on disk and what the manifest says is indexed."""
+    new: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    file_hashes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def to_process(self) -> List[str]:
+        return self.new + self.changed
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.new)} new, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {len(self.unchanged)} unchanged"
+        )
+
+
+class IngestManifest:
+    """
+    Record of which documents are indexed, keyed by file name relative to the data directory
+
+    Each entry stores the file's sha256 and the IDs of the chunks upserted for it:
+    {"version": 1, "documents": {"paper.pdf": {"sha256": "...", "chunks": ["chunk_...", ...]}}}
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.documents = data.get("documents", {})
+            else:
+                logger.warning(f"Ignoring manifest {path} with unsupported version {data.get('version')}")
+
+    def plan(self, paths: Dict[str, str]) -> IngestPlan:
+        """
+        Compare documents on disk against the manifest
+
+        Args:
+            paths: Mapping of relative document name to absolute path
+
+        Returns:
+            The ingestion plan, including the current hash of every document on disk
+        """
+        plan = IngestPlan()
+        for name in sorted(paths):
+            digest = file_sha256(paths[name])
+            plan.file_hashes[name] = digest
+            entry = self.documents.get(name)
+            if entry is None:
+                plan.new.append(name)
+            elif entry.get("sha256") != digest:
+                plan.changed.append(name)
+            else:
+                plan.unchanged.append(name)
+        plan.removed = sorted(name for name in self.documents if name not in paths)
+        return plan
+
+    def chunk_ids(self, name: str) -> List[str]:
+        return list(self.documents.get(name, {}).get("chunks", []))
+
+    def record(self, name: str, sha256: str, chunk_ids: List[str]) -> None:
+        self.documents[name] = {"sha256": sha256, "chunks": chunk_ids}
+
+    def forget(self, name: str) -> None:
+        self.documents.pop(name, None)
+
+    def save(self) -> None:
+        """Write the manifest atomically so an interrupted run never leaves a partial file."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "documents": self.documents}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
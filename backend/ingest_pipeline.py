@@ -0,0 +1,242 @@
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pipeline settings (override through environment variables)
+# Items buffered between two stages; a full queue blocks the stage upstream of it
+PIPELINE_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "8"))
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class StageStats:
+    """Work done by one pipeline stage."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def summary(self, elapsed: float) -> str:
+        # Busy throughput is what the stage could sustain if it never waited on its neighbours;
+        # the stage with the lowest value is the bottleneck
+        busy_rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        utilization = self.busy_seconds / (elapsed * self.workers) * 100 if elapsed else 0.0
+        return (
+            f"{self.name}: {self.items} items, {busy_rate:.1f}/s while busy, "
+            f"{self.items / elapsed if elapsed else 0.0:.1f}/s overall, {utilization:.0f}% busy"
+        )
+
+
+class Batcher:
+    """
+    Groups items into batches of at most max_items items and max_cost total cost
+
+    Use add as a stage function and flush as the stage's flush callable.
+    """
+
+    def __init__(self, max_items: int, max_cost: Optional[float] = None, cost: Callable[[Any], float] = lambda item: 1):
+        self.max_items = max_items
+        self.max_cost = max_cost
+        self.cost = cost
+        self._batch: List[Any] = []
+        self._batch_cost = 0.0
+
+    def add(self, item: Any) -> List[List[Any]]:
+        ready = []
+        item_cost = self.cost(item)
+        if self._batch and (
+            len(self._batch) >= self.max_items
+            or (self.max_cost is not None and self._batch_cost + item_cost > self.max_cost)
+        ):
+            ready.append(self._batch)
+            self._batch, self._batch_cost = [], 0.0
+        self._batch.append(item)
+        self._batch_cost += item_cost
+        return ready
+
+    def flush(self) -> List[List[Any]]:
+        ready = [self._batch] if self._batch else []
+        self._batch, self._batch_cost = [], 0.0
+        return ready
+
+
+class Pipeline:
+    """
+    Chain of stages connected by bounded queues, each stage running in its own threads
+
+    The source iterable feeds the first stage. Every stage function takes one item and
+    returns an iterable of items for the next stage, so a stage can drop, pass on or split
+    items. Because the queues are bounded, a slow stage holds back the ones before it
+    instead of letting work pile up in memory, and all stages make progress at once. If any
+    stage fails, the others stop and a generator source is closed.
+
+    Example:
+        stats = (Pipeline(chunks)
+                 .stage("embed", embed_batch, workers=4)
+                 .stage("upsert", upsert_batch)
+                 .run())
+    """
+
+    def __init__(self, source: Iterable, source_name: str = "source", queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.source = source
+        self.source_name = source_name
+        self.queue_size = queue_size
+        self.stages: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def stage(
+        self,
+        name: str,
+        fn: Callable[[Any], Iterable],
+        workers: int = 1,
+        flush: Optional[Callable[[], Iterable]] = None,
+        weight: Callable[[Any], int] = lambda item: 1,
+    ) -> "Pipeline":
+        """
+        Append a stage
+
+        Args:
+            name: Label used in the throughput report
+            fn: Called with each input item; returns the items to pass downstream
+            workers: Threads running fn concurrently
+            flush: Called once after the last input; returns any items still held back
+                (for batching stages, which should use a single worker)
+            weight: Number of units an input item counts as in the report (e.g. len for batches)
+        """
+        self.stages.append({"name": name, "fn": fn, "workers": max(1, workers), "flush": flush, "weight": weight})
+        return self
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        # Block while the queue is full, but give up once another stage has failed
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, name: str, error: BaseException) -> None:
+        logger.error(f"Ingestion stage '{name}' failed: {str(error)}")
+        self._errors.append(error)
+        self._stop.set()
+
+    def run(self) -> List[StageStats]:
+        """Run all stages to completion and return their statistics, in stage order."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        stats = [StageStats(self.source_name, 1)] + [StageStats(s["name"], s["workers"]) for s in self.stages]
+        remaining = [s["workers"] for s in self.stages]
+        remaining_lock = threading.Lock()
+
+        def finish(index: int) -> None:
+            # Send one end marker per worker of the next stage
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1]["workers"]):
+                    if not self._put(queues[index + 1], _DONE):
+                        return
+
+        def emit(index: int, items: Iterable) -> bool:
+            for item in items:
+                if index + 1 < len(self.stages) and not self._put(queues[index + 1], item):
+                    return False
+            return True
+
+        def produce() -> None:
+            iterator = None
+            try:
+                iterator = iter(self.source)
+                while not self._stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        break
+                    stats[0].record(1, time.perf_counter() - start)
+                    if self.stages and not self._put(queues[0], item):
+                        return
+            except Exception as e:
+                self._fail(self.source_name, e)
+                return
+            finally:
+                # A generator source is closed here, in the thread that runs it, so the
+                # resources it holds (e.g. a process pool) are released when a later stage fails
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    try:
+                        close()
+                    except Exception as e:
+                        logger.error(f"Closing ingestion source '{self.source_name}' failed: {str(e)}")
+            finish(-1)
+
+        def work(index: int) -> None:
+            spec, stage_stats = self.stages[index], stats[index + 1]
+            try:
+                while True:
+                    item = self._get(queues[index])
+                    if item is _DONE:
+                        break
+                    start = time.perf_counter()
+                    outputs = list(spec["fn"](item) or [])
+                    stage_stats.record(spec["weight"](item), time.perf_counter() - start)
+                    if not emit(index, outputs):
+                        return
+                if self._stop.is_set():
+                    return
+                if spec["flush"] is not None:
+                    start = time.perf_counter()
+                    outputs = list(spec["flush"]() or [])
+                    stage_stats.record(0, time.perf_counter() - start)
+                    if not emit(index, outputs):
+                        return
+            except Exception as e:
+                self._fail(spec["name"], e)
+                return
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                finish(index)
+
+        threads = [threading.Thread(target=produce, name=f"ingest-{self.source_name}", daemon=True)]
+        for index, spec in enumerate(self.stages):
+            for n in range(spec["workers"]):
+                threads.append(threading.Thread(target=work, args=(index,), name=f"ingest-{spec['name']}-{n}", daemon=True))
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - started
+
+        if self._errors:
+            raise self._errors[0]
+        return stats
+
+    def report(self, stats: List[StageStats]) -> str:
+        """Format one throughput line per stage."""
+        return "\n".join(s.summary(self.elapsed) for s in stats)
@@ -0,0 +1,316 @@
+import os
+import re
+import json
+import math
+import time
+import shutil
+import logging
+import weakref
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Lexical index settings (override through environment variables)
+LEXICAL_INDEX_PATH = os.environ.get(
+    "LEXICAL_INDEX_PATH", os.path.join(os.path.dirname(__file__), "lexical_index")
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Query terms at least this rare (BM25 idf) make the lexical-only fast path eligible
+LEXICAL_FASTPATH_MIN_IDF = float(os.environ.get("LEXICAL_FASTPATH_MIN_IDF", "2.5"))
+# Share of the query's terms each top hit must contain for the fast path
+LEXICAL_FASTPATH_MIN_COVERAGE = float(os.environ.get("LEXICAL_FASTPATH_MIN_COVERAGE", "0.8"))
+
+# Files of an index written before builds were versioned, removed after the next rebuild
+LEGACY_FILES = frozenset(["chunks.jsonl", "chunks.idx", "terms.json", "postings.i32", "tfs.u16", "lengths.u32"])
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or our that the their "
+    "there these this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a text and split it into alphanumeric terms, dropping stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class _Version:
+    """
+    One build of the index, loaded from its directory
+
+    chunks.jsonl is opened when the version is loaded and the posting arrays are mapped,
+    so a version stays readable after a rebuild has swapped in its successor and removed
+    its files.
+    """
+
+    def __init__(self, directory: Optional[str]):
+        self.directory = directory
+        self.terms: Dict[str, List[int]] = {}
+        self.count = 0
+        self.avg_length = 1.0
+        self._chunks = None
+        self._chunks_lock = threading.Lock()
+        if directory is None or not os.path.exists(os.path.join(directory, "terms.json")):
+            return
+        with open(os.path.join(directory, "terms.json"), "r", encoding="utf-8") as f:
+            self.terms = json.load(f)
+        self.count = os.path.getsize(os.path.join(directory, "chunks.idx")) // 8
+        if self.count == 0:
+            return
+        self._offsets = np.memmap(os.path.join(directory, "chunks.idx"), dtype=np.uint64, mode="r")
+        self._lengths = np.memmap(os.path.join(directory, "lengths.u32"), dtype=np.uint32, mode="r")
+        postings_size = os.path.getsize(os.path.join(directory, "postings.i32"))
+        self._postings = np.memmap(os.path.join(directory, "postings.i32"), dtype=np.int32, mode="r") if postings_size else np.zeros(0, np.int32)
+        self._tfs = np.memmap(os.path.join(directory, "tfs.u16"), dtype=np.uint16, mode="r") if postings_size else np.zeros(0, np.uint16)
+        self.avg_length = float(self._lengths.mean()) or 1.0
+        self._chunks = open(os.path.join(directory, "chunks.jsonl"), "rb")
+        weakref.finalize(self, self._chunks.close)
+
+    def records(self, rows=None) -> List[Dict[str, Any]]:
+        if self._chunks is None:
+            return []
+        with self._chunks_lock:
+            if rows is None:
+                self._chunks.seek(0)
+                return [json.loads(line) for line in self._chunks.read().splitlines()]
+            records = []
+            for row in rows:
+                self._chunks.seek(int(self._offsets[row]))
+                records.append(json.loads(self._chunks.readline()))
+            return records
+
+    def idf(self, term: str) -> float:
+        df = self.terms[term][1] if term in self.terms else 0
+        return math.log(1.0 + (self.count - df + 0.5) / (df + 0.5))
+
+
+class LexicalIndex:
+    """
+    Persistent BM25 inverted index over ingested chunks
+
+    Each build is written to its own directory under the index path, and the CURRENT file
+    names the live one. Files in a build directory:
+      chunks.jsonl  one {"id", "metadata"} record per chunk (the source of truth)
+      chunks.idx    uint64 byte offset of each record in chunks.jsonl
+      terms.json    term -> [first posting, posting count]
+      postings.i32  chunk numbers, grouped by term
+      tfs.u16       term frequency for each posting
+      lengths.u32   chunk lengths in terms
+
+    The posting arrays are memory-mapped, so opening the index reads only terms.json.
+    Updates write a whole new build from chunks.jsonl, which is cheap at corpus sizes of
+    a few thousand chunks, and publish it by atomically replacing CURRENT. Readers keep
+    using the build they loaded and switch to the new one on their next call.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._version = _Version(None)
+        self._refresh()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _pointer_signature(self) -> Optional[Tuple]:
+        # Index written before builds were versioned: files directly in the index path
+        for name in ("CURRENT", "terms.json"):
+            try:
+                stat = os.stat(self._file(name))
+            except FileNotFoundError:
+                continue
+            return name, stat.st_ino, stat.st_mtime_ns
+        return None
+
+    def _refresh(self) -> None:
+        # Caller holds the lock, or is __init__
+        signature = self._pointer_signature()
+        if signature == self._signature:
+            return
+        if signature is None or signature[0] == "terms.json":
+            directory = None if signature is None else self.path
+        else:
+            with open(self._file("CURRENT"), "r", encoding="utf-8") as f:
+                directory = self._file(f.read().strip())
+        try:
+            self._version = _Version(directory)
+        except FileNotFoundError:
+            # A newer rebuild removed this build while we were reading CURRENT; retry next call
+            return
+        self._signature = signature
+
+    def _current(self) -> _Version:
+        with self._lock:
+            self._refresh()
+            return self._version
+
+    @property
+    def count(self) -> int:
+        return self._current().count
+
+    @property
+    def terms(self) -> Dict[str, List[int]]:
+        return self._current().terms
+
+    def records(self, rows=None) -> List[Dict[str, Any]]:
+        """Read chunk records, either all of them or the given chunk numbers."""
+        return self._current().records(rows)
+
+    def documents(self) -> set:
+        """Names of the documents that have chunks in the index."""
+        return {record["metadata"].get("document") for record in self.records()}
+
+    def rebuild(self, records: List[Dict[str, Any]]) -> None:
+        """Write a fresh index from {"id", "metadata": {"text", ...}} records."""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            postings: Dict[str, List[Tuple[int, int]]] = {}
+            lengths = np.zeros(len(records), dtype=np.uint32)
+            lines = []
+            for row, record in enumerate(records):
+                tokens = tokenize(record["metadata"].get("text", ""))
+                lengths[row] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((row, min(tf, 65535)))
+                lines.append((json.dumps({"id": record["id"], "metadata": record["metadata"]}) + "\n").encode("utf-8"))
+
+            terms = {}
+            doc_ids, tfs = [], []
+            for term in sorted(postings):
+                terms[term] = [len(doc_ids), len(postings[term])]
+                for row, tf in postings[term]:
+                    doc_ids.append(row)
+                    tfs.append(tf)
+            offsets = np.concatenate([[0], np.cumsum([len(line) for line in lines])[:-1]]).astype(np.uint64) if lines else np.zeros(0, np.uint64)
+
+            outputs = {
+                "chunks.jsonl": b"".join(lines),
+                "chunks.idx": offsets.tobytes(),
+                "postings.i32": np.asarray(doc_ids, dtype=np.int32).tobytes(),
+                "tfs.u16": np.asarray(tfs, dtype=np.uint16).tobytes(),
+                "lengths.u32": lengths.tobytes(),
+                "terms.json": json.dumps(terms, separators=(",", ":")).encode("utf-8"),
+            }
+            # Build in a hidden directory, rename it into place, then point CURRENT at it.
+            # Replacing CURRENT is the single atomic step that publishes the build.
+            name = f"v{time.time_ns():020d}-{os.getpid()}"
+            staging = self._file(f".{name}.tmp")
+            os.makedirs(staging)
+            for file_name, data in outputs.items():
+                with open(os.path.join(staging, file_name), "wb") as f:
+                    f.write(data)
+            os.rename(staging, self._file(name))
+            with open(self._file("CURRENT.tmp"), "w", encoding="utf-8") as f:
+                f.write(name + "\n")
+            previous = self._version.directory
+            os.replace(self._file("CURRENT.tmp"), self._file("CURRENT"))
+            self._refresh()
+            self._remove_old_builds(keep={name, os.path.basename(previous or "")})
+
+    def _remove_old_builds(self, keep: set) -> None:
+        # The previous build is kept for readers that read CURRENT just before the swap;
+        # readers that already loaded a removed build hold its files open
+        for entry in os.listdir(self.path):
+            full = self._file(entry)
+            if entry.startswith("v") and os.path.isdir(full) and entry not in keep:
+                shutil.rmtree(full, ignore_errors=True)
+            elif entry in LEGACY_FILES:
+                os.remove(full)
+
+    def update(self, upserts: List[Dict[str, Any]], delete_ids: List[str]) -> None:
+        """Add or replace chunks and remove deleted ones, then rewrite the index."""
+        removed = set(delete_ids) | {record["id"] for record in upserts}
+        records = [record for record in self.records() if record["id"] not in removed]
+        self.rebuild(records + list(upserts))
+
+    def idf(self, term: str) -> float:
+        return self._current().idf(term)
+
+    def is_confident(
+        self,
+        query: str,
+        hits: List[Tuple[Dict[str, Any], float]],
+        top_k: int,
+        min_idf: float = LEXICAL_FASTPATH_MIN_IDF,
+        min_coverage: float = LEXICAL_FASTPATH_MIN_COVERAGE,
+    ) -> bool:
+        """
+        Decide whether lexical hits are good enough to answer without vector search
+
+        The query must contain at least one rare term that the index knows (an acronym or a
+        firm name, say). Each of the top_k hits must contain every such term and at least
+        min_coverage of all the query's terms, so a semantic question that happens to name a
+        rare term still goes to vector search.
+        """
+        if len(hits) < top_k:
+            return False
+        version = self._current()
+        query_terms = set(tokenize(query))
+        rare_terms = {term for term in query_terms if term in version.terms and version.idf(term) >= min_idf}
+        if not rare_terms:
+            return False
+        for record, _ in hits[:top_k]:
+            text_terms = set(tokenize(record["metadata"].get("text", "")))
+            if not rare_terms.issubset(text_terms):
+                return False
+            if len(query_terms & text_terms) < min_coverage * len(query_terms):
+                return False
+        return True
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Rank chunks against a query with BM25
+
+        Returns:
+            (record, score) pairs sorted by descending score; chunks with no matching term are omitted
+        """
+        version = self._current()
+        if version.count == 0:
+            return []
+        scores = np.zeros(version.count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            entry = version.terms.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            rows = version._postings[start:start + df]
+            tf = version._tfs[start:start + df].astype(np.float32)
+            idf = version.idf(term)
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * version._lengths[rows] / version.avg_length)
+            scores[rows] += idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+
+        matched = np.flatnonzero(scores)
+        if matched.size == 0:
+            return []
+        k = min(top_k, matched.size)
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return list(zip(version.records(top), (float(scores[row]) for row in top)))
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], top_k: int = 5, k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Merge several ranked match lists by reciprocal rank
+
+    Each match is a dict with "id" and "metadata". A match's fused score is the sum of
+    1 / (k + rank) over the lists it appears in.
+    """
+    fused: Dict[str, float] = {}
+    matches: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            fused[match["id"]] = fused.get(match["id"], 0.0) + 1.0 / (k + rank)
+            matches.setdefault(match["id"], match)
+    ordered = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [dict(matches[match_id], score=fused[match_id]) for match_id in ordered]
+
+
+# Shared index used by ask.py and fill_db.py
+lexical_index = LexicalIndex()
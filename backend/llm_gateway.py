@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import logging
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Any, Optional
+
+from metrics import observe_llm_call
+from prompt_builder import message_tokens
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Gateway settings (override through environment variables)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "64"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "20"))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+
+DEFAULT_CHAT_MODEL = "gpt-4-turbo"
+
+
+class LLMGateway:
+    """
+    Async gateway for chat completions shared by all analysis endpoints.
+
+    One AsyncOpenAI client sits on top of a single keep-alive httpx connection
+    pool, so requests reuse TLS connections instead of opening a new one per call.
+    A semaphore caps the number of upstream calls in flight per worker; callers
+    beyond the limit wait on the event loop instead of blocking it.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client: Optional["AsyncOpenAI"] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """
+        Return the shared AsyncOpenAI client, creating the connection pool on first use
+
+        openai and httpx are imported here rather than at module level, which keeps them
+        out of app.py's startup time.
+        """
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=http_client,
+                max_retries=self.max_retries,
+            )
+        return self._client
+
+    @property
+    def in_flight(self) -> int:
+        """Number of upstream calls currently holding a concurrency slot."""
+        return self._in_flight
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = DEFAULT_CHAT_MODEL,
+        temperature: float = 0.7,
+        max_tokens: int = 2500,
+    ) -> str:
+        """Run a chat completion and return the message content."""
+        async with self._semaphore:
+            self._in_flight += 1
+            start = time.perf_counter()
+            response = None
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            finally:
+                self._in_flight -= 1
+                usage = getattr(response, "usage", None)
+                observe_llm_call(
+                    model,
+                    "chat",
+                    time.perf_counter() - start,
+                    response is not None,
+                    prompt_tokens=usage.prompt_tokens if usage else 0,
+                    completion_tokens=usage.completion_tokens if usage else 0,
+                )
+        return response.choices[0].message.content
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = DEFAULT_CHAT_MODEL,
+        temperature: float = 0.7,
+        max_tokens: int = 2500,
+    ) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion and yield content deltas as they arrive
+
+        Streamed responses carry no usage block, so token metrics are estimated: the
+        prompt is counted locally and each content delta counts as one completion token.
+        """
+        async with self._semaphore:
+            self._in_flight += 1
+            start = time.perf_counter()
+            deltas = 0
+            ok = False
+            try:
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        deltas += 1
+                        yield chunk.choices[0].delta.content
+                ok = True
+            finally:
+                self._in_flight -= 1
+                observe_llm_call(
+                    model,
+                    "stream",
+                    time.perf_counter() - start,
+                    ok,
+                    prompt_tokens=sum(message_tokens(message, model) for message in messages),
+                    completion_tokens=deltas,
+                )
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+# Shared gateway used by app.py
+gateway = LLMGateway()
@@ -0,0 +1,280 @@
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import numpy as np
+
+from sample_ideas import SAMPLE_IDEAS, load_ideas
+
+logger = logging.getLogger(__name__)
+
+# Template sources in analysis responses: served without ChatGPT
+FALLBACK_SOURCES = ("static_template", "fallback_template")
+DEFAULT_MIX = "/market-analysis=1,/build-plan=1,/longevity-prediction=1"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "path=weight,path=weight" into {path: weight}; a path without weight counts 1."""
+    mix = {}
+    for part in spec.split(","):
+        path, _, weight = part.strip().partition("=")
+        if path:
+            mix[path if path.startswith("/") else "/" + path] = float(weight or 1)
+    return mix
+
+
+def request_body(path: str, idea: str, ideas: List[str], bypass_cache: bool) -> Optional[Dict[str, Any]]:
+    """Request body for an endpoint of app.py or ask.py; None for GET endpoints."""
+    if path in ("/", "/stats"):
+        return None
+    if path.startswith("/chat"):
+        return {"query": idea}
+    if path == "/analyze/batch":
+        return {"ideas": random.sample(ideas, min(3, len(ideas))), "bypass_cache": bypass_cache}
+    return {"idea": idea, "bypass_cache": bypass_cache}
+
+
+def find_sources(value: Any) -> Iterator[str]:
+    """Yield every "source" field of a decoded response, at any depth."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "source" and isinstance(item, str):
+                yield item
+            else:
+                yield from find_sources(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from find_sources(item)
+
+
+def response_sources(content_type: str, body: str) -> List[str]:
+    """Sources reported by a JSON, NDJSON or Server-Sent Events response."""
+    if content_type.startswith("text/event-stream"):
+        documents = [line[5:].strip() for line in body.splitlines() if line.startswith("data:")]
+    elif content_type.startswith("application/x-ndjson"):
+        documents = body.splitlines()
+    else:
+        documents = [body]
+    sources = []
+    for document in documents:
+        try:
+            sources.extend(find_sources(json.loads(document)))
+        except ValueError:
+            continue
+    return sources
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000.0, (50, 95, 99))
+    return {"p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1), "p99_ms": round(float(p99), 1)}
+
+
+def summarize(samples: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """Latency, time to first byte, status codes and fallback rate of a group of requests."""
+    ok = [s for s in samples if s["status"] is not None and s["status"] < 400]
+    sources = Counter(source for s in samples for source in s["sources"])
+    fallbacks = sum(sources[source] for source in FALLBACK_SOURCES)
+    total_sources = sum(sources.values())
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else None,
+        "statuses": dict(Counter(str(s["status"] or s["error"]) for s in samples)),
+        **percentiles([s["latency"] for s in ok]),
+        "ttfb": percentiles([s["ttfb"] for s in ok if s["ttfb"] is not None]),
+        "sources": dict(sources),
+        "fallback_rate": round(fallbacks / total_sources, 4) if total_sources else None,
+    }
+
+
+async def send(client: httpx.AsyncClient, path: str, body: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Send one request, reading the body as it streams in; never raises."""
+    sample = {"path": path, "status": None, "error": None, "latency": None, "ttfb": None, "sources": []}
+    start = time.perf_counter()
+    try:
+        method = "GET" if body is None else "POST"
+        async with client.stream(method, path, json=body) as response:
+            parts = []
+            async for chunk in response.aiter_text():
+                if sample["ttfb"] is None:
+                    sample["ttfb"] = time.perf_counter() - start
+                parts.append(chunk)
+        sample["status"] = response.status_code
+        sample["sources"] = response_sources(response.headers.get("content-type", ""), "".join(parts))
+    except httpx.HTTPError as e:
+        sample["error"] = type(e).__name__
+    sample["latency"] = time.perf_counter() - start
+    return sample
+
+
+async def fetch_json(url: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not url:
+        return None
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(url)
+            return response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run_load(
+    url: str,
+    mix: Dict[str, float],
+    rps: float,
+    duration: float,
+    ideas: List[str] = SAMPLE_IDEAS,
+    poisson: bool = False,
+    bypass_cache: bool = False,
+    max_in_flight: int = 1000,
+    timeout: float = 120.0,
+    fake_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Drive the backend at a target request rate and report what came back
+
+    Arrivals are open-loop: requests are sent on schedule whether or not earlier ones have
+    finished, so a slow backend shows up as growing latency instead of a lower offered rate.
+    Requests that would exceed max_in_flight are counted as dropped.
+
+    Args:
+        url: Base URL of the backend (app.py or ask.py)
+        mix: Endpoint paths and their relative weights
+        rps: Target requests per second
+        duration: Seconds to send requests for
+        ideas: Ideas (or queries) to draw request bodies from
+        poisson: Exponential inter-arrival times instead of a fixed interval
+        bypass_cache: Send "bypass_cache": true to the analysis endpoints
+        max_in_flight: Client-side cap on outstanding requests
+        timeout: Per-request timeout in seconds
+        fake_url: Base URL of fake_services.py, whose counters are added to the report
+
+    Returns:
+        Overall and per-endpoint summaries plus the run settings
+    """
+    paths = list(mix)
+    weights = [mix[path] for path in paths]
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    samples: List[Dict[str, Any]] = []
+    dropped = 0
+    backend_stats_before = await fetch_json(f"{url}/stats")
+    fake_stats_before = await fetch_json(f"{fake_url}/_fake/stats" if fake_url else None)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        pending = set()
+
+        async def one(path: str) -> None:
+            samples.append(await send(client, path, request_body(path, random.choice(ideas), ideas, bypass_cache)))
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_at = start
+        while next_at - start < duration:
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(pending) >= max_in_flight:
+                dropped += 1
+            else:
+                task = asyncio.create_task(one(random.choices(paths, weights)[0]))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            next_at += random.expovariate(rps) if poisson else 1.0 / rps
+        send_seconds = loop.time() - start
+        if pending:
+            await asyncio.gather(*pending)
+        wall_seconds = loop.time() - start
+
+    report = {
+        "settings": {
+            "url": url,
+            "mix": mix,
+            "target_rps": rps,
+            "duration_s": duration,
+            "arrivals": "poisson" if poisson else "constant",
+            "bypass_cache": bypass_cache,
+        },
+        "offered_rps": round((len(samples) + dropped) / send_seconds, 2) if send_seconds > 0 else None,
+        "dropped": dropped,
+        "wall_seconds": round(wall_seconds, 2),
+        "overall": summarize(samples, wall_seconds),
+        "endpoints": {path: summarize([s for s in samples if s["path"] == path], wall_seconds) for path in paths},
+    }
+    backend_stats = await fetch_json(f"{url}/stats")
+    if backend_stats is not None:
+        report["backend_stats"] = {"before": backend_stats_before, "after": backend_stats}
+    fake_stats = await fetch_json(f"{fake_url}/_fake/stats" if fake_url else None)
+    if fake_stats is not None:
+        report["fake_services"] = {"before": fake_stats_before, "after": fake_stats}
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"Offered {report['offered_rps']} req/s for {report['settings']['duration_s']}s "
+        f"({report['dropped']} dropped), finished in {report['wall_seconds']}s"
+    )
+    rows = [("overall", report["overall"])] + list(report["endpoints"].items())
+    for name, summary in rows:
+        fallback = "-" if summary["fallback_rate"] is None else f"{summary['fallback_rate']:.1%}"
+        latency = "-" if summary["p50_ms"] is None else f"p50 {summary['p50_ms']:>8.1f}  p95 {summary['p95_ms']:>8.1f}  p99 {summary['p99_ms']:>8.1f} ms"
+        print(f"{name:<28} {summary['requests']:>6} req  {summary['ok']:>6} ok  {latency}  fallback {fallback}  {summary['statuses']}")
+    if "fake_services" in report:
+        counters = report["fake_services"]["after"]["counters"]
+        before = (report["fake_services"]["before"] or {}).get("counters", {})
+        for service, values in counters.items():
+            delta = {key: value - before.get(service, {}).get(key, 0) for key, value in values.items()}
+            print(f"fake {service:<23} {delta}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Drive the backend at a target request rate and report latency percentiles and fallback rates")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend base URL")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoints and weights, e.g. '/analyze=1,/chat=3' (default: {DEFAULT_MIX})")
+    parser.add_argument("--rps", type=float, default=5.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of a fixed interval")
+    parser.add_argument("--bypass-cache", action="store_true", help="Skip the backend's response cache")
+    parser.add_argument("--ideas", help="File with one idea or query per line (default: built-in samples)")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Client-side cap on outstanding requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--fake-url", help="Base URL of fake_services.py, to report its 429/500 counters")
+    parser.add_argument("--seed", type=int, help="Seed for arrivals and request choice")
+    parser.add_argument("--output", "-o", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    # One INFO line per request would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.seed is not None:
+        random.seed(args.seed)
+    ideas = load_ideas(args.ideas)
+
+    report = asyncio.run(run_load(
+        args.url,
+        parse_mix(args.mix),
+        args.rps,
+        args.duration,
+        ideas=ideas,
+        poisson=args.poisson,
+        bypass_cache=args.bypass_cache,
+        max_in_flight=args.max_in_flight,
+        timeout=args.timeout,
+        fake_url=args.fake_url,
+    ))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
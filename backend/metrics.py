@@ -0,0 +1,350 @@
+import math
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Latency buckets in seconds, from in-process template calls up to slow completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Label of requests that matched no route, so scanners cannot blow up the label set
+UNMATCHED_PATH = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Registry:
+    """Set of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, names, values, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registry served by the /metrics endpoints
+REGISTRY = Registry()
+
+
+class Metric:
+    """
+    A named metric with optional labels
+
+    labels(*values) returns the child for one label combination; children are created on
+    first use and cached, so recording a value is a dict lookup plus a short lock.
+    Metrics without labels can be used directly (counter.inc(), histogram.observe(v)).
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        for values, child in self._items():
+            yield "", self.labelnames, values, child.value
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    """Value that goes up and down, such as requests in flight."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above the largest bucket
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    """Distribution of observed values (latencies, sizes) over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for values, child in self._items():
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", names, values + (_format_value(bound),), cumulative
+            yield "_sum", self.labelnames, values, total
+            yield "_count", self.labelnames, values, cumulative
+
+
+class CallbackMetric(Metric):
+    """
+    Metric read from existing counters when /metrics is scraped
+
+    fn returns {label values: value} (or a single value without labels). Nothing runs on
+    the hot path, so caches can keep their own plain hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        fn: Callable[[], Any],
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.kind = kind
+        self.fn = fn
+        super().__init__(name, documentation, labelnames, registry)
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception as e:
+            logger.error(f"Failed to collect {self.name}: {str(e)}")
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            yield "", self.labelnames, label_values, value
+
+
+# HTTP metrics recorded by MetricsMiddleware
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by method, route and status", ("method", "path", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency until the last body byte, by route", ("method", "path"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served, by route", ("path",))
+
+# Upstream calls
+LLM_CALLS = Counter("llm_requests_total", "Chat completion calls by model, operation and outcome", ("model", "operation", "outcome"))
+LLM_DURATION = Histogram("llm_request_duration_seconds", "Chat completion latency (whole stream for streaming calls)", ("model", "operation"))
+LLM_TOKENS = Counter("llm_tokens_total", "Chat completion tokens by model and kind (prompt, completion)", ("model", "kind"))
+EMBEDDING_CALLS = Counter("embedding_requests_total", "Embeddings API calls by model and outcome", ("model", "outcome"))
+EMBEDDING_DURATION = Histogram("embedding_request_duration_seconds", "Embeddings API latency", ("model",))
+EMBEDDING_INPUTS = Counter("embedding_inputs_total", "Texts sent to the embeddings API", ("model",))
+EMBEDDING_TOKENS = Counter("embedding_tokens_total", "Tokens sent to the embeddings API", ("model",))
+
+# Caches reported on /metrics, by name; each has plain hits and misses counters
+_caches: Dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """Report a cache's hits and misses attributes on /metrics."""
+    _caches[name] = cache
+
+
+def _cache_lookups() -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for name, cache in list(_caches.items()):
+        values[(name, "hit")] = cache.hits
+        values[(name, "miss")] = cache.misses
+    return values
+
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for name, cache in list(_caches.items()):
+        total = cache.hits + cache.misses
+        values[(name,)] = cache.hits / total if total else 0.0
+    return values
+
+
+CallbackMetric("cache_lookups_total", "Cache lookups by cache and result (hit, miss)", "counter", _cache_lookups, ("cache", "result"))
+CallbackMetric("cache_hit_ratio", "Share of cache lookups that were hits since startup", "gauge", _cache_hit_ratios, ("cache",))
+
+
+def observe_llm_call(model: str, operation: str, seconds: float, ok: bool, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    """Record one chat completion call."""
+    LLM_CALLS.labels(model, operation, "ok" if ok else "error").inc()
+    LLM_DURATION.labels(model, operation).observe(seconds)
+    if prompt_tokens:
+        LLM_TOKENS.labels(model, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(model, "completion").inc(completion_tokens)
+
+
+def observe_embedding_call(model: str, seconds: float, ok: bool, inputs: int = 0, tokens: int = 0) -> None:
+    """Record one embeddings API call."""
+    EMBEDDING_CALLS.labels(model, "ok" if ok else "error").inc()
+    EMBEDDING_DURATION.labels(model).observe(seconds)
+    if inputs:
+        EMBEDDING_INPUTS.labels(model).inc(inputs)
+    if tokens:
+        EMBEDDING_TOKENS.labels(model).inc(tokens)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight requests per route
+
+    Requests are labelled with their route path; paths that match no route share the
+    "unmatched" label. Latency runs until the last body byte is sent, so streamed
+    responses are measured in full. Written as plain ASGI rather than BaseHTTPMiddleware,
+    which would buffer streaming responses and add a task per request.
+    """
+
+    def __init__(self, app, routes: List[Any]):
+        self.app = app
+        # The application's route list; routes added after the middleware are picked up too
+        self.routes = routes
+        self._paths: frozenset = frozenset()
+        self._route_count = -1
+
+    def route_path(self, path: str) -> str:
+        if len(self.routes) != self._route_count:
+            self._paths = frozenset(getattr(route, "path", None) for route in self.routes)
+            self._route_count = len(self.routes)
+        return path if path in self._paths else UNMATCHED_PATH
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        path = self.route_path(scope["path"])
+        status = 500
+        in_flight = HTTP_IN_FLIGHT.labels(path)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_DURATION.labels(method, path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, path, str(status)).inc()
+            in_flight.dec()
+
+
+def metrics_response(registry: Registry = REGISTRY):
+    """Response for a /metrics endpoint."""
+    from starlette.responses import Response
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,107 @@
+import os
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Parsing settings (override through environment variables)
+PDF_PARSE_WORKERS = int(os.environ.get("PDF_PARSE_WORKERS", str(os.cpu_count() or 1)))
+# Start method of the parser processes; the pool is created from an ingestion thread, and
+# forking a process that has other threads running can copy locks in a held state
+PDF_PARSE_START_METHOD = os.environ.get("PDF_PARSE_START_METHOD", "spawn")
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+# Per-process state: one splitter, and the reader of the PDF the worker touched last, so
+# consecutive pages of the same file do not re-parse its cross-reference table
+_splitter: Optional[RecursiveCharacterTextSplitter] = None
+_reader: Tuple[Optional[str], Optional[PdfReader]] = (None, None)
+
+
+def make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+        is_separator_regex=False,
+    )
+
+
+def _page_chunks(path: str, page: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Extract one page and split it into (text, metadata) chunks. Runs inside a worker."""
+    global _splitter, _reader
+    if _splitter is None:
+        _splitter = make_splitter()
+    if _reader[0] != path:
+        _reader = (path, PdfReader(path))
+    # Same extraction call as langchain's PyPDFParser, so chunk text (and chunk IDs) match
+    # what PyPDFDirectoryLoader produced
+    pdf_page = _reader[1].pages[page]
+    try:
+        text = pdf_page.extract_text(extraction_mode="plain")
+    except TypeError:
+        text = pdf_page.extract_text()
+    text = (text or "").strip()
+    metadata = {"source": path, "page": page}
+    return [(chunk, metadata) for chunk in _splitter.split_text(text)]
+
+
+def page_tasks(paths: List[str]) -> Iterator[Tuple[str, int]]:
+    """Yield a (path, page number) task for every page of every PDF."""
+    for path in paths:
+        try:
+            pages = len(PdfReader(path).pages)
+        except Exception as e:
+            logger.error(f"Skipping unreadable PDF {path}: {str(e)}")
+            continue
+        for page in range(pages):
+            yield path, page
+
+
+def iter_pdf_chunks(paths: List[str], workers: int = PDF_PARSE_WORKERS) -> Iterator[Document]:
+    """
+    Parse PDFs page by page across a process pool and yield chunks as they are ready
+
+    Pages are submitted lazily with at most a few pages per worker in flight, so peak memory
+    depends on the worker count rather than on the size of the corpus. Chunks come out in
+    document and page order, matching what PyPDFDirectoryLoader plus the text splitter produce.
+    Close the generator when stopping early, so the pool is shut down right away.
+
+    Args:
+        paths: PDF files to parse
+        workers: Number of parser processes (started with PDF_PARSE_START_METHOD); 1 parses
+            in the calling process
+
+    Yields:
+        Chunk documents with "source" and "page" metadata
+    """
+    tasks = page_tasks(paths)
+    if workers <= 1:
+        for path, page in tasks:
+            for text, metadata in _page_chunks(path, page):
+                yield Document(page_content=text, metadata=metadata)
+        return
+
+    max_in_flight = workers * 4
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(PDF_PARSE_START_METHOD))
+    pending = deque()
+    try:
+        for path, page in tasks:
+            pending.append(executor.submit(_page_chunks, path, page))
+            if len(pending) >= max_in_flight:
+                for text, metadata in pending.popleft().result():
+                    yield Document(page_content=text, metadata=metadata)
+        while pending:
+            for text, metadata in pending.popleft().result():
+                yield Document(page_content=text, metadata=metadata)
+    finally:
+        # Also runs when the consumer closes the generator early (e.g. a later ingestion stage
+        # failed): pages not yet started are dropped and the workers are shut down
+        executor.shutdown(wait=True, cancel_futures=True)
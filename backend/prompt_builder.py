@@ -0,0 +1,173 @@
+import os
+import logging
+from typing import Dict, List, Any, Optional
+
+from token_counter import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget settings (override through environment variables)
+# Tokens of conversation history sent with an analysis request
+PROMPT_HISTORY_TOKENS = int(os.environ.get("PROMPT_HISTORY_TOKENS", "2000"))
+# Part of that budget reserved for the condensed summary of turns that did not fit
+PROMPT_SUMMARY_TOKENS = int(os.environ.get("PROMPT_SUMMARY_TOKENS", "300"))
+# Characters kept from each dropped user turn in the summary
+SUMMARY_TURN_CHARS = 160
+# Chat format overhead per message (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Conversation turns that are fitted to the budget; system messages in the history are
+# kept as well, ahead of the turns, because they carry instructions rather than dialogue
+HISTORY_ROLES = ("user", "assistant")
+
+
+def message_text(content: Any) -> str:
+    """
+    Text of a message's content
+
+    Content is either a string or a list of parts in the chat format
+    ([{"type": "text", "text": ...}, {"type": "image_url", ...}]); text parts are joined
+    and other parts are skipped.
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+            if not isinstance(part, dict) or part.get("type", "text") == "text"
+        )
+    return "" if content is None else str(content)
+
+
+def message_tokens(message: Dict[str, Any], model: str) -> int:
+    return count_tokens(message_text(message["content"]), model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_turns(turns: List[Dict[str, Any]], max_tokens: int, model: str) -> Optional[Dict[str, Any]]:
+    """
+    Condense dropped turns into one system message
+
+    Only the user's turns are kept, each cut to its opening words, because they carry the
+    facts about the idea; assistant turns are mostly earlier analyses. Returns None when
+    there is nothing to summarize or no room for it.
+    """
+    header = "Earlier in the conversation the user mentioned:"
+    budget = max_tokens - MESSAGE_OVERHEAD_TOKENS - count_tokens(header, model)
+    points: List[str] = []
+    # Walk back from the most recent dropped turn, so the freshest context survives
+    for turn in reversed(turns):
+        if turn["role"] != "user":
+            continue
+        text = " ".join(turn["content"].split())
+        if len(text) > SUMMARY_TURN_CHARS:
+            text = text[:SUMMARY_TURN_CHARS].rsplit(" ", 1)[0] + "..."
+        point = f"- {text}"
+        tokens = count_tokens(point, model) + 1
+        if tokens > budget:
+            break
+        points.append(point)
+        budget -= tokens
+    if not points:
+        return None
+    points.reverse()
+    return {"role": "system", "content": header + "\n" + "\n".join(points)}
+
+
+def fit_history(
+    conversation_history: Optional[List[Dict[str, Any]]],
+    max_tokens: int = PROMPT_HISTORY_TOKENS,
+    summary_tokens: int = PROMPT_SUMMARY_TOKENS,
+    model: str = "gpt-4-turbo",
+) -> List[Dict[str, Any]]:
+    """
+    Fit conversation history into a token budget
+
+    System messages are kept and counted against the budget first; if they do not all fit,
+    the ones that do are returned on their own. Of the user and assistant turns, the newest
+    are kept verbatim for as long as they fit. Older turns are dropped and, budget permitting,
+    replaced by a short summary of what the user said in them. The newest turn is kept, cut
+    down to the budget if it is longer on its own, unless there is no room left for any of
+    it. Content given as a list of parts is reduced to its text.
+
+    Args:
+        conversation_history: Messages with "role" and "content" (a string or a list of
+            content parts), oldest first
+        max_tokens: Token budget for the returned messages
+        summary_tokens: Part of the budget reserved for the summary once turns are dropped
+        model: Model whose tokenizer is used for counting
+
+    Returns:
+        The messages to send, oldest first
+    """
+    system: List[Dict[str, Any]] = []
+    turns: List[Dict[str, Any]] = []
+    for message in conversation_history or []:
+        role = message.get("role")
+        content = message_text(message.get("content"))
+        if not content.strip():
+            continue
+        if role == "system":
+            system.append({"role": role, "content": content})
+        elif role in HISTORY_ROLES:
+            turns.append({"role": role, "content": content})
+
+    system_tokens = 0
+    for i, message in enumerate(system):
+        tokens = message_tokens(message, model)
+        if system_tokens + tokens > max_tokens:
+            logger.warning(
+                f"System messages exceed the history budget of {max_tokens} tokens: "
+                f"{len(system) - i} system messages and {len(turns)} turns dropped"
+            )
+            return system[:i]
+        system_tokens += tokens
+    if not turns:
+        return system
+
+    total = system_tokens + sum(message_tokens(turn, model) for turn in turns)
+    if total <= max_tokens:
+        return system + turns
+    max_tokens = max(max_tokens - system_tokens, 0)
+
+    # Keep the newest turns that fit next to the summary
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    verbatim_budget = max(max_tokens - summary_tokens, 0)
+    for turn in reversed(turns):
+        tokens = message_tokens(turn, model)
+        if used + tokens > verbatim_budget:
+            break
+        kept.append(turn)
+        used += tokens
+    kept.reverse()
+
+    if not kept:
+        newest = turns[-1]
+        budget = max(verbatim_budget, max_tokens // 2) - MESSAGE_OVERHEAD_TOKENS
+        content = truncate_to_tokens(newest["content"], budget, model) if budget > 0 else ""
+        # With no room for any of its text the turn is dropped rather than sent empty
+        if content.strip():
+            kept = [{"role": newest["role"], "content": content}]
+            used = message_tokens(kept[0], model)
+
+    dropped = turns[:len(turns) - len(kept)]
+    summary = summarize_turns(dropped, max_tokens - used, model)
+    if summary:
+        used += message_tokens(summary, model)
+    logger.info(
+        f"History trimmed from {total} to about {system_tokens + used} tokens: "
+        f"{len(kept)} turns kept, {len(dropped)} {'summarized' if summary else 'dropped'}"
+    )
+    return system + ([summary] if summary else []) + kept
+
+
+def build_idea_prompt(idea: str, instructions: str) -> str:
+    """
+    User prompt for an analysis
+
+    The conversation is sent as separate messages, so it is not repeated here.
+    """
+    return f"""Business Idea: {idea}
+
+{instructions}"""
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Cache settings (override through environment variables)
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", os.path.join(CACHE_DIR, "responses.sqlite3"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+RESPONSE_CACHE_MEMORY_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MEMORY_ENTRIES", "512"))
+RESPONSE_CACHE_DISK_ENTRIES = int(os.environ.get("RESPONSE_CACHE_DISK_ENTRIES", "20000"))
+# Writes between two trims of the sqlite tier; the tier may exceed its bound by this much
+RESPONSE_CACHE_PRUNE_EVERY = int(os.environ.get("RESPONSE_CACHE_PRUNE_EVERY", "100"))
+
+
+def normalize_history(conversation_history: Optional[List[Dict[str, Any]]]) -> List[List[str]]:
+    """Reduce a conversation history to the (role, content) pairs that are actually sent upstream."""
+    normalized = []
+    for message in conversation_history or []:
+        if message.get("role") and message.get("content"):
+            normalized.append([str(message["role"]).strip().lower(), " ".join(str(message["content"]).split())])
+    return normalized
+
+
+def make_cache_key(
+    model: str,
+    system_message: Optional[str],
+    prompt: str,
+    conversation_history: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """Hash the inputs of a chat completion into a stable cache key."""
+    payload = json.dumps(
+        [model, system_message or "", prompt, normalize_history(conversation_history)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier LRU cache for chat completion responses.
+
+    Hot entries live in an in-memory LRU; every entry is also written to a sqlite file so
+    the cache survives restarts and is shared by workers on the same host. Entries expire
+    after ttl_seconds, and each tier is trimmed to its size bound in least-recently-used order.
+    The sqlite tier is counted and trimmed once every prune_every writes rather than on each one.
+
+    get() and set() block on sqlite; async code should use aget() and aset(), which serve
+    the memory tier inline and run the sqlite work in the threadpool.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        max_memory_entries: int = RESPONSE_CACHE_MEMORY_ENTRIES,
+        max_disk_entries: int = RESPONSE_CACHE_DISK_ENTRIES,
+        prune_every: int = RESPONSE_CACHE_PRUNE_EVERY,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = max(1, prune_every)
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_prune = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        # Caller holds the lock
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            value = self._memory_get(key, now)
+            if value is not None:
+                return value
+
+            try:
+                conn = self._connection()
+                row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] <= now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                logger.error(f"Response cache read failed: {str(e)}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in both tiers and evict the least recently used entries past the bounds."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        self._write(key, value, expires_at, now)
+
+    def _write(self, key: str, value: str, expires_at: float, now: float) -> None:
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self.prune_every:
+                    self._writes_since_prune = 0
+                    self._prune(conn)
+            except sqlite3.Error as e:
+                logger.error(f"Response cache write failed: {str(e)}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_disk_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for async callers: memory hits return at once, sqlite lookups run in the threadpool."""
+        with self._lock:
+            value = self._memory_get(key, time.time())
+        if value is not None:
+            return value
+        return await run_in_threadpool(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """set() for async callers: the memory tier is updated at once, the sqlite write runs in the threadpool."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+        await run_in_threadpool(self._write, key, value, expires_at, now)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            try:
+                self._connection().execute("DELETE FROM responses")
+            except sqlite3.Error as e:
+                logger.error(f"Response cache clear failed: {str(e)}")
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# Shared cache used by app.py
+response_cache = ResponseCache()
@@ -0,0 +1,19 @@
+from typing import List, Optional
+
+# Ideas sent by benchmark.py and load_test.py, so both tools exercise the same corpus
+SAMPLE_IDEAS = [
+    "An AI-powered fitness app for personalized workouts",
+    "A blockchain marketplace for carbon credits",
+    "VR training simulations for surgeons",
+    "An online tutoring platform matching students with retired teachers",
+    "A global social network for amateur astronomers",
+    "A data analytics dashboard for small restaurants",
+]
+
+
+def load_ideas(path: Optional[str] = None) -> List[str]:
+    """Ideas from a file with one idea per line (blank lines skipped), or SAMPLE_IDEAS without a path."""
+    if not path:
+        return list(SAMPLE_IDEAS)
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
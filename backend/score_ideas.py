@@ -0,0 +1,412 @@
+import os
+import csv
+import glob
+import json
+import time
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seeded, memoized template agents, so runs are reproducible (set TEMPLATE_DETERMINISTIC=0 to opt out)
+os.environ.setdefault("TEMPLATE_DETERMINISTIC", "1")
+
+from agents.build_agent import generate_build_plan
+from agents.longevity_agent import predict_longevity
+from agents.market_agent import analyze_market
+
+logger = logging.getLogger(__name__)
+
+# Bulk scoring settings (override through environment variables or the command line)
+SCORE_WORKERS = int(os.environ.get("SCORE_WORKERS", str(os.cpu_count() or 1)))
+# Ideas sent to a worker at a time
+SCORE_CHUNK_SIZE = int(os.environ.get("SCORE_CHUNK_SIZE", "64"))
+# Ideas written between checkpoints; with --parquet each checkpoint is also one Parquet part file
+SCORE_CHECKPOINT_ROWS = int(os.environ.get("SCORE_CHECKPOINT_ROWS", "5000"))
+
+# Template agents by the analysis names used by the /analyze endpoints
+AGENTS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "market-analysis": analyze_market,
+    "longevity-prediction": predict_longevity,
+    "build-plan": generate_build_plan,
+}
+
+# Flat output columns per analysis: (column, Parquet type, extractor)
+COLUMNS: Dict[str, List[Tuple[str, str, Callable[[Dict[str, Any]], Any]]]] = {
+    "market-analysis": [
+        ("market_total_users", "int64", lambda r: r["market_size"]["total_users"]),
+        ("market_arpu", "float64", lambda r: r["market_size"]["arpu"]),
+        ("market_tam", "float64", lambda r: r["market_size"]["tam"]),
+        ("market_segments", "string", lambda r: "; ".join(s["name"] for s in r["segments"])),
+        ("market_top_country", "string", lambda r: r["geographic_insights"]["top_countries"][0]["country"]),
+    ],
+    "longevity-prediction": [
+        ("longevity_score", "float64", lambda r: r["longevity_score"]),
+        ("longevity_category", "string", lambda r: r["historical_analog"]["category"]),
+        ("longevity_analog", "string", lambda r: r["historical_analog"]["historical_analog"]["name"]),
+        ("longevity_years_to_saturation", "int64", lambda r: r["years_to_saturation"]),
+        ("longevity_final_adoption", "float64", lambda r: r["adoption_curve"][-1]["adoption"]),
+    ],
+    "build-plan": [
+        ("build_mvp_weeks", "int64", lambda r: r["timeline"]["mvp_weeks"]),
+        ("build_launch_date", "string", lambda r: r["timeline"]["launch"]),
+        ("build_cost", "float64", lambda r: r["resources"]["cost"]),
+        ("build_developers", "int64", lambda r: r["resources"]["developers"]),
+        ("build_stack", "string", lambda r: "; ".join(r["tech_stack"])),
+    ],
+}
+
+
+def read_ideas(path: str, idea_field: str = "idea") -> Iterator[Dict[str, Any]]:
+    """
+    Stream ideas from a CSV file (with a header row) or a JSONL file
+
+    Every row keeps its position in the file as "index", including rows that fail to parse,
+    so a checkpoint can skip exactly the rows that were already scored. An "id" column or
+    field is passed through, and JSONL rows may carry an "additional_context" object.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for index, row in enumerate(csv.DictReader(f)):
+                context = row.get("additional_context")
+                try:
+                    context = json.loads(context) if context else None
+                except json.JSONDecodeError:
+                    context = None
+                yield {"index": index, "id": row.get("id"), "idea": (row.get(idea_field) or "").strip(), "additional_context": context}
+        else:
+            for index, line in enumerate(f):
+                try:
+                    row = json.loads(line) if line.strip() else {}
+                except json.JSONDecodeError:
+                    logger.warning(f"{path}:{index + 1}: not valid JSON")
+                    row = {}
+                if isinstance(row, str):
+                    row = {idea_field: row}
+                elif not isinstance(row, dict):
+                    # Numbers, lists and the like are scored as empty ideas, like unparseable lines
+                    logger.warning(f"{path}:{index + 1}: expected a JSON object or string, got {type(row).__name__}")
+                    row = {}
+                context = row.get("additional_context")
+                yield {
+                    "index": index,
+                    "id": row.get("id"),
+                    "idea": str(row.get(idea_field) or "").strip(),
+                    "additional_context": context if isinstance(context, dict) else None,
+                }
+
+
+def score_idea(row: Dict[str, Any], agents: List[str], full: bool = False) -> Dict[str, Any]:
+    """Run the selected agents on one idea and flatten their results into one record."""
+    record = {"index": row["index"], "id": row["id"], "idea": row["idea"]}
+    results = {}
+    errors = []
+    for name in agents:
+        if not row["idea"]:
+            result = {"error": "empty idea"}
+        else:
+            try:
+                result = AGENTS[name](row["idea"], row["additional_context"])
+            except Exception as e:
+                result = {"error": str(e)}
+        for column, _, extract in COLUMNS[name]:
+            try:
+                record[column] = None if "error" in result else extract(result)
+            except (KeyError, IndexError, TypeError):
+                record[column] = None
+        if "error" in result:
+            errors.append(f"{name}: {result['error']}")
+        results[name] = result
+    record["error"] = "; ".join(errors) or None
+    if full:
+        record["results"] = results
+    return record
+
+
+def _init_worker(log_level: int) -> None:
+    # The agents log every call at INFO, which would dominate the run time of a bulk job
+    logging.getLogger("agents").setLevel(log_level)
+
+
+def _score_chunk(rows: List[Dict[str, Any]], agents: List[str], full: bool) -> List[Dict[str, Any]]:
+    """Score a chunk of ideas. Runs inside a worker."""
+    return [score_idea(row, agents, full) for row in rows]
+
+
+def iter_scores(
+    rows: Iterator[Dict[str, Any]],
+    agents: List[str],
+    workers: int = SCORE_WORKERS,
+    chunk_size: int = SCORE_CHUNK_SIZE,
+    full: bool = False,
+    log_level: int = logging.WARNING,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Score ideas across a process pool and yield the records in input order
+
+    Chunks are submitted lazily with a few chunks per worker in flight, so memory stays
+    bounded however long the input is.
+
+    Args:
+        rows: Ideas from read_ideas
+        agents: Analysis names to run (keys of AGENTS)
+        workers: Number of scoring processes; 1 scores in the calling process
+        chunk_size: Ideas per task sent to a worker
+        full: Include the complete agent results under "results"
+        log_level: Log level of the agents' loggers
+
+    Yields:
+        One flat record per idea
+    """
+    chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+    if workers <= 1:
+        _init_worker(log_level)
+        for chunk in chunks:
+            yield from _score_chunk(chunk, agents, full)
+        return
+
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_level,)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk, chunk, agents, full))
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class Checkpoint:
+    """
+    Progress of a scoring run, saved next to the output after every flushed block of rows
+
+    Records how many input rows are fully written, the size of the JSONL output at that
+    point and the number of Parquet parts, so a resumed run can cut off anything written
+    after the last checkpoint and continue with the next row. The outputs of the run are
+    recorded too: a resumed run must write the same ones, or the rows scored before the
+    checkpoint would be missing from one of them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.input: Optional[str] = None
+        self.agents: List[str] = []
+        self.parquet_dir: Optional[str] = None
+        self.full = False
+        self.rows = 0
+        self.jsonl_bytes = 0
+        self.parquet_parts = 0
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        checkpoint = cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        checkpoint.input = data["input"]
+        checkpoint.agents = data["agents"]
+        checkpoint.parquet_dir = data.get("parquet_dir")
+        checkpoint.full = data.get("full", False)
+        checkpoint.rows = data["rows"]
+        checkpoint.jsonl_bytes = data["jsonl_bytes"]
+        checkpoint.parquet_parts = data.get("parquet_parts", 0)
+        return checkpoint
+
+    def save(self) -> None:
+        data = {
+            "input": self.input,
+            "agents": self.agents,
+            "parquet_dir": self.parquet_dir,
+            "full": self.full,
+            "rows": self.rows,
+            "jsonl_bytes": self.jsonl_bytes,
+            "parquet_parts": self.parquet_parts,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+class ParquetParts:
+    """Writes each flushed block of records as the next part-NNNNN.parquet file of a directory."""
+
+    def __init__(self, directory: str, agents: List[str], full: bool = False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires the pyarrow package: pip install pyarrow (see requirements-optional.txt)") from e
+
+        self.pa = pa
+        self.pq = pq
+        self.directory = directory
+        self.full = full
+        fields = [("index", pa.int64()), ("id", pa.string()), ("idea", pa.string())]
+        for name in agents:
+            fields.extend((column, pa.type_for_alias(dtype)) for column, dtype, _ in COLUMNS[name])
+        fields.append(("error", pa.string()))
+        if full:
+            # Nested results are stored as JSON text
+            fields.append(("results", pa.string()))
+        self.schema = pa.schema(fields)
+        os.makedirs(directory, exist_ok=True)
+
+    def part_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"part-{number:05d}.parquet")
+
+    def truncate(self, parts: int) -> None:
+        """Remove the part files from number `parts` on."""
+        for path in glob.glob(os.path.join(self.directory, "part-*.parquet")):
+            if int(os.path.basename(path)[5:10]) >= parts:
+                os.remove(path)
+
+    def write(self, number: int, records: List[Dict[str, Any]]) -> None:
+        if self.full:
+            records = [dict(record, results=json.dumps(record["results"], default=str)) for record in records]
+        if any(record["id"] is not None for record in records):
+            records = [dict(record, id=str(record["id"])) if record["id"] is not None else record for record in records]
+        table = self.pa.Table.from_pylist(records, schema=self.schema)
+        self.pq.write_table(table, self.part_path(number))
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    agents: List[str],
+    parquet_dir: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = False,
+    workers: int = SCORE_WORKERS,
+    chunk_size: int = SCORE_CHUNK_SIZE,
+    checkpoint_rows: int = SCORE_CHECKPOINT_ROWS,
+    idea_field: str = "idea",
+    limit: Optional[int] = None,
+    context: Optional[Dict[str, Any]] = None,
+    full: bool = False,
+    log_level: int = logging.WARNING,
+) -> Checkpoint:
+    """
+    Score every idea of a CSV or JSONL file with the template agents
+
+    Records are written in input order to a JSONL file and, optionally, to Parquet part files.
+    After every checkpoint_rows ideas both outputs are flushed and the checkpoint is saved;
+    with resume=True a run picks up after the last saved checkpoint. context is merged under
+    every row's additional_context, e.g. {"adoption_samples": 1000} for a faster longevity forecast.
+
+    Returns:
+        The final checkpoint
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.json"
+
+    checkpoint = Checkpoint(checkpoint_path)
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = Checkpoint.load(checkpoint_path)
+        if checkpoint.input != os.path.abspath(input_path) or checkpoint.agents != agents:
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} belongs to a run over {checkpoint.input} with analyses "
+                f"{', '.join(checkpoint.agents)}; start over without --resume"
+            )
+        parquet_path = os.path.abspath(parquet_dir) if parquet_dir else None
+        if checkpoint.rows and (checkpoint.parquet_dir != parquet_path or checkpoint.full != full):
+            written = f"Parquet parts in {checkpoint.parquet_dir}" if checkpoint.parquet_dir else "no Parquet output"
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} belongs to a run with {written} and full={checkpoint.full}; "
+                f"resume with the same --parquet and --full options, or start over without --resume"
+            )
+        print(f"Resuming after {checkpoint.rows} ideas")
+    checkpoint.input = os.path.abspath(input_path)
+    checkpoint.agents = agents
+    checkpoint.parquet_dir = os.path.abspath(parquet_dir) if parquet_dir else None
+    checkpoint.full = full
+    parquet = ParquetParts(parquet_dir, agents, full) if parquet_dir else None
+
+    # Drop anything written after the last checkpoint
+    with open(output_path, "ab") as f:
+        f.truncate(checkpoint.jsonl_bytes)
+    if parquet:
+        parquet.truncate(checkpoint.parquet_parts)
+
+    rows = islice(read_ideas(input_path, idea_field), checkpoint.rows, limit)
+    if context:
+        rows = (dict(row, additional_context={**context, **(row["additional_context"] or {})}) for row in rows)
+    start = time.perf_counter()
+    scored = 0
+    errors = 0
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        def flush(block: List[Dict[str, Any]]) -> None:
+            for record in block:
+                out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            if parquet:
+                parquet.write(checkpoint.parquet_parts, block)
+                checkpoint.parquet_parts += 1
+            checkpoint.rows += len(block)
+            checkpoint.jsonl_bytes = out.tell()
+            checkpoint.save()
+            elapsed = time.perf_counter() - start
+            print(f"Scored {checkpoint.rows} ideas ({scored / elapsed:.0f} ideas/s)")
+
+        block = []
+        for record in iter_scores(rows, agents, workers, chunk_size, full, log_level):
+            block.append(record)
+            scored += 1
+            errors += record["error"] is not None
+            if len(block) >= checkpoint_rows:
+                flush(block)
+                block = []
+        if block:
+            flush(block)
+
+    elapsed = time.perf_counter() - start
+    rate = scored / elapsed if elapsed > 0 else 0.0
+    print(f"Scored {scored} ideas in {elapsed:.1f}s ({rate:.0f} ideas/s) with {workers} workers, {errors} with errors.")
+    return checkpoint
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Score ideas from a CSV or JSONL file with the template agents")
+    parser.add_argument("input", help="CSV file with a header row, or JSONL file with one idea object (or string) per line")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file to write one flat record per idea to")
+    parser.add_argument("--parquet", help="Also write the records as Parquet part files into this directory (needs pyarrow)")
+    parser.add_argument("--analyses", default=",".join(AGENTS), help=f"Comma-separated analyses to run (default: {','.join(AGENTS)})")
+    parser.add_argument("--idea-field", default="idea", help="CSV column or JSON field that holds the idea")
+    parser.add_argument("--workers", type=int, default=SCORE_WORKERS, help="Scoring processes; 1 scores in-process")
+    parser.add_argument("--chunk-size", type=int, default=SCORE_CHUNK_SIZE, help="Ideas per task sent to a worker")
+    parser.add_argument("--checkpoint-rows", type=int, default=SCORE_CHECKPOINT_ROWS, help="Ideas written between checkpoints")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last checkpoint instead of starting over")
+    parser.add_argument("--limit", type=int, help="Stop after this many input rows")
+    parser.add_argument("--context", type=json.loads, help='JSON object merged into every idea\'s additional_context, e.g. \'{"adoption_samples": 1000}\'')
+    parser.add_argument("--full", action="store_true", help="Include the complete agent results in every record")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agents' per-idea INFO logging")
+    args = parser.parse_args()
+
+    agents = [name.strip() for name in args.analyses.split(",") if name.strip()]
+    unknown = [name for name in agents if name not in AGENTS]
+    if unknown or not agents:
+        parser.error(f"Unknown analyses: {', '.join(unknown)}. Choose from: {', '.join(AGENTS)}")
+
+    score_file(
+        args.input,
+        args.output,
+        agents,
+        parquet_dir=args.parquet,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        checkpoint_rows=args.checkpoint_rows,
+        idea_field=args.idea_field,
+        limit=args.limit,
+        context=args.context,
+        full=args.full,
+        log_level=logging.INFO if args.verbose else logging.WARNING,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call
+
+    The first caller for a key starts the call as its own task; callers that arrive while it
+    is running wait on the same task and receive its result or exception. The task is
+    shielded, so one caller disconnecting does not cancel the call for the others.
+    Finished calls are forgotten immediately; caching results is left to the response cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0  # Upstream calls started
+        self.coalesced = 0  # Callers that joined a call already in flight
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Identity of the call; callers with equal keys share one result
+            fn: Zero-argument coroutine function making the upstream call
+
+        Returns:
+            The result of fn
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.info(f"Joined in-flight call {key[:12]} ({self.coalesced} coalesced so far)")
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
@@ -0,0 +1,28 @@
+import json
+from typing import Any, Optional
+
+# Response headers for Server-Sent Event streams: disable caching and proxy buffering
+# so each event reaches the client as soon as it is written
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """
+    Format a payload as a Server-Sent Event
+
+    Args:
+        data: JSON-serializable payload for the event's data field
+        event: Optional event name
+
+    Returns:
+        The event encoded as text, terminated by a blank line
+    """
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    # JSON encoding escapes newlines, so the payload always fits on one data line
+    message += f"data: {json.dumps(data, default=str)}\n\n"
+    return message
@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import importlib
+import threading
+import subprocess
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Startup settings (override through environment variables)
+# Build lazy clients and import deferred modules in a background thread once the server is up
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "1") != "0"
+# Import-time budget per module for the startup report, in milliseconds
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "500"))
+
+# Entry points checked by the startup report
+DEFAULT_MODULES = ["app", "ask", "fill_db"]
+
+
+def lazy(factory: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    Turn a factory into a getter that builds its value on first use
+
+    The factory runs at most once, even when several threads ask at the same time. If it
+    raises, nothing is cached and the next call tries again, so a missing credential or an
+    unreachable service surfaces on the request that needs it rather than at import.
+    """
+    lock = threading.Lock()
+    state: Dict[str, Any] = {}
+
+    @wraps(factory)
+    def get():
+        if "value" not in state:
+            with lock:
+                if "value" not in state:
+                    state["value"] = factory()
+        return state["value"]
+
+    get.loaded = lambda: "value" in state
+    get.reset = state.clear
+    return get
+
+
+class lazy_import:
+    """
+    Callable stand-in for a function of a module that is imported on the first call
+
+    lazy_import("agents.market_agent", "analyze_market")(idea) imports the module, then
+    calls analyze_market(idea); later calls go straight to the function.
+    """
+
+    def __init__(self, module: str, attribute: str):
+        self.module = module
+        self.attribute = attribute
+        self._target: Optional[Callable] = None
+
+    def resolve(self) -> Callable:
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self.module), self.attribute)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"lazy_import({self.module!r}, {self.attribute!r})"
+
+
+def warm_up(*loaders: Callable[[], Any]) -> Optional[threading.Thread]:
+    """
+    Run loaders (lazy getters, lazy_import.resolve) in a background daemon thread
+
+    Called from a startup event, this lets the server accept requests right away while
+    clients and deferred imports are prepared. Failures are logged, not raised; the
+    request that needs the resource retries it. Does nothing when STARTUP_WARMUP=0.
+    """
+    if not STARTUP_WARMUP or not loaders:
+        return None
+
+    def run():
+        start = time.perf_counter()
+        for loader in loaders:
+            try:
+                loader()
+            except Exception as e:
+                logger.warning(f"Warm-up of {getattr(loader, '__qualname__', loader)} failed: {str(e)}")
+        logger.info(f"Warm-up finished in {(time.perf_counter() - start) * 1000.0:.0f} ms")
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse "python -X importtime" output into [{module, self_ms, cumulative_ms, depth}]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000.0,
+            "cumulative_ms": int(cumulative_us) / 1000.0,
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return rows
+
+
+def measure_import(module: str, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters and report how long it took
+
+    The fastest of `repeat` runs is kept, which filters out disk-cache and scheduling noise.
+
+    Args:
+        module: Module to import, relative to this directory
+        repeat: Number of fresh interpreters to try
+
+    Returns:
+        total_ms (the module's cumulative import time), the top-level imports that make it
+        up, or error with the interpreter's output if the import failed
+    """
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1:] or ["import failed"]}
+        rows = parse_importtime(result.stderr)
+        end = next((i for i in range(len(rows) - 1, -1, -1) if rows[i]["module"] == module and rows[i]["depth"] == 0), None)
+        if end is None:
+            continue
+        # A module is reported after its imports; walk back to the previous top-level import
+        start = end
+        while start > 0 and rows[start - 1]["depth"] > 0:
+            start -= 1
+        total = rows[end]["cumulative_ms"]
+        if best is None or total < best["total_ms"]:
+            children = [row for row in rows[start:end] if row["depth"] == 1]
+            best = {"module": module, "total_ms": total, "imports": sorted(children, key=lambda row: -row["cumulative_ms"])}
+    return best or {"module": module, "error": ["no import time reported"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time per entry point and check it against a budget")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help=f"Modules to import (default: {' '.join(DEFAULT_MODULES)})")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Import-time budget per module")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module; the fastest run counts")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports listed per module")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        report = measure_import(module, args.repeat)
+        if "error" in report:
+            print(f"{module:<12} import failed: {report['error'][0]}")
+            over_budget.append(module)
+            continue
+        status = "ok" if report["total_ms"] <= args.budget_ms else "OVER BUDGET"
+        print(f"{module:<12} {report['total_ms']:>8.1f} ms  (budget {args.budget_ms:.0f} ms)  {status}")
+        for row in report["imports"][:args.top]:
+            print(f"    {row['module']:<36} {row['cumulative_ms']:>8.1f} ms")
+        if report["total_ms"] > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\n{len(over_budget)} module(s) failed or exceeded the budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from agents.agent_cache import agent_seed
+from agents.adoption_model import (
+    DEFAULT_HORIZON,
+    DEFAULT_SAMPLES,
+    DEFAULT_YEARS_TO_PEAK,
+    MAX_HORIZON,
+    MAX_SAMPLES,
+    analog_years_to_peak,
+    bass_curves,
+    logistic_curves,
+    simulate_adoption,
+    simulation_settings,
+)
+
+ANALOG = {"name": "VR Headsets (2016)", "peak_adoption": 30, "peak_year": 2022}
+
+
+def test_settings_defaults_and_clamping():
+    assert simulation_settings(None) == {"model": "logistic", "samples": DEFAULT_SAMPLES, "horizon": DEFAULT_HORIZON}
+    settings = simulation_settings({"adoption_samples": 10 ** 9, "adoption_horizon": 0, "adoption_model": "BASS"})
+    assert settings == {"model": "bass", "samples": MAX_SAMPLES, "horizon": 1}
+    settings = simulation_settings({"adoption_samples": "many", "adoption_horizon": 99, "adoption_model": "gompertz"})
+    assert settings == {"model": "logistic", "samples": DEFAULT_SAMPLES, "horizon": MAX_HORIZON}
+
+
+def test_request_limits_stay_cheap():
+    # A request at the limits must stay within a small multiple of the default run
+    assert MAX_SAMPLES <= 2 * DEFAULT_SAMPLES
+    assert MAX_HORIZON <= 2 * DEFAULT_HORIZON
+
+
+def test_years_to_peak_from_the_analog_name():
+    assert analog_years_to_peak(ANALOG) == 6.0
+    assert analog_years_to_peak({"name": "Smartphones"}) == DEFAULT_YEARS_TO_PEAK
+    assert analog_years_to_peak({"name": "Late (2030)", "peak_year": 2020}) == DEFAULT_YEARS_TO_PEAK
+
+
+def test_curves_hit_their_landmarks():
+    ceiling, speed, midpoint = np.array([[50.0]]), np.array([[1.0]]), np.array([[3.0]])
+    assert logistic_curves(np.array([[3.0]]), ceiling, speed, midpoint)[0, 0] == pytest.approx(25.0)
+    t = np.array([[0.0, 100.0]])
+    bass = bass_curves(t, ceiling, np.array([[0.03]]), np.array([[0.4]]))
+    assert bass[0, 0] == pytest.approx(0.0)
+    assert bass[0, 1] == pytest.approx(50.0)
+
+
+@pytest.mark.parametrize("model", ["logistic", "bass"])
+def test_bands_are_ordered_and_bounded(model):
+    result = simulate_adoption(ANALOG, 2025, samples=5000, horizon=8, model=model, seed=1)
+    assert [band["year"] for band in result["bands"]] == list(range(2025, 2033))
+    for band in result["bands"]:
+        assert 0.0 <= band["p10"] <= band["p50"] <= band["p90"] <= 100.0
+    medians = [point["adoption"] for point in result["median_curve"]]
+    assert medians == [band["p50"] for band in result["bands"]]
+    # Cumulative adoption never falls
+    assert medians == sorted(medians)
+    # The median settles near the analog's peak adoption
+    assert simulate_adoption(ANALOG, 2025, samples=5000, horizon=30, model=model, seed=1)["bands"][-1]["p50"] == pytest.approx(30, rel=0.1)
+
+
+def test_extreme_ceilings_are_clipped():
+    result = simulate_adoption({"name": "X (2020)", "peak_adoption": 99, "peak_year": 2021}, 2025, samples=2000, horizon=10, seed=2)
+    assert max(band["p90"] for band in result["bands"]) <= 100.0
+
+
+def test_seed_makes_forecasts_reproducible():
+    first = simulate_adoption(ANALOG, 2025, samples=1000, seed=42)
+    assert first == simulate_adoption(ANALOG, 2025, samples=1000, seed=42)
+    assert first != simulate_adoption(ANALOG, 2025, samples=1000, seed=43)
+
+
+def test_agent_seed_depends_on_idea_agent_and_version():
+    seed = agent_seed("An AI fitness app", "longevity", "2")
+    assert seed == agent_seed("An AI fitness app", "longevity", "2")
+    assert 0 <= seed < 2 ** 64
+    assert len({seed, agent_seed("Another idea", "longevity", "2"), agent_seed("An AI fitness app", "market", "2"), agent_seed("An AI fitness app", "longevity", "3")}) == 4
+
+
+def test_seeded_agent_rng_gives_the_same_forecast():
+    def forecast(idea):
+        rng = random.Random(agent_seed(idea, "longevity", "2"))
+        return simulate_adoption(ANALOG, 2025, samples=500, seed=rng.getrandbits(64))
+
+    assert forecast("An AI fitness app") == forecast("An AI fitness app")
+    assert forecast("An AI fitness app") != forecast("A crypto wallet")
@@ -0,0 +1,50 @@
+import pytest
+
+from agents import agent_cache
+from agents.agent_cache import AgentMemo, memoized_agent
+
+
+@pytest.fixture
+def deterministic(monkeypatch):
+    monkeypatch.setattr(agent_cache, "TEMPLATE_DETERMINISTIC", True)
+    monkeypatch.setattr(agent_cache, "agent_memo", AgentMemo(max_entries=4))
+    return agent_cache
+
+
+def counting_agent(calls):
+    @memoized_agent("test", "1")
+    def agent(idea, additional_context=None):
+        calls.append(idea)
+        if idea == "fail":
+            return {"error": "no analog"}
+        return {"idea": idea, "risks": ["competition"], "numbers": {"tam": 10}}
+    return agent
+
+
+def test_results_are_memoized_per_idea_and_context(deterministic):
+    calls = []
+    agent = counting_agent(calls)
+    assert agent("a") == agent("a")
+    agent("a", {"adoption_samples": 1000})
+    agent("fail")
+    agent("fail")
+    assert calls == ["a", "a", "fail", "fail"]
+    assert deterministic.agent_memo.hits == 1
+
+
+def test_callers_cannot_change_the_memoized_result(deterministic):
+    agent = counting_agent([])
+    first = agent("a")
+    first["source"] = "template"
+    first["risks"].append("regulation")
+    first["numbers"]["tam"] = 0
+    assert agent("a") == {"idea": "a", "risks": ["competition"], "numbers": {"tam": 10}}
+
+
+def test_memoization_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(agent_cache, "TEMPLATE_DETERMINISTIC", False)
+    calls = []
+    agent = counting_agent(calls)
+    agent("a")
+    agent("a")
+    assert calls == ["a", "a"]
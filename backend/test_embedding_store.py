@@ -0,0 +1,127 @@
+import multiprocessing
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore, embed_texts, embedding_dimension, plan_batches, text_hash
+
+MODEL = "text-embedding-3-large"
+
+
+def vector_for(text, dim=8):
+    return np.random.default_rng(int(text_hash(text)[:8], 16)).random(dim, dtype=np.float32)
+
+
+def write_range(directory, start, stop):
+    store = EmbeddingStore(directory)
+    for i in range(start, stop, 5):
+        texts = [f"text {j}" for j in range(i, min(i + 5, stop))]
+        store.put_many(MODEL, None, texts, [vector_for(text) for text in texts])
+
+
+def test_round_trip_and_reopen(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    assert store.get(MODEL, None, "hello") is None
+    store.put(MODEL, None, "hello", vector_for("hello"))
+    store.put_many(MODEL, None, ["a", "b"], [vector_for("a", 3), vector_for("b", 5)])
+
+    for current in (store, EmbeddingStore(str(tmp_path))):
+        np.testing.assert_array_equal(current.get(MODEL, None, "hello"), vector_for("hello"))
+        found = current.get_many(MODEL, None, ["b", "missing", "a"])
+        np.testing.assert_array_equal(found[0], vector_for("b", 5))
+        assert found[1] is None
+        np.testing.assert_array_equal(found[2], vector_for("a", 3))
+        assert len(current) == 3
+
+
+def test_keys_include_model_and_dimensions(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put(MODEL, None, "hello", vector_for("hello"))
+    assert store.get(MODEL, 256, "hello") is None
+    assert store.get("other-model", None, "hello") is None
+    assert (store.hits, store.misses) == (0, 2)
+
+
+def test_stored_texts_are_not_appended_again(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put(MODEL, None, "hello", vector_for("hello"))
+    size = (tmp_path / "vectors.f32").stat().st_size
+    store.put_many(MODEL, None, ["hello"], [vector_for("hello")])
+    assert (tmp_path / "vectors.f32").stat().st_size == size
+
+
+def test_instances_see_each_others_appends(tmp_path):
+    first = EmbeddingStore(str(tmp_path))
+    second = EmbeddingStore(str(tmp_path))
+    first.put(MODEL, None, "a", vector_for("a"))
+    # second has not read the index yet; its offsets must come from the file, not from memory
+    second.put(MODEL, None, "b", vector_for("b"))
+    first.put(MODEL, None, "c", vector_for("c"))
+
+    for store in (first, second, EmbeddingStore(str(tmp_path))):
+        for text in "abc":
+            np.testing.assert_array_equal(store.get(MODEL, None, text), vector_for(text))
+
+
+def test_unfinished_index_line_is_skipped(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put(MODEL, None, "a", vector_for("a"))
+    with open(tmp_path / "index.tsv", "a", encoding="utf-8") as f:
+        f.write("partial-key\t8")
+    store.put(MODEL, None, "b", vector_for("b"))
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert len(reopened) == 2
+    np.testing.assert_array_equal(reopened.get(MODEL, None, "b"), vector_for("b"))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_two_writer_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(target=write_range, args=(str(tmp_path), 0, 300)),
+        context.Process(target=write_range, args=(str(tmp_path), 200, 500)),
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+
+    store = EmbeddingStore(str(tmp_path))
+    assert len(store) == 500
+    for i in range(500):
+        np.testing.assert_array_equal(store.get(MODEL, None, f"text {i}"), vector_for(f"text {i}"))
+
+
+def test_plan_batches_respects_input_limit():
+    batches = plan_batches(["one two"] * 7, max_tokens=10 ** 6, max_inputs=3)
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_embed_texts_requests_only_missing_unique_texts(tmp_path):
+    requests = []
+
+    def create(input, model, **kwargs):
+        requests.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=vector_for(text).tolist()) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data, usage=SimpleNamespace(prompt_tokens=len(input)))
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    store = EmbeddingStore(str(tmp_path))
+    store.put(MODEL, None, "cached", vector_for("cached"))
+
+    results = embed_texts(client, ["new", "cached", "new", "other"], store=store)
+    assert sorted(text for batch in requests for text in batch) == ["new", "other"]
+    for text, result in zip(["new", "cached", "new", "other"], results):
+        np.testing.assert_allclose(result, vector_for(text))
+    np.testing.assert_array_equal(store.get(MODEL, None, "other"), vector_for("other"))
+
+
+def test_embedding_dimension_follows_the_config():
+    assert embedding_dimension(MODEL, None) == 3072
+    assert embedding_dimension("text-embedding-3-small", None) == 1536
+    assert embedding_dimension(MODEL, 256) == 256
+    with pytest.raises(ValueError):
+        embedding_dimension("custom-embedder", None)
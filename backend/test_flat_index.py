@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from flat_index import FlatIndex, FlatVectorStore
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def as_records(matrix, prefix="v"):
+    return [{"id": f"{prefix}{i}", "values": row.tolist(), "metadata": {"text": f"{prefix}{i}"}} for i, row in enumerate(matrix)]
+
+
+def brute_force(matrix, query, top_k):
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores)[:top_k]
+    return [int(i) for i in order], scores[order]
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float16", 2e-3), ("int8", 3e-2)])
+def test_search_matches_brute_force(tmp_path, dtype, tolerance):
+    matrix = random_vectors(2500)
+    index = FlatIndex(str(tmp_path), dtype)
+    index.upsert(as_records(matrix))
+    queries = random_vectors(5, seed=1)
+
+    for query, hits in zip(queries, index.search(queries, top_k=10)):
+        expected_rows, expected_scores = brute_force(matrix, query, 50)
+        rows = [row for row, _ in hits]
+        scores = np.array([score for _, score in hits])
+        assert np.all(np.diff(scores) <= 0)
+        # Quantization may swap near ties, but every hit must be a near-top row with a close score
+        assert set(rows) <= set(expected_rows)
+        assert abs(scores[0] - expected_scores[0]) < tolerance
+        exact = matrix[rows] / np.linalg.norm(matrix[rows], axis=1, keepdims=True) @ (query / np.linalg.norm(query))
+        np.testing.assert_allclose(scores, exact, atol=tolerance)
+
+
+def test_upsert_replaces_and_delete_hides_rows(tmp_path):
+    matrix = random_vectors(20)
+    store = FlatVectorStore(str(tmp_path))
+    store.upsert(as_records(matrix))
+    target = matrix[3]
+
+    assert store.query(target.tolist(), top_k=1).matches[0]["id"] == "v3"
+    # Move v3 elsewhere; its old row must no longer match
+    store.upsert([{"id": "v3", "values": (-target).tolist(), "metadata": {"text": "moved"}}])
+    best = store.query(target.tolist(), top_k=1).matches[0]
+    assert best["id"] != "v3"
+    assert store.query((-target).tolist(), top_k=1).matches[0]["metadata"] == {"text": "moved"}
+
+    store.delete(["v3"])
+    ids = [m["id"] for m in store.query((-target).tolist(), top_k=25).matches]
+    assert "v3" not in ids and len(ids) == 19
+
+
+def test_reopen_and_delete_all(tmp_path):
+    matrix = random_vectors(10)
+    FlatVectorStore(str(tmp_path)).upsert(as_records(matrix))
+    reopened = FlatVectorStore(str(tmp_path))
+    assert reopened.index.count == 10
+    assert reopened.query(matrix[7].tolist(), top_k=1).matches[0]["id"] == "v7"
+
+    reopened.delete_all()
+    assert reopened.query(matrix[7].tolist()).matches == []
+
+
+def test_reader_picks_up_writes_from_another_instance(tmp_path):
+    matrix = random_vectors(30)
+    reader = FlatVectorStore(str(tmp_path))
+    assert reader.query(matrix[0].tolist()).matches == []
+
+    writer = FlatVectorStore(str(tmp_path))
+    writer.upsert(as_records(matrix[:10]))
+    assert reader.query(matrix[4].tolist(), top_k=1).matches[0]["id"] == "v4"
+
+    # A rebuild replaces the files; the reader must not mix old offsets with the new metadata
+    writer.delete_all()
+    writer.upsert(as_records(matrix[10:], prefix="w"))
+    assert reader.index.count == 10
+    assert reader.query(matrix[15].tolist(), top_k=1).matches[0]["id"] == "w5"
+    assert reader.index.count == 20
+
+
+def test_snapshot_outlives_a_rebuild(tmp_path):
+    matrix = random_vectors(10)
+    store = FlatVectorStore(str(tmp_path))
+    store.upsert(as_records(matrix))
+    snapshot = store.index.snapshot()
+    hits = store.index.search([matrix[2]], 1, snapshot)[0]
+
+    store.delete_all()
+    store.upsert(as_records(random_vectors(3, seed=5), prefix="new"))
+    assert snapshot.records([row for row, _ in hits])[0]["id"] == "v2"
+
+
+def test_query_batch_matches_single_queries(tmp_path):
+    matrix = random_vectors(50)
+    store = FlatVectorStore(str(tmp_path))
+    store.upsert(as_records(matrix))
+    queries = random_vectors(4, seed=3).tolist()
+    batch = store.query_batch(queries, top_k=5)
+    for result, query in zip(batch, queries):
+        single = store.query(query, top_k=5).matches
+        assert [m["id"] for m in result.matches] == [m["id"] for m in single]
+        np.testing.assert_allclose([m["score"] for m in result.matches], [m["score"] for m in single], rtol=1e-5)
+
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    index = FlatIndex(str(tmp_path))
+    index.upsert(as_records(random_vectors(2, dim=8)))
+    with pytest.raises(ValueError):
+        index.upsert(as_records(random_vectors(2, dim=4)))
+
+
+def test_store_with_a_different_embedding_dimension(tmp_path, caplog):
+    FlatVectorStore(str(tmp_path), dimension=16).upsert(as_records(random_vectors(10)))
+    # Opening still works, so that fill_db.py --full can rebuild the index
+    store = FlatVectorStore(str(tmp_path), dimension=32)
+    assert "Rebuild it with fill_db.py --full" in caplog.text
+    with pytest.raises(ValueError, match="dimension"):
+        store.query(random_vectors(1, dim=32)[0].tolist())
+    store.delete_all()
+    store.upsert(as_records(random_vectors(10, dim=32)))
+    assert len(store.query(random_vectors(1, dim=32)[0].tolist(), top_k=3).matches) == 3
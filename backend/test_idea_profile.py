@@ -0,0 +1,68 @@
+import pytest
+
+from agents.idea_profile import CATEGORY_KEYWORDS, KeywordMatcher, get_idea_profile, tokenize
+
+
+def brute_force_find(phrases, tokens):
+    """Every occurrence of every phrase, by trying each phrase at each position."""
+    found = []
+    for start in range(len(tokens)):
+        for phrase in phrases:
+            if tuple(tokens[start:start + len(phrase)]) == phrase:
+                found.append((start, start + len(phrase), phrase))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("idea, categories", [
+    ("An AI-powered fitness app for personalized workouts", {"ai", "health", "software"}),
+    ("A machine learning platform for students", {"ai", "software", "education"}),
+    # "learning" inside "machine learning" is not an education keyword
+    ("A machine learning platform for engineers", {"ai", "software"}),
+    ("Maintain HTML templates", set()),
+    ("NFTs and crypto tokens for a global community", {"blockchain", "global", "social"}),
+    ("Augmented reality glasses", {"xr"}),
+    ("", set()),
+])
+def test_categories(idea, categories):
+    assert get_idea_profile(idea).categories == categories
+
+
+def test_keywords_match_whole_words_only():
+    profile = get_idea_profile("Retain maintainers with html tooling")
+    assert not profile.has("ai")
+    assert get_idea_profile("Build ML apps").has("ai", "health")
+
+
+def test_longest_phrase_wins_where_matches_overlap():
+    profile = get_idea_profile("Machine learning for augmented reality apps")
+    assert profile.terms() == [
+        ("machine learning", "ai"),
+        ("for", None),
+        ("augmented reality", "xr"),
+        ("apps", "software"),
+    ]
+    # The shorter phrases inside a longer match do not count towards the categories
+    assert profile.categories == {"ai", "xr", "software"}
+    assert not profile.has("education")
+
+
+def test_matcher_agrees_with_brute_force():
+    phrases = {("a",): "x", ("a", "b"): "x", ("b", "c"): "y", ("a", "b", "c", "d"): "z", ("c",): "y", ("b", "a", "b"): "z"}
+    matcher = KeywordMatcher(phrases)
+    for text in ["a b c d", "b a b c", "a a b a b c d c", "d d d", "c b a b c d a"]:
+        tokens = tuple(text.split())
+        assert sorted(matcher.find(tokens)) == brute_force_find(phrases, tokens)
+
+
+def test_matcher_finds_every_keyword_in_the_table():
+    phrases = {tuple(keyword.split()): category for category, keywords in CATEGORY_KEYWORDS.items() for keyword in keywords}
+    matcher = KeywordMatcher(phrases)
+    for phrase, category in phrases.items():
+        tokens = ("before",) + phrase + ("after",)
+        assert (1, 1 + len(phrase), phrase) in matcher.find(tokens)
+
+
+def test_profiles_are_cached_by_idea():
+    idea = "A wellness community app"
+    assert get_idea_profile(idea) is get_idea_profile(idea)
+    assert get_idea_profile(idea).tokens == tokenize(idea)
@@ -0,0 +1,68 @@
+import json
+
+from ingest_manifest import MANIFEST_VERSION, IngestManifest, chunk_id, file_sha256
+
+
+def write_documents(directory, contents):
+    paths = {}
+    for name, text in contents.items():
+        path = directory / name
+        path.write_bytes(text)
+        paths[name] = str(path)
+    return paths
+
+
+def test_chunk_ids_are_stable_and_scoped_to_the_document():
+    assert chunk_id("a.pdf", "text") == chunk_id("a.pdf", "text")
+    assert chunk_id("a.pdf", "text") != chunk_id("b.pdf", "text")
+    assert chunk_id("a.pdf", "text").startswith("chunk_")
+
+
+def test_plan_against_an_empty_manifest(tmp_path):
+    paths = write_documents(tmp_path, {"b.pdf": b"b", "a.pdf": b"a"})
+    plan = IngestManifest(str(tmp_path / "manifest.json")).plan(paths)
+    assert plan.new == ["a.pdf", "b.pdf"]
+    assert plan.changed == plan.removed == plan.unchanged == []
+    assert plan.file_hashes["a.pdf"] == file_sha256(paths["a.pdf"])
+
+
+def test_plan_detects_new_changed_removed_and_unchanged(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    paths = write_documents(tmp_path, {"same.pdf": b"same", "edited.pdf": b"old", "gone.pdf": b"gone"})
+    manifest = IngestManifest(manifest_path)
+    for name, path in paths.items():
+        manifest.record(name, file_sha256(path), [chunk_id(name, "chunk")])
+    manifest.save()
+
+    (tmp_path / "edited.pdf").write_bytes(b"new")
+    del paths["gone.pdf"]
+    paths.update(write_documents(tmp_path, {"added.pdf": b"added"}))
+
+    plan = IngestManifest(manifest_path).plan(paths)
+    assert plan.new == ["added.pdf"]
+    assert plan.changed == ["edited.pdf"]
+    assert plan.removed == ["gone.pdf"]
+    assert plan.unchanged == ["same.pdf"]
+    assert plan.to_process == ["added.pdf", "edited.pdf"]
+    assert plan.summary() == "1 new, 1 changed, 1 removed, 1 unchanged"
+
+
+def test_save_round_trips_and_forget(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest = IngestManifest(str(manifest_path))
+    manifest.record("a.pdf", "abc", ["chunk_1", "chunk_2"])
+    manifest.record("b.pdf", "def", [])
+    manifest.forget("b.pdf")
+    manifest.save()
+
+    assert not (tmp_path / "manifest.json.tmp").exists()
+    reloaded = IngestManifest(str(manifest_path))
+    assert list(reloaded.documents) == ["a.pdf"]
+    assert reloaded.chunk_ids("a.pdf") == ["chunk_1", "chunk_2"]
+    assert reloaded.chunk_ids("missing.pdf") == []
+
+
+def test_unsupported_version_is_ignored(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps({"version": MANIFEST_VERSION + 1, "documents": {"a.pdf": {}}}))
+    assert IngestManifest(str(manifest_path)).documents == {}
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from ingest_pipeline import Batcher, Pipeline
+
+
+def test_stages_run_in_order_and_flush_batches():
+    batcher = Batcher(max_items=3)
+    out = []
+    lock = threading.Lock()
+
+    def collect(batch):
+        with lock:
+            out.extend(batch)
+        return []
+
+    pipeline = (Pipeline(range(10))
+                .stage("double", lambda n: [n * 2])
+                .stage("batch", batcher.add, flush=batcher.flush)
+                .stage("collect", collect, workers=2, weight=len))
+    stats = pipeline.run()
+    assert sorted(out) == [n * 2 for n in range(10)]
+    assert [s.items for s in stats] == [10, 10, 10, 10]
+
+
+def test_failing_stage_closes_a_generator_source():
+    closed = threading.Event()
+
+    def source():
+        try:
+            for n in range(10 ** 6):
+                yield n
+        finally:
+            closed.set()
+
+    def fail(n):
+        if n == 5:
+            raise RuntimeError("upsert failed")
+        return [n]
+
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        Pipeline(source(), queue_size=2).stage("upsert", fail).run()
+    assert closed.is_set()
+
+
+def test_failing_source_is_reported():
+    def source():
+        yield 1
+        raise ValueError("unreadable PDF")
+
+    with pytest.raises(ValueError):
+        Pipeline(source()).stage("noop", lambda n: []).run()
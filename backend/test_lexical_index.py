@@ -0,0 +1,144 @@
+import math
+import os
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from lexical_index import BM25_B, BM25_K1, LexicalIndex, reciprocal_rank_fusion, tokenize
+
+VOCABULARY = ["market", "consumer", "rmaas", "mgi", "health", "longevity", "ai", "retail", "energy", "fintech"]
+
+
+def make_records(n, seed=0, prefix="c"):
+    rng = random.Random(seed)
+    return [
+        {"id": f"{prefix}{i}", "metadata": {"text": " ".join(rng.choices(VOCABULARY, k=rng.randint(1, 12))), "document": f"doc{i % 4}"}}
+        for i in range(n)
+    ]
+
+
+def brute_force_bm25(records, query):
+    docs = [tokenize(record["metadata"]["text"]) for record in records]
+    avg_length = sum(len(doc) for doc in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        tfs = Counter(doc)
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(1 for other in docs if term in other)
+            if not tfs[term]:
+                continue
+            idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * len(doc) / avg_length)
+            score += idf * tfs[term] * (BM25_K1 + 1.0) / (tfs[term] + norm)
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("What is the RMaaS market, in 2030?") == ["rmaas", "market", "2030"]
+
+
+@pytest.mark.parametrize("query", ["market", "rmaas consumer", "longevity ai health", "unknown"])
+def test_search_matches_brute_force(tmp_path, query):
+    records = make_records(300)
+    index = LexicalIndex(str(tmp_path))
+    index.rebuild(records)
+    hits = index.search(query, top_k=10)
+
+    expected = brute_force_bm25(records, query)
+    matched = sorted((score for score in expected if score > 0), reverse=True)
+    assert len(hits) == min(10, len(matched))
+    for rank, (record, score) in enumerate(hits):
+        assert score == pytest.approx(expected[int(record["id"][1:])], rel=1e-4)
+        assert score == pytest.approx(matched[rank], rel=1e-4)
+
+
+def test_update_replaces_and_deletes_chunks(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    index.rebuild(make_records(5))
+    index.update([{"id": "c1", "metadata": {"text": "rmaas", "document": "new"}}], ["c2"])
+
+    ids = sorted(record["id"] for record in index.records())
+    assert ids == ["c0", "c1", "c3", "c4"]
+    assert index.search("rmaas", top_k=1)[0][0]["metadata"]["document"] == "new"
+    assert "new" in index.documents()
+
+
+def test_reader_keeps_its_build_and_switches_after_a_rebuild(tmp_path):
+    writer = LexicalIndex(str(tmp_path))
+    writer.rebuild(make_records(50, seed=1))
+    reader = LexicalIndex(str(tmp_path))
+    old_build = reader._current()
+
+    # Two more rebuilds remove the reader's build from disk
+    writer.rebuild(make_records(80, seed=2, prefix="d"))
+    writer.rebuild(make_records(60, seed=3, prefix="e"))
+    assert not os.path.exists(old_build.directory)
+    assert old_build.records([0, 49])[1]["id"] == "c49"
+
+    assert reader.count == 60
+    assert all(record["id"].startswith("e") for record, _ in reader.search("market", top_k=20))
+
+
+def test_only_current_and_previous_builds_are_kept(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    for seed in range(4):
+        index.rebuild(make_records(10, seed=seed))
+    builds = [entry for entry in os.listdir(tmp_path) if entry.startswith("v")]
+    assert len(builds) == 2
+    with open(tmp_path / "CURRENT", encoding="utf-8") as f:
+        assert f.read().strip() in builds
+
+
+def test_unversioned_index_is_read_and_migrated(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    index.rebuild(make_records(10))
+    build = (tmp_path / "CURRENT").read_text().strip()
+    # Lay the build out the way indexes were written before builds were versioned
+    for name in os.listdir(tmp_path / build):
+        os.replace(tmp_path / build / name, tmp_path / name)
+    os.rmdir(tmp_path / build)
+    os.remove(tmp_path / "CURRENT")
+
+    legacy = LexicalIndex(str(tmp_path))
+    assert legacy.count == 10
+    legacy.update([], ["c0"])
+    assert legacy.count == 9
+    assert not (tmp_path / "terms.json").exists()
+    assert LexicalIndex(str(tmp_path)).count == 9
+
+
+def test_is_confident_requires_rare_terms_in_every_hit(tmp_path):
+    records = make_records(200, seed=4)
+    records.append({"id": "rare", "metadata": {"text": "zylophone market", "document": "x"}})
+    index = LexicalIndex(str(tmp_path))
+    index.rebuild(records)
+
+    hits = index.search("zylophone", top_k=1)
+    assert index.is_confident("zylophone", hits, top_k=1)
+    assert not index.is_confident("market", index.search("market", top_k=1), top_k=1)
+    assert not index.is_confident("zylophone", hits, top_k=3)
+
+
+def test_is_confident_requires_hits_to_cover_the_query(tmp_path):
+    records = make_records(200, seed=5)
+    records.append({"id": "rare", "metadata": {"text": "zylophone market entry", "document": "x"}})
+    index = LexicalIndex(str(tmp_path))
+    index.rebuild(records)
+
+    assert index.is_confident("zylophone market entry", index.search("zylophone market entry", top_k=1), top_k=1)
+    # A question that mentions the rare term in passing is not answered lexically
+    question = "How should zylophone rethink pricing strategy across regions"
+    assert not index.is_confident(question, index.search(question, top_k=1), top_k=1)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [{"id": "a", "metadata": {}}, {"id": "b", "metadata": {}}, {"id": "c", "metadata": {}}]
+    lexical = [{"id": "c", "metadata": {}}, {"id": "a", "metadata": {}}]
+    fused = reciprocal_rank_fusion([vector, lexical], top_k=3)
+    assert [match["id"] for match in fused] == ["a", "c", "b"]
+    assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+    assert np.all(np.diff([match["score"] for match in fused]) <= 0)
@@ -0,0 +1,111 @@
+import asyncio
+import re
+
+import pytest
+
+from metrics import CONTENT_TYPE, CallbackMetric, Counter, Gauge, Histogram, MetricsMiddleware, Registry, metrics_response
+
+# One sample line of the Prometheus text format: name, optional labels, value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? (-?[0-9.e+-]+|[+-]Inf|NaN)$')
+
+
+def parse(text):
+    """{sample name with labels: value}, checking every line against the exposition format."""
+    assert text.endswith("\n")
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            continue
+        assert SAMPLE.match(line), line
+        name, value = line.rsplit(" ", 1)
+        samples[name] = float(value)
+    return samples
+
+
+def test_counter_and_gauge_render_with_help_and_type():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests by path", ("path",), registry=registry)
+    in_flight = Gauge("in_flight", "Requests being served", registry=registry)
+    requests.labels("/chat").inc()
+    requests.labels("/chat").inc(2)
+    requests.labels('/a"b\\c').inc()
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    text = registry.render()
+    assert "# HELP requests_total Requests by path\n# TYPE requests_total counter\n" in text
+    assert "# TYPE in_flight gauge\n" in text
+    samples = parse(text)
+    assert samples['requests_total{path="/chat"}'] == 3.0
+    assert samples['requests_total{path="/a\\"b\\\\c"}'] == 1.0
+    assert samples["in_flight"] == 1.0
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.labels("/").observe(value)
+
+    samples = parse(registry.render())
+    assert samples['latency_seconds_bucket{route="/",le="0.1"}'] == 2.0
+    assert samples['latency_seconds_bucket{route="/",le="1.0"}'] == 3.0
+    assert samples['latency_seconds_bucket{route="/",le="+Inf"}'] == 4.0
+    assert samples['latency_seconds_count{route="/"}'] == 4.0
+    assert samples['latency_seconds_sum{route="/"}'] == pytest.approx(2.65)
+
+
+def test_labels_and_names_are_validated():
+    registry = Registry()
+    counter = Counter("calls_total", "Calls", ("model",), registry=registry)
+    with pytest.raises(ValueError):
+        counter.labels("gpt-4", "extra")
+    with pytest.raises(ValueError):
+        Counter("calls_total", "Duplicate", registry=registry)
+
+
+def test_callback_metrics_are_read_at_scrape_time():
+    registry = Registry()
+    state = {"hits": 1}
+    CallbackMetric("hits_total", "Hits", "counter", lambda: {("memo",): state["hits"]}, ("cache",), registry=registry)
+    CallbackMetric("broken", "Fails to collect", "gauge", lambda: 1 / 0, registry=registry)
+    state["hits"] = 5
+
+    text = registry.render()
+    assert parse(text)['hits_total{cache="memo"}'] == 5.0
+    # A failing callback keeps its HELP/TYPE lines but no samples, and does not break the rest
+    assert "# TYPE broken gauge\n" in text and "\nbroken " not in text
+
+
+def test_metrics_response_uses_the_text_format():
+    registry = Registry()
+    Counter("one_total", "One", registry=registry).inc()
+    response = metrics_response(registry)
+    assert response.media_type == CONTENT_TYPE
+    assert parse(response.body.decode())["one_total"] == 1.0
+
+
+def test_middleware_labels_requests_by_route():
+    class Route:
+        def __init__(self, path):
+            self.path = path
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 404 if scope["path"] == "/missing" else 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(app, [Route("/chat")])
+    asyncio.run(middleware({"type": "http", "method": "POST", "path": "/chat"}, None, send))
+    asyncio.run(middleware({"type": "http", "method": "GET", "path": "/missing"}, None, send))
+
+    assert middleware.route_path("/chat") == "/chat"
+    assert middleware.route_path("/wp-login.php") == "unmatched"
+    from metrics import REGISTRY
+    samples = parse(REGISTRY.render())
+    assert samples['http_requests_total{method="POST",path="/chat",status="200"}'] >= 1.0
+    assert samples['http_requests_total{method="GET",path="unmatched",status="404"}'] >= 1.0
+    assert samples['http_requests_in_flight{path="/chat"}'] == 0.0
@@ -0,0 +1,113 @@
+import pytest
+
+from prompt_builder import build_idea_prompt, fit_history, message_text, message_tokens
+
+MODEL = "gpt-4-turbo"
+
+
+def conversation(turns, words=40):
+    history = []
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"turn {i} " + " ".join(f"word{j}" for j in range(words))})
+    return history
+
+
+def total_tokens(messages):
+    return sum(message_tokens(message, MODEL) for message in messages)
+
+
+def test_short_history_is_returned_unchanged():
+    history = conversation(4, words=5)
+    assert fit_history(history, max_tokens=2000, model=MODEL) == history
+
+
+def test_empty_and_unknown_turns_are_dropped():
+    history = [{"role": "user", "content": "  "}, {"role": "tool", "content": "x"}, {"role": "user", "content": "hi"}]
+    assert fit_history(history, model=MODEL) == [{"role": "user", "content": "hi"}]
+    assert fit_history(None, model=MODEL) == []
+
+
+@pytest.mark.parametrize("max_tokens", [150, 300, 600, 1200])
+def test_long_history_fits_the_budget(max_tokens):
+    history = conversation(40)
+    fitted = fit_history(history, max_tokens=max_tokens, summary_tokens=100, model=MODEL)
+
+    assert total_tokens(fitted) <= max_tokens
+    # The newest turns are kept verbatim, in order
+    verbatim = [message for message in fitted if message["role"] != "system"]
+    assert 0 < len(verbatim) < len(history)
+    assert verbatim == history[len(history) - len(verbatim):]
+
+
+def test_summary_mentions_the_latest_dropped_user_turns():
+    history = conversation(40)
+    fitted = fit_history(history, max_tokens=600, summary_tokens=200, model=MODEL)
+    summary = fitted[0]
+    assert summary["role"] == "system"
+    assert summary["content"].startswith("Earlier in the conversation the user mentioned:")
+
+    dropped = history[:len(history) - (len(fitted) - 1)]
+    newest_user_turn = [turn for turn in dropped if turn["role"] == "user"][-1]
+    assert newest_user_turn["content"][:20] in summary["content"]
+    labels = [turn["content"].split(" word")[0] for turn in dropped if turn["role"] == "assistant"]
+    assert not any(f"- {label} " in summary["content"] for label in labels)
+
+
+def test_oversized_newest_turn_is_truncated():
+    history = [{"role": "user", "content": "word " * 5000}]
+    fitted = fit_history(history, max_tokens=200, summary_tokens=50, model=MODEL)
+    assert len(fitted) == 1
+    assert total_tokens(fitted) <= 200
+
+
+def test_list_content_is_reduced_to_its_text():
+    history = [
+        {"role": "user", "content": [{"type": "text", "text": "first part"}, {"type": "image_url", "image_url": {"url": "x"}}, {"type": "text", "text": "second"}]},
+        {"role": "assistant", "content": "reply"},
+    ]
+    fitted = fit_history(history, model=MODEL)
+    assert fitted[0] == {"role": "user", "content": "first part\nsecond"}
+    assert message_tokens(history[0], MODEL) == message_tokens(fitted[0], MODEL)
+    assert message_text(None) == ""
+
+
+def test_system_messages_are_kept_and_counted():
+    history = [{"role": "system", "content": "Answer in French."}] + conversation(40)
+    fitted = fit_history(history, max_tokens=400, summary_tokens=100, model=MODEL)
+    assert fitted[0] == {"role": "system", "content": "Answer in French."}
+    assert total_tokens(fitted) <= 400
+
+    only_system = [{"role": "system", "content": "Answer in French."}]
+    assert fit_history(only_system, model=MODEL) == only_system
+
+
+@pytest.mark.parametrize("extra", [0, 2, 4])
+def test_budget_used_up_by_system_messages(extra):
+    instructions = {"role": "system", "content": "Answer in French. " * 20}
+    history = [instructions] + conversation(6)
+    fitted = fit_history(history, max_tokens=message_tokens(instructions, MODEL) + extra, summary_tokens=0, model=MODEL)
+    # No room for any turn's text: only the system message is sent, never an empty turn
+    assert fitted == [instructions]
+
+
+def test_turns_fill_what_the_system_messages_leave():
+    instructions = {"role": "system", "content": "Answer in French. " * 20}
+    budget = message_tokens(instructions, MODEL) + 8
+    fitted = fit_history([instructions] + conversation(6), max_tokens=budget, summary_tokens=0, model=MODEL)
+    assert fitted[0] == instructions and len(fitted) == 2
+    assert fitted[1]["content"].strip()
+    assert total_tokens(fitted) <= budget
+
+
+def test_system_messages_over_the_budget_are_dropped():
+    first = {"role": "system", "content": "Answer in French."}
+    second = {"role": "system", "content": "Be brief. " * 200}
+    budget = message_tokens(first, MODEL) + 10
+    assert fit_history([first, second] + conversation(4), max_tokens=budget, model=MODEL) == [first]
+    assert fit_history([second] + conversation(4), max_tokens=budget, model=MODEL) == []
+
+
+def test_idea_prompt_does_not_repeat_history():
+    prompt = build_idea_prompt("A meal-kit app", "List the risks.")
+    assert prompt == "Business Idea: A meal-kit app\n\nList the risks."
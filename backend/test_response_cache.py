@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+
+from response_cache import ResponseCache, make_cache_key
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(path=os.path.join(tmp_path, "responses.sqlite3"), **kwargs)
+
+
+def disk_keys(cache):
+    return {row[0] for row in cache._connection().execute("SELECT key FROM responses")}
+
+
+def test_cache_key_ignores_whitespace_and_role_case():
+    history = [{"role": "User", "content": "hello   there"}]
+    same = [{"role": "user", "content": "hello there"}]
+    assert make_cache_key("gpt-4", "sys", "prompt", history) == make_cache_key("gpt-4", "sys", "prompt", same)
+    assert make_cache_key("gpt-4", "sys", "prompt") != make_cache_key("gpt-4", "sys", "other prompt")
+
+
+def test_get_and_set_count_hits_and_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("a") is None
+    cache.set("a", "value")
+    assert cache.get("a") == "value"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_ratio == 0.5
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert list(cache._memory) == ["a", "c"]
+    # Evicted from memory, still served from sqlite
+    assert cache.get("b") == "2"
+
+
+def test_disk_tier_is_trimmed_every_prune_every_writes(tmp_path):
+    cache = make_cache(tmp_path, max_memory_entries=1, max_disk_entries=3, prune_every=5)
+    for key in ("a", "b", "c"):
+        cache.set(key, "v")
+        time.sleep(0.001)
+    # Read from sqlite, which makes "a" the most recently used entry on disk
+    assert cache.get("a") == "v"
+    cache.set("d", "v")
+    assert len(disk_keys(cache)) == 4
+    # Fifth write since the last trim: the two least recently used entries go
+    cache.set("e", "v")
+    assert disk_keys(cache) == {"a", "d", "e"}
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0.05)
+    cache.set("a", "value")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert "a" not in disk_keys(cache)
+
+
+def test_entries_persist_across_instances(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", "value")
+    cache._conn.close()
+    reopened = make_cache(tmp_path)
+    assert reopened.get("a") == "value"
+
+
+def test_async_methods_share_both_tiers(tmp_path):
+    cache = make_cache(tmp_path)
+
+    async def run():
+        await cache.aset("a", "value")
+        assert await cache.aget("a") == "value"
+        assert await cache.aget("missing") is None
+
+    asyncio.run(run())
+    assert make_cache(tmp_path).get("a") == "value"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("a", "value")
+    cache.clear()
+    assert cache.get("a") is None
+    assert disk_keys(cache) == set()
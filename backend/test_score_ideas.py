@@ -0,0 +1,32 @@
+import json
+
+from score_ideas import read_ideas, score_idea
+
+
+def test_jsonl_rows_that_are_not_objects_become_empty_ideas(tmp_path):
+    path = tmp_path / "ideas.jsonl"
+    lines = [
+        json.dumps({"id": "a", "idea": " A meal-kit app ", "additional_context": {"adoption_samples": 100}}),
+        json.dumps("A crypto wallet"),
+        "42",
+        json.dumps(["not", "an", "idea"]),
+        "{not json",
+        json.dumps({"idea": "A tutoring platform", "additional_context": "oops"}),
+        "",
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    rows = list(read_ideas(str(path)))
+    assert [row["index"] for row in rows] == list(range(7))
+    assert [row["idea"] for row in rows] == ["A meal-kit app", "A crypto wallet", "", "", "", "A tutoring platform", ""]
+    assert rows[0]["id"] == "a" and rows[0]["additional_context"] == {"adoption_samples": 100}
+    assert rows[5]["additional_context"] is None
+    assert score_idea(rows[2], ["build-plan"])["error"] == "build-plan: empty idea"
+
+
+def test_csv_rows(tmp_path):
+    path = tmp_path / "ideas.csv"
+    path.write_text('id,idea,additional_context\n1,An AI fitness app,"{""adoption_samples"": 50}"\n2,,\n', encoding="utf-8")
+    rows = list(read_ideas(str(path)))
+    assert [(row["id"], row["idea"]) for row in rows] == [("1", "An AI fitness app"), ("2", "")]
+    assert rows[0]["additional_context"] == {"adoption_samples": 50}
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    started = []
+
+    async def call():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        results = await asyncio.gather(*(flights.do("key", call) for _ in range(5)))
+        assert flights.in_flight == 0
+        return results
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(started) == 1
+    assert (flights.calls, flights.coalesced) == (1, 4)
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flights = SingleFlight()
+
+    async def run():
+        first = await asyncio.gather(flights.do("a", lambda: asyncio.sleep(0, "a")), flights.do("b", lambda: asyncio.sleep(0, "b")))
+        # The finished call is forgotten, so the same key starts a new one
+        second = await flights.do("a", lambda: asyncio.sleep(0, "again"))
+        return first, second
+
+    assert asyncio.run(run()) == (["a", "b"], "again")
+    assert (flights.calls, flights.coalesced) == (3, 0)
+
+
+def test_exceptions_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(flights.do("key", fail), flights.do("key", fail), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert flights.calls == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_call():
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("key", call))
+        second = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "result"
+    assert flights.calls == 1
+
+
+def test_call_finishes_after_every_caller_is_cancelled():
+    flights = SingleFlight()
+    finished = []
+
+    async def call():
+        await asyncio.sleep(0.02)
+        finished.append(1)
+        raise RuntimeError("nobody is listening")
+
+    async def run():
+        caller = asyncio.ensure_future(flights.do("key", call))
+        await asyncio.sleep(0.005)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        assert flights.in_flight == 0
+
+    asyncio.run(run())
+    assert finished == [1]
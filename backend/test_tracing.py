@@ -0,0 +1,81 @@
+import asyncio
+import logging
+
+import pytest
+
+import tracing
+from tracing import LOG_FORMAT, TraceContextFilter, TracingMiddleware, install_log_filter, span
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    spans = []
+    monkeypatch.setattr(tracing.exporter, "export", lambda s: spans.append(s.to_dict()))
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    return spans
+
+
+def run_request(app):
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/chat", "headers": []}
+    asyncio.run(TracingMiddleware(app)(scope, None, send))
+
+
+def test_failed_request_is_exported_as_an_error(exported):
+    async def app(scope, receive, send):
+        with span("stage"):
+            raise RuntimeError("upstream failed")
+
+    with pytest.raises(RuntimeError):
+        run_request(app)
+
+    stage, root = exported
+    assert root["name"] == "GET /chat"
+    assert (root["status"], root["error"]) == ("error", "RuntimeError: upstream failed")
+    assert root["attributes"]["status"] == 500
+    assert stage["status"] == "error" and stage["parent_id"] == root["span_id"]
+
+
+def test_successful_request_is_exported_once(exported):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    run_request(app)
+    [root] = exported
+    assert (root["status"], root["attributes"]["status"]) == ("ok", 200)
+
+
+def test_filter_tags_only_its_own_handlers(exported):
+    class Collect(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.lines = []
+
+        def emit(self, record):
+            self.lines.append(self.format(record))
+
+    tagged, plain = Collect(), Collect()
+    tagged.setFormatter(logging.Formatter(LOG_FORMAT))
+    log = logging.getLogger("test_tracing.filter")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(tagged)
+    install_log_filter(log)
+    install_log_filter(log)
+    log.addHandler(plain)
+    try:
+        log.info("outside")
+        with span("stage") as s:
+            log.info("inside %s", "a trace")
+    finally:
+        log.handlers.clear()
+
+    assert [type(f) for f in tagged.filters] == [TraceContextFilter]
+    assert tagged.lines == [
+        "INFO:test_tracing.filter:outside",
+        f"INFO:test_tracing.filter:inside a trace [trace_id={s.trace_id} span_id={s.span_id}]",
+    ]
+    assert plain.lines == ["outside", "inside a trace"]
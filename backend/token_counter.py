@@ -0,0 +1,60 @@
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text, used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character-based estimate
+    tiktoken = None
+
+_fallback_warned = False
+
+
+def _warn_fallback() -> None:
+    global _fallback_warned
+    if not _fallback_warned:
+        _fallback_warned = True
+        logger.warning(
+            f"tiktoken is not installed; estimating token counts as {CHARS_PER_TOKEN} characters per token. "
+            "Batching and history budgets will be approximate (pip install tiktoken)."
+        )
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    if tiktoken is None:
+        _warn_fallback()
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = "text-embedding-3-large") -> int:
+    """
+    Count the tokens in a text for the given model
+
+    Uses tiktoken when it is installed, otherwise estimates from the text length.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "text-embedding-3-large") -> str:
+    """Cut a text down to at most max_tokens tokens, keeping its beginning."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+import contextvars
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tracing settings (override through environment variables)
+# Share of requests traced, from 0 (off) to 1 (every request)
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0"))
+# JSONL file that finished spans are appended to
+TRACE_FILE = os.environ.get("TRACE_FILE", os.path.join(os.path.dirname(__file__), "cache", "traces.jsonl"))
+# Append the trace and span IDs to log messages written inside a traced request
+TRACE_LOG_IDS = os.environ.get("TRACE_LOG_IDS", "1") != "0"
+
+# Log format for entry points that install TraceContextFilter: basicConfig's default
+# format, followed by the trace and span IDs inside a traced request
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s%(trace_context)s"
+
+TRACE_HEADER = "x-trace-id"
+
+
+class Span:
+    """
+    One timed stage of a traced request
+
+    Spans share the trace_id of their root and point at their parent through parent_id.
+    Attributes are plain JSON values. A span is written to the exporter when it ends.
+    """
+
+    recording = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._start) * 1000.0
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in for spans of requests that are not sampled; every call does nothing."""
+
+    recording = False
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+# Span of the stage currently running; NOOP_SPAN inside a request that was not sampled
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class JsonlExporter:
+    """Append finished spans to a JSONL file, one span per line."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._file.write(line)
+            except OSError as e:
+                logger.error(f"Failed to export span {span.name}: {str(e)}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# Exporter for all spans of this process
+exporter = JsonlExporter()
+
+
+def current_span():
+    """The span of the running stage, or NOOP_SPAN outside a traced request."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def start_span(name: str, sampled: Optional[bool] = None, trace_id: Optional[str] = None, **attributes: Any):
+    """
+    Start a span without making it the current one; the caller must call end()
+
+    Inside a trace the span becomes a child of the current span. Otherwise it starts a new
+    trace if sampled (decided by TRACE_SAMPLE_RATE when None). Use this for spans that
+    outlive one call, such as a generator streaming a response; span() covers the rest.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        if not parent.recording:
+            return NOOP_SPAN
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+    if sampled is None:
+        sampled = TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+    if not sampled:
+        return NOOP_SPAN
+    return Span(name, trace_id or os.urandom(16).hex(), None, attributes)
+
+
+class _SpanScope:
+    """Context manager that makes a span current for the duration of a block."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.span = start_span(self.name, **self.attributes)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        self.span.end(error=exc)
+        return False
+
+
+def span(name: str, **attributes: Any):
+    """
+    Time a block as a span and make it the current span while it runs
+
+    Use as "with span("stage", key=value) as s:". With tracing off and no trace in progress
+    this returns a shared no-op span after reading one context variable, so stages can be
+    wrapped unconditionally. Exceptions are recorded on the span and re-raised.
+    """
+    if TRACE_SAMPLE_RATE <= 0 and _current_span.get() is None:
+        return NOOP_SPAN
+    return _SpanScope(name, attributes)
+
+
+def parse_traceparent(value: str) -> Optional[Dict[str, Any]]:
+    """Trace ID and sampled flag from a W3C traceparent header ("00-<trace>-<parent>-<flags>")."""
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[3]) != 2:
+        return None
+    try:
+        int(parts[1], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return {"trace_id": parts[1], "parent_id": parts[2], "sampled": bool(flags & 1)}
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that opens the root span of each sampled request
+
+    A request carrying a W3C traceparent header keeps the caller's trace ID and sampling
+    decision; other requests are sampled at TRACE_SAMPLE_RATE. Traced responses get an
+    X-Trace-Id header, and one log line per traced request links the trace to the logs.
+    Unsampled requests only pay for the sampling decision.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        if parent is None and TRACE_SAMPLE_RATE <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        root = start_span(
+            f"{scope['method']} {scope['path']}",
+            sampled=parent["sampled"] if parent else None,
+            trace_id=parent["trace_id"] if parent else None,
+        )
+        if parent and root.recording:
+            root.parent_id = parent["parent_id"]
+        status = 500
+
+        async def send_with_trace_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if root.recording:
+                    message["headers"] = list(message.get("headers", [])) + [(TRACE_HEADER.encode(), root.trace_id.encode())]
+            await send(message)
+
+        token = _current_span.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            # Status and error go on the span before it ends, since ending exports it
+            if root.recording:
+                root.set(status=status)
+                root.end(error=error)
+                logger.info(f"{root.name} {status} in {root.duration_ms:.1f} ms")
+            _current_span.reset(token)
+
+
+class TraceContextFilter(logging.Filter):
+    """
+    Handler filter that puts the IDs of the current span on each log record
+
+    Sets record.trace_id and record.span_id (empty outside a traced request) for formats
+    that use %(trace_id)s, and record.trace_context (" [trace_id=... span_id=...]", or empty)
+    for LOG_FORMAT. The message itself is left alone.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        active = _current_span.get()
+        if active is not None and active.recording:
+            record.trace_id = active.trace_id
+            record.span_id = active.span_id
+            record.trace_context = f" [trace_id={active.trace_id} span_id={active.span_id}]" if TRACE_LOG_IDS else ""
+        else:
+            record.trace_id = ""
+            record.span_id = ""
+            record.trace_context = ""
+        return True
+
+
+def install_log_filter(logger: Optional[logging.Logger] = None) -> None:
+    """
+    Add a TraceContextFilter to the handlers of a logger (the root logger by default)
+
+    Call once after logging.basicConfig(format=LOG_FORMAT). Only those handlers see the
+    trace attributes; other loggers and handlers in the process are not touched.
+    """
+    trace_filter = TraceContextFilter()
+    for handler in (logger or logging.getLogger()).handlers:
+        if not any(isinstance(f, TraceContextFilter) for f in handler.filters):
+            handler.addFilter(trace_filter)
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    return spans
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Latency percentiles per span name, plus each stage's share of its trace's root span
+
+    Args:
+        spans: Span dicts as written by JsonlExporter
+
+    Returns:
+        {span name: {count, errors, p50_ms, p95_ms, p99_ms, share_of_root}}
+    """
+    import numpy as np
+
+    # A root's parent is absent, or belongs to the caller that sent the traceparent header
+    span_ids = {s["span_id"] for s in spans}
+    roots = {s["trace_id"]: s["duration_ms"] for s in spans if s.get("parent_id") not in span_ids}
+    durations = defaultdict(list)
+    shares = defaultdict(list)
+    errors = defaultdict(int)
+    for s in spans:
+        if s.get("duration_ms") is None:
+            continue
+        durations[s["name"]].append(s["duration_ms"])
+        errors[s["name"]] += s.get("status") == "error"
+        root = roots.get(s["trace_id"])
+        if root:
+            shares[s["name"]].append(s["duration_ms"] / root)
+    summary = {}
+    for name, values in durations.items():
+        p50, p95, p99 = np.percentile(values, (50, 95, 99))
+        summary[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "share_of_root": round(float(np.mean(shares[name])), 3) if shares[name] else None,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize spans exported to a trace JSONL file")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE, help=f"Trace file (default: {TRACE_FILE})")
+    parser.add_argument("--trace", help="Print the spans of one trace instead")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if args.trace:
+        trace = sorted((s for s in spans if s["trace_id"] == args.trace), key=lambda s: s["start"])
+        start = trace[0]["start"] if trace else 0
+        for s in trace:
+            offset = (s["start"] - start) * 1000.0
+            print(f"{offset:>9.1f} ms  {s['duration_ms']:>9.1f} ms  {s['name']:<24} {s['status']:<5} {json.dumps(s['attributes'])}")
+        return
+    print(f"{len({s['trace_id'] for s in spans})} traces, {len(spans)} spans")
+    for name, stats in sorted(summarize_spans(spans).items(), key=lambda item: -item[1]["p50_ms"]):
+        share = "-" if stats["share_of_root"] is None else f"{stats['share_of_root']:.1%}"
+        print(
+            f"{name:<24} {stats['count']:>7}  p50 {stats['p50_ms']:>9.1f}  p95 {stats['p95_ms']:>9.1f}  "
+            f"p99 {stats['p99_ms']:>9.1f} ms  {share:>6} of request  {stats['errors']} errors"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional
+
+from embedding_store import embedding_dimension
+
+logger = logging.getLogger(__name__)
+
+# Vector store settings (override through environment variables)
+VECTOR_STORE_BACKEND = os.environ.get("VECTOR_STORE", "pinecone")
+PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "leapgpt")
+PINECONE_NAMESPACE = "default"
+CHROMA_PATH = os.environ.get("CHROMA_PATH", os.path.join(os.path.dirname(__file__), "chroma_db"))
+CHROMA_COLLECTION = os.environ.get("CHROMA_COLLECTION", "leapgpt")
+# Let Chroma embed documents and queries itself (needed for collections such as the
+# bundled "ai_chat", which were built with Chroma's default 384-dimension embedder)
+CHROMA_BUILTIN_EMBEDDINGS = os.environ.get("CHROMA_BUILTIN_EMBEDDINGS", "0") == "1"
+
+
+@dataclass
+class QueryResult:
+    """Search results in the shape ask.py expects: matches with "id", "score" and "metadata"."""
+    matches: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class VectorStore:
+    """
+    Interface for the vector index behind query_pinecone and fill_pinecone
+
+    Vectors are dicts with "id", "values" and "metadata", where metadata carries at least
+    "text" and "source". Higher scores mean closer matches.
+    """
+
+    # Whether query() needs an embedding vector; stores that embed text themselves
+    # accept the query text instead and save the embeddings call
+    needs_query_vector = True
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def query(self, vector: Optional[List[float]] = None, top_k: int = 5, text: Optional[str] = None) -> QueryResult:
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def delete_all(self) -> None:
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """Vector store backed by a Pinecone serverless index."""
+
+    def __init__(
+        self,
+        index_name: str = PINECONE_INDEX_NAME,
+        namespace: str = PINECONE_NAMESPACE,
+        dimension: Optional[int] = None,
+        create_if_missing: bool = False,
+    ):
+        from pinecone import Pinecone, ServerlessSpec
+
+        if dimension is None:
+            dimension = embedding_dimension()
+        self.namespace = namespace
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        if create_if_missing and index_name not in pc.list_indexes().names():
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+            )
+        self.index = pc.Index(index_name)
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        self.index.upsert(vectors=vectors, namespace=self.namespace)
+
+    def query(self, vector: Optional[List[float]] = None, top_k: int = 5, text: Optional[str] = None) -> QueryResult:
+        results = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            namespace=self.namespace,
+        )
+        return QueryResult(matches=[
+            {"id": match["id"], "score": match["score"], "metadata": match["metadata"]}
+            for match in results.matches
+        ])
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids=ids, namespace=self.namespace)
+
+    def delete_all(self) -> None:
+        self.index.delete(delete_all=True, namespace=self.namespace)
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Local vector store backed by Chroma's persistent on-disk HNSW index
+
+    Reads and writes the backend/chroma_db directory, so retrieval needs no network hop.
+    Vectors must match the dimension of those already in the collection; a mismatch, such
+    as querying the bundled 384-dimension ai_chat collection with OpenAI embeddings, raises
+    ValueError instead of returning meaningless matches.
+    """
+
+    def __init__(
+        self,
+        path: str = CHROMA_PATH,
+        collection: str = CHROMA_COLLECTION,
+        builtin_embeddings: bool = CHROMA_BUILTIN_EMBEDDINGS,
+        create_if_missing: bool = True,
+        dimension: Optional[int] = None,
+    ):
+        try:
+            import chromadb
+        except ImportError as e:
+            raise ImportError("The chroma vector store requires the chromadb package: pip install chromadb") from e
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.builtin_embeddings = builtin_embeddings
+        self.needs_query_vector = not builtin_embeddings
+        if create_if_missing:
+            self.collection = self.client.get_or_create_collection(name=collection, metadata={"hnsw:space": "cosine"})
+        else:
+            self.collection = self.client.get_collection(name=collection)
+        self._space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        configuration = getattr(self.collection, "configuration", None) or {}
+        if isinstance(configuration, dict) and isinstance(configuration.get("hnsw"), dict):
+            self._space = configuration["hnsw"].get("space", self._space)
+        # Dimension of the stored vectors, or None while the collection is empty
+        self._dimension: Optional[int] = None
+        if not builtin_embeddings:
+            stored = self.collection.get(limit=1, include=["embeddings"])["embeddings"]
+            if stored is not None and len(stored):
+                self._dimension = len(stored[0])
+            # Warn on open when the embedding config has changed; queries and writes raise, but
+            # fill_db.py --full can still open the collection to rebuild it
+            if dimension is not None and self._dimension not in (None, dimension):
+                logger.warning(
+                    f"Chroma collection '{collection}' holds {self._dimension}-dimension vectors, but the "
+                    f"embedding model produces {dimension}. Rebuild it with fill_db.py --full."
+                )
+
+    def _check_dimension(self, dimension: int) -> None:
+        if self._dimension is None:
+            self._dimension = dimension
+        elif dimension != self._dimension:
+            raise ValueError(
+                f"Chroma collection '{self.collection.name}' holds {self._dimension}-dimension vectors, but the "
+                f"embedding model produces {dimension}. Point CHROMA_COLLECTION at a collection built by fill_db.py, "
+                f"or set CHROMA_BUILTIN_EMBEDDINGS=1 for collections built with Chroma's own embedder (such as ai_chat)."
+            )
+
+    def _score(self, distance: float) -> float:
+        # Chroma returns distances; convert them so that higher is better
+        if self._space == "cosine":
+            return 1.0 - distance
+        if self._space == "ip":
+            return -distance
+        return 1.0 / (1.0 + distance)
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        if not vectors:
+            return
+        kwargs = {
+            "ids": [v["id"] for v in vectors],
+            "documents": [v["metadata"].get("text", "") for v in vectors],
+            "metadatas": [{k: val for k, val in v["metadata"].items() if k != "text"} or {"source": "unknown"} for v in vectors],
+        }
+        if not self.builtin_embeddings:
+            kwargs["embeddings"] = [list(v["values"]) for v in vectors]
+            for embedding in kwargs["embeddings"]:
+                self._check_dimension(len(embedding))
+        self.collection.upsert(**kwargs)
+
+    def query(self, vector: Optional[List[float]] = None, top_k: int = 5, text: Optional[str] = None) -> QueryResult:
+        if self.builtin_embeddings:
+            results = self.collection.query(query_texts=[text], n_results=top_k)
+        else:
+            if self._dimension is None:
+                logger.warning(
+                    f"Chroma collection '{self.collection.name}' is empty; run fill_db.py with VECTOR_STORE=chroma first"
+                )
+                return QueryResult()
+            self._check_dimension(len(vector))
+            results = self.collection.query(query_embeddings=[list(vector)], n_results=top_k)
+        matches = []
+        for i, vector_id in enumerate(results["ids"][0]):
+            metadata = dict(results["metadatas"][0][i] or {})
+            metadata["text"] = results["documents"][0][i] or ""
+            matches.append({"id": vector_id, "score": self._score(results["distances"][0][i]), "metadata": metadata})
+        return QueryResult(matches=matches)
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def delete_all(self) -> None:
+        name, metadata = self.collection.name, self.collection.metadata
+        self.client.delete_collection(name)
+        self.collection = self.client.get_or_create_collection(name=name, metadata=metadata)
+        self._dimension = None
+
+
+def _flat_vector_store(**kwargs) -> VectorStore:
+    # Imported here because flat_index builds on the classes in this module
+    from flat_index import FlatVectorStore
+    return FlatVectorStore(**kwargs)
+
+
+VECTOR_STORES = {
+    "pinecone": PineconeVectorStore,
+    "chroma": ChromaVectorStore,
+    "flat": _flat_vector_store,
+}
+
+
+def get_vector_store(backend: Optional[str] = None, **kwargs) -> VectorStore:
+    """
+    Create the vector store selected by the VECTOR_STORE environment variable
+
+    Every store gets the dimension of the configured embedding model (embedding_dimension),
+    so a new index is created with the right size and an existing one is checked against it.
+
+    Args:
+        backend: Store name ("pinecone", "chroma" or "flat"); defaults to VECTOR_STORE
+        **kwargs: Options passed to the store's constructor
+
+    Returns:
+        The vector store instance
+    """
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    if backend not in VECTOR_STORES:
+        raise ValueError(f"Unknown vector store '{backend}'. Choose one of: {', '.join(VECTOR_STORES)}")
+    logger.info(f"Using {backend} vector store")
+    kwargs.setdefault("dimension", embedding_dimension())
+    return VECTOR_STORES[backend](**kwargs)
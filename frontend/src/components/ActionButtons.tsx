@@ -131,7 +131,7 @@ const ActionButtons: React.FC<ActionButtonsProps> = ({
       console.log("Build plan API response:", data);
       
       // Check if the response is from ChatGPT or the fallback template
-      if (data.source === "chatgpt") {
+      if (data.source === "chatgpt" || data.source === "chatgpt_cache") {
         // For ChatGPT responses, use the content directly (it's already formatted)
         addBotMessage({
           role: 'assistant',
@@ -213,7 +213,7 @@ const ActionButtons: React.FC<ActionButtonsProps> = ({
       console.log("Longevity API response:", data);
       
       // Check if the response is from ChatGPT or the fallback template
-      if (data.source === "chatgpt") {
+      if (data.source === "chatgpt" || data.source === "chatgpt_cache") {
         // For ChatGPT responses, use the content directly (it's already formatted)
         addBotMessage({
           role: 'assistant',
@@ -288,7 +288,7 @@ const ActionButtons: React.FC<ActionButtonsProps> = ({
       console.log("Market analysis API response:", data);
       
       // Check if the response is from ChatGPT or the fallback template
-      if (data.source === "chatgpt") {
+      if (data.source === "chatgpt" || data.source === "chatgpt_cache") {
         // For ChatGPT responses, use the content directly (it's already formatted)
         addBotMessage({
           role: 'assistant',